@@ -43,6 +43,22 @@ namespace CS1Profiler.Harmony
                         harmony.Patch(endRenderingImplMethod, prefix: replacement);
                         _isPatched = true;
                         
+                        // ステージ計測用（EndRenderingImpl置き換え中のみ計測する）
+                        var renderMeshesMethod = GetRenderMeshesMethod();
+                        if (renderMeshesMethod != null)
+                        {
+                            harmony.Patch(renderMeshesMethod,
+                                prefix: new HarmonyMethod(typeof(BuildingRenderAnalysisHooks), "RenderMeshes_Prefix"),
+                                postfix: new HarmonyMethod(typeof(BuildingRenderAnalysisHooks), "RenderMeshes_Postfix"));
+                        }
+                        var renderPropsMethod = GetRenderPropsMethod();
+                        if (renderPropsMethod != null)
+                        {
+                            harmony.Patch(renderPropsMethod,
+                                prefix: new HarmonyMethod(typeof(BuildingRenderAnalysisHooks), "RenderProps_Prefix"),
+                                postfix: new HarmonyMethod(typeof(BuildingRenderAnalysisHooks), "RenderProps_Postfix"));
+                        }
+                        
                         UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} BuildingRenderAnalysis patch applied to BuildingManager.EndRenderingImpl (full replacement)");
                     }
                     else
@@ -76,6 +92,19 @@ namespace CS1Profiler.Harmony
                     {
                         harmony.Unpatch(endRenderingImplMethod, typeof(BuildingRenderAnalysisHooks).GetMethod("EndRenderingImpl_Replacement"));
                     }
+                    
+                    var renderMeshesMethod = GetRenderMeshesMethod();
+                    if (renderMeshesMethod != null)
+                    {
+                        harmony.Unpatch(renderMeshesMethod, typeof(BuildingRenderAnalysisHooks).GetMethod("RenderMeshes_Prefix"));
+                        harmony.Unpatch(renderMeshesMethod, typeof(BuildingRenderAnalysisHooks).GetMethod("RenderMeshes_Postfix"));
+                    }
+                    var renderPropsMethod = GetRenderPropsMethod();
+                    if (renderPropsMethod != null)
+                    {
+                        harmony.Unpatch(renderPropsMethod, typeof(BuildingRenderAnalysisHooks).GetMethod("RenderProps_Prefix"));
+                        harmony.Unpatch(renderPropsMethod, typeof(BuildingRenderAnalysisHooks).GetMethod("RenderProps_Postfix"));
+                    }
 
                     _isPatched = false;
                     UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} BuildingRenderAnalysis patches removed");
@@ -87,6 +116,20 @@ namespace CS1Profiler.Harmony
             }
         }
 
+        private static MethodInfo GetRenderMeshesMethod()
+        {
+            return typeof(BuildingAI).GetMethod("RenderMeshes", BindingFlags.Instance | BindingFlags.Public);
+        }
+
+        private static MethodInfo GetRenderPropsMethod()
+        {
+            return typeof(BuildingAI).GetMethod("RenderProps",
+                BindingFlags.Instance | BindingFlags.Public,
+                null,
+                new Type[] { typeof(RenderManager.CameraInfo), typeof(ushort), typeof(Building).MakeByRefType(), typeof(int), typeof(RenderManager.Instance).MakeByRefType(), typeof(bool), typeof(bool) },
+                null);
+        }
+
         public static bool IsPatched => _isPatched;
     }
 
@@ -112,6 +155,22 @@ namespace CS1Profiler.Harmony
         private static int s_lastUnityFrame = -1;
         private static float s_lastTime = 0f;
         
+        // フレーム×ステージのカウンター記録（CS1Profiler_BuildingStages_*.csv）
+        // 呼び出し単位の分析（StartAnalysis）とは独立。計測の歪みを避けるため同時に使わないこと
+        private const int STAGE_FRAMES_PER_FLUSH = 3600; // 約1分(60fps)ごとにファイルへ追記
+        private static volatile bool s_recordStages = false;
+        private static bool s_stageFrameActive = false;
+        private static BuildingStageFrame s_stageFrame;
+        private static List<BuildingStageFrame> s_stageFrames = new List<BuildingStageFrame>(STAGE_FRAMES_PER_FLUSH);
+        // 書き込み待ちのバッチ（描画スレッドではファイルI/Oを行わず、スレッドプール上で1つずつ順に追記）
+        private static readonly Queue<KeyValuePair<string, List<BuildingStageFrame>>> s_stageWriteQueue =
+            new Queue<KeyValuePair<string, List<BuildingStageFrame>>>();
+        private static bool s_stageWriterActive = false;
+        private static readonly int[] s_buildingSeenStamp = new int[65536];
+        private static int s_stageStamp = 0;
+        private static string s_stageCsvPath = null;
+        private static int s_stageFramesWritten = 0;
+        
         // RenderGroup可視化用（45x45グリッド）
         private static bool[,] s_currentRenderGroups = new bool[45, 45];
         private static readonly object s_renderGroupLock = new object();
@@ -131,6 +190,26 @@ namespace CS1Profiler.Harmony
             // 元のEndRenderingImplの処理をコピーして分析処理を追加
             FastList<RenderGroup> renderedGroups = Singleton<RenderManager>.instance.m_renderedGroups;
             
+            bool recordStages = s_recordStages;
+            long frameStartTicks = 0;
+            long passStartTicks = 0;
+            if (recordStages)
+            {
+                frameStartTicks = System.Diagnostics.Stopwatch.GetTimestamp();
+                s_stageFrame = new BuildingStageFrame
+                {
+                    FrameCount = Time.frameCount,
+                    StartTicks = frameStartTicks,
+                    RenderGroups = renderedGroups.m_size
+                };
+                if (++s_stageStamp == int.MaxValue)
+                {
+                    Array.Clear(s_buildingSeenStamp, 0, s_buildingSeenStamp.Length);
+                    s_stageStamp = 1;
+                }
+                s_stageFrameActive = true;
+            }
+            
             // RenderGroup状態をリセット
             if (s_recordFrameDetails)
             {
@@ -163,6 +242,7 @@ namespace CS1Profiler.Harmony
                 // High Detail Pass (instanceMask != 0)
                 if (renderGroup.m_instanceMask != 0)
                 {
+                    if (recordStages) passStartTicks = System.Diagnostics.Stopwatch.GetTimestamp();
                     num &= ~renderGroup.m_instanceMask;
                     int num2 = renderGroup.m_x * 270 / 45;
                     int num3 = renderGroup.m_z * 270 / 45;
@@ -181,6 +261,11 @@ namespace CS1Profiler.Harmony
                             {
                                 // 分析記録：High Detail Pass
                                 LogBuildingRenderCall(num7, "HighDetail", renderGroup.m_x, renderGroup.m_z, num6, renderGroup.m_layersRendered, renderGroup.m_instanceMask);
+                                if (recordStages)
+                                {
+                                    s_stageFrame.HighDetailCalls++;
+                                    CountUniqueBuilding(num7);
+                                }
                                 
                                 // 元の処理
                                 __instance.m_buildings.m_buffer[(int)num7].RenderInstance(cameraInfo, num7, num | renderGroup.m_instanceMask);
@@ -194,11 +279,13 @@ namespace CS1Profiler.Harmony
                             }
                         }
                     }
+                    if (recordStages) s_stageFrame.HighDetailTicks += System.Diagnostics.Stopwatch.GetTimestamp() - passStartTicks;
                 }
                 
                 // Low Detail Pass (num != 0)
                 if (num != 0)
                 {
+                    if (recordStages) passStartTicks = System.Diagnostics.Stopwatch.GetTimestamp();
                     int num9 = renderGroup.m_z * 45 + renderGroup.m_x;
                     ushort num10 = __instance.m_buildingGrid2[num9];
                     int num11 = 0;
@@ -207,6 +294,11 @@ namespace CS1Profiler.Harmony
                     {
                         // 分析記録：Low Detail Pass
                         LogBuildingRenderCall(num10, "LowDetail", renderGroup.m_x, renderGroup.m_z, num9, renderGroup.m_layersRendered, 0);
+                        if (recordStages)
+                        {
+                            s_stageFrame.LowDetailCalls++;
+                            CountUniqueBuilding(num10);
+                        }
                         
                         // 元の処理
                         __instance.m_buildings.m_buffer[(int)num10].RenderInstance(cameraInfo, num10, num);
@@ -218,9 +310,17 @@ namespace CS1Profiler.Harmony
                             break;
                         }
                     }
+                    if (recordStages) s_stageFrame.LowDetailTicks += System.Diagnostics.Stopwatch.GetTimestamp() - passStartTicks;
                 }
             }
 
+            // RenderMeshes/RenderPropsの計測はここまで（以降はLOD描画のみ）
+            if (recordStages)
+            {
+                s_stageFrameActive = false;
+                passStartTicks = System.Diagnostics.Stopwatch.GetTimestamp();
+            }
+
             // 残りの元の処理（BuildingInfo更新等）
             int num12 = PrefabCollection<BuildingInfo>.PrefabCount();
             for (int l = 0; l < num12; l++)
@@ -281,11 +381,159 @@ namespace CS1Profiler.Harmony
             {
                 FinalizeCurrentFrame();
             }
+            
+            if (recordStages)
+            {
+                long endTicks = System.Diagnostics.Stopwatch.GetTimestamp();
+                s_stageFrame.LodTicks = endTicks - passStartTicks;
+                s_stageFrame.TotalTicks = endTicks - frameStartTicks;
+                s_stageFrames.Add(s_stageFrame);
+                if (s_stageFrames.Count >= STAGE_FRAMES_PER_FLUSH)
+                {
+                    FlushStageFrames();
+                }
+            }
 
             // Harmonyのプレフィックスとして動作し、元のメソッドをスキップ
             return false;
         }
 
+        private static void CountUniqueBuilding(ushort buildingID)
+        {
+            if (s_buildingSeenStamp[buildingID] != s_stageStamp)
+            {
+                s_buildingSeenStamp[buildingID] = s_stageStamp;
+                s_stageFrame.UniqueBuildings++;
+            }
+        }
+
+        /// <summary>
+        /// BuildingAI.RenderMeshes 計測（EndRenderingImpl置き換え中のメインスレッドのみ）
+        /// </summary>
+        public static void RenderMeshes_Prefix(out long __state)
+        {
+            __state = s_stageFrameActive ? System.Diagnostics.Stopwatch.GetTimestamp() : 0;
+        }
+
+        public static void RenderMeshes_Postfix(long __state)
+        {
+            if (__state == 0 || !s_stageFrameActive) return;
+            s_stageFrame.MeshesCalls++;
+            s_stageFrame.MeshesTicks += System.Diagnostics.Stopwatch.GetTimestamp() - __state;
+        }
+
+        /// <summary>
+        /// BuildingAI.RenderProps 計測（PropsCountは建物Infoのprop数。距離・レイヤーで描画されないものも含む）
+        /// </summary>
+        public static void RenderProps_Prefix(out long __state)
+        {
+            __state = s_stageFrameActive ? System.Diagnostics.Stopwatch.GetTimestamp() : 0;
+        }
+
+        public static void RenderProps_Postfix(BuildingAI __instance, long __state)
+        {
+            if (__state == 0 || !s_stageFrameActive) return;
+            s_stageFrame.PropsCalls++;
+            s_stageFrame.PropsTicks += System.Diagnostics.Stopwatch.GetTimestamp() - __state;
+            if (__instance.m_info != null && __instance.m_info.m_props != null)
+            {
+                s_stageFrame.PropsCount += __instance.m_info.m_props.Length;
+            }
+        }
+
+        /// <summary>
+        /// フレーム×ステージのカウンター記録を開始（外部から呼び出し可能）
+        /// </summary>
+        public static void StartStageRecording()
+        {
+            if (s_recordStages) return;
+            
+            string gameDirectory = Application.dataPath;
+            if (gameDirectory.EndsWith("_Data"))
+            {
+                gameDirectory = System.IO.Directory.GetParent(gameDirectory).FullName;
+            }
+            s_stageCsvPath = System.IO.Path.Combine(gameDirectory,
+                "CS1Profiler_BuildingStages_" + DateTime.Now.ToString("yyyyMMdd_HHmmss") + ".csv");
+            System.IO.File.WriteAllText(s_stageCsvPath, BuildingStageFrame.CsvHeader + "\n");
+            s_stageFrames.Clear();
+            s_stageFramesWritten = 0;
+            s_recordStages = true;
+            UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} Building stage recording started: {s_stageCsvPath}");
+            if (!BuildingRenderAnalysisPatcher.IsPatched)
+            {
+                UnityEngine.Debug.LogWarning($"{Constants.LOG_PREFIX} BuildingRenderAnalysis patch is not applied - no frames will be recorded until it is enabled");
+            }
+        }
+
+        /// <summary>
+        /// フレーム×ステージのカウンター記録を停止し、残りをファイルへ書き出す
+        /// </summary>
+        public static void StopStageRecording()
+        {
+            if (!s_recordStages) return;
+            
+            s_recordStages = false;
+            FlushStageFrames();
+            UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} Building stage recording stopped: {s_stageFramesWritten} frames -> {s_stageCsvPath}");
+        }
+
+        /// <summary>
+        /// 記録済みフレームをバックグラウンドの書き込みに渡す（描画スレッドではリストの差し替えのみ）
+        /// </summary>
+        private static void FlushStageFrames()
+        {
+            if (s_stageFrames.Count == 0 || s_stageCsvPath == null) return;
+            
+            var batch = s_stageFrames;
+            s_stageFrames = new List<BuildingStageFrame>(STAGE_FRAMES_PER_FLUSH);
+            s_stageFramesWritten += batch.Count;
+            lock (s_stageWriteQueue)
+            {
+                s_stageWriteQueue.Enqueue(new KeyValuePair<string, List<BuildingStageFrame>>(s_stageCsvPath, batch));
+                if (s_stageWriterActive) return;
+                s_stageWriterActive = true;
+            }
+            System.Threading.ThreadPool.QueueUserWorkItem(_ => WriteStageBatches());
+        }
+
+        /// <summary>
+        /// 書き込み待ちのバッチを順にファイルへ追記（同時に動く書き込みは常に1つ）
+        /// </summary>
+        private static void WriteStageBatches()
+        {
+            double ticksToMs = 1000.0 / System.Diagnostics.Stopwatch.Frequency;
+            while (true)
+            {
+                KeyValuePair<string, List<BuildingStageFrame>> batch;
+                lock (s_stageWriteQueue)
+                {
+                    if (s_stageWriteQueue.Count == 0)
+                    {
+                        s_stageWriterActive = false;
+                        return;
+                    }
+                    batch = s_stageWriteQueue.Dequeue();
+                }
+                
+                try
+                {
+                    var output = new StringBuilder(batch.Value.Count * 96);
+                    foreach (var frame in batch.Value)
+                    {
+                        frame.AppendCsv(output, ticksToMs);
+                    }
+                    System.IO.File.AppendAllText(batch.Key, output.ToString());
+                }
+                catch (Exception e)
+                {
+                    UnityEngine.Debug.LogError($"{Constants.LOG_PREFIX} Building stage export failed: {e.Message}");
+                }
+            }
+        }
+
+        public static bool IsRecordingStages => s_recordStages;
+
         /// <summary>
         /// Building.RenderInstance呼び出しログ（完全なコンテキスト付き）
         /// </summary>
@@ -795,6 +1043,42 @@ namespace CS1Profiler.Harmony
         public static int CollectedDataCount => s_buildingCallStats.Count;
     }
 
+    /// <summary>
+    /// 1フレーム分のEndRenderingImplステージカウンター
+    /// HighDetail/LowDetail の時間は RenderInstance（RenderMeshes・RenderProps を含む）の合計
+    /// </summary>
+    public struct BuildingStageFrame
+    {
+        public const string CsvHeader = "Frame,TimeMs,RenderGroups,HighDetailCalls,LowDetailCalls,UniqueBuildings,"
+            + "HighDetailMs,LowDetailMs,LodMs,TotalMs,MeshesCalls,MeshesMs,PropsCalls,PropsCount,PropsMs";
+
+        public int FrameCount;
+        public long StartTicks;
+        public int RenderGroups;
+        public int HighDetailCalls;
+        public int LowDetailCalls;
+        public int UniqueBuildings;
+        public long HighDetailTicks;
+        public long LowDetailTicks;
+        public long LodTicks;
+        public long TotalTicks;
+        public int MeshesCalls;
+        public long MeshesTicks;
+        public int PropsCalls;
+        public int PropsCount;
+        public long PropsTicks;
+
+        public void AppendCsv(StringBuilder output, double ticksToMs)
+        {
+            // TimeMs は MPSCLogger と同じ Stopwatch 基準（#FRAME行と突き合わせ可能）
+            output.AppendFormat(System.Globalization.CultureInfo.InvariantCulture,
+                "{0},{1:F3},{2},{3},{4},{5},{6:F4},{7:F4},{8:F4},{9:F4},{10},{11:F4},{12},{13},{14:F4}\n",
+                FrameCount, StartTicks * ticksToMs, RenderGroups, HighDetailCalls, LowDetailCalls, UniqueBuildings,
+                HighDetailTicks * ticksToMs, LowDetailTicks * ticksToMs, LodTicks * ticksToMs, TotalTicks * ticksToMs,
+                MeshesCalls, MeshesTicks * ticksToMs, PropsCalls, PropsCount, PropsTicks * ticksToMs);
+        }
+    }
+
     /// <summary>
     /// 建物呼び出し情報
     /// </summary>
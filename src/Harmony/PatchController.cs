@@ -27,6 +27,7 @@ namespace CS1Profiler.Harmony
         private static readonly GameSettingsOptimizationPatchProvider _gameSettingsOptimizationProvider = new GameSettingsOptimizationPatchProvider();
         private static readonly BuildingRenderAnalysisPatchProvider _buildingRenderAnalysisProvider = new BuildingRenderAnalysisPatchProvider();
         private static readonly BuildingRenderInstanceDetailPatchProvider _buildingRenderInstanceDetailProvider = new BuildingRenderInstanceDetailPatchProvider();
+        private static readonly PropRenderCallPatchProvider _propRenderCallProvider = new PropRenderCallPatchProvider();
 
         /// <summary>
         /// システム初期化
@@ -152,6 +153,20 @@ namespace CS1Profiler.Harmony
             }
         }
 
+        /// <summary>
+        /// Prop描画呼び出し計測パッチの有効/無効（型安全）
+        /// PropInstance.RenderInstance / Graphics.DrawMesh / MaterialPropertyBlock.Set* をMPSCトレースに記録
+        /// </summary>
+        public static bool PropRenderCallProfilingEnabled
+        {
+            get => _propRenderCallProvider.IsEnabled;
+            set 
+            {
+                if (_initialized)
+                    SetPatchEnabled(_propRenderCallProvider, value);
+            }
+        }
+
         /// <summary>
         /// RenderIt最適化パッチの有効/無効（型安全）
         /// </summary>
@@ -273,6 +288,7 @@ namespace CS1Profiler.Harmony
                 // 個別に無効化
                 PerformanceProfilingEnabled = false;
                 SimulationProfilingEnabled = false;
+                PropRenderCallProfilingEnabled = false;
                 LogSuppressionEnabled = false;
                 StartupAnalysisEnabled = false;
                 RenderItOptimizationEnabled = false;
@@ -419,6 +435,13 @@ namespace CS1Profiler.Harmony
                     UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} Simulation profiling disabled");
                 }
                 
+                // Prop描画呼び出し計測停止
+                if (_propRenderCallProvider.IsEnabled)
+                {
+                    PropRenderCallProfilingEnabled = false;
+                    UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} Prop render call profiling disabled");
+                }
+                
                 // ログ抑制停止
                 if (_logSuppressionProvider.IsEnabled)
                 {
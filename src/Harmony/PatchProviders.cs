@@ -349,6 +349,10 @@ namespace CS1Profiler.Harmony
                     patchedMethods.Add(simStepMethod);
                 }
 
+                // 各Manager（BuildingManager等）のSimulationStepImplもMPSCトレースに記録
+                // 解析ツールでシミュレーションステップあたりのManager別コストを算出するため
+                PatchManagerSimulationSteps(harmony, simType);
+
                 IsEnabled = true;
                 UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} {Name} patches enabled: {patchedMethods.Count} methods");
             }
@@ -359,6 +363,39 @@ namespace CS1Profiler.Harmony
             }
         }
 
+        /// <summary>
+        /// SimulationManagerBase派生の各ManagerのSimulationStepImpl(int)にLightweightフックを適用
+        /// </summary>
+        private void PatchManagerSimulationSteps(HarmonyLib.Harmony harmony, Type simType)
+        {
+            var prefix = new HarmonyMethod(typeof(CS1Profiler.Profiling.LightweightPerformanceHooks), "ProfilerPrefix");
+            var postfix = new HarmonyMethod(typeof(CS1Profiler.Profiling.LightweightPerformanceHooks), "ProfilerPostfix");
+            int patchCount = 0;
+
+            foreach (var type in simType.Assembly.GetTypes())
+            {
+                if (type == simType || type.IsAbstract || type.IsGenericTypeDefinition) continue;
+
+                try
+                {
+                    var method = type.GetMethod("SimulationStepImpl",
+                        BindingFlags.Instance | BindingFlags.Public | BindingFlags.NonPublic | BindingFlags.DeclaredOnly,
+                        null, new Type[] { typeof(int) }, null);
+                    if (method == null || method.GetMethodBody() == null) continue;
+
+                    harmony.Patch(method, prefix, postfix);
+                    patchedMethods.Add(method);
+                    patchCount++;
+                }
+                catch (Exception e)
+                {
+                    UnityEngine.Debug.LogWarning($"{Constants.LOG_PREFIX} Failed to patch {type.Name}.SimulationStepImpl: {e.Message}");
+                }
+            }
+
+            UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} Manager SimulationStepImpl patched: {patchCount} managers");
+        }
+
         public void Disable(HarmonyLib.Harmony harmony)
         {
             if (!IsEnabled) return;
@@ -667,6 +704,89 @@ namespace CS1Profiler.Harmony
         }
     }
 
+    /// <summary>
+    /// Prop描画呼び出し計測パッチプロバイダー
+    /// PropInstance.RenderInstance / Graphics.DrawMesh / MaterialPropertyBlock.Set* をMPSCトレースに記録
+    /// （tools/prop_batching_estimator.py でバッチング効果を推定するためのデータ収集用）
+    /// </summary>
+    public class PropRenderCallPatchProvider : IPatchProvider
+    {
+        public string Name => "PropRenderCall";
+        public bool DefaultEnabled => false; // デフォルトOFF（呼び出し回数が多く計測負荷が大きい）
+        public bool IsEnabled { get; private set; } = false;
+
+        private List<MethodInfo> patchedMethods = new List<MethodInfo>();
+
+        public void Enable(HarmonyLib.Harmony harmony)
+        {
+            if (IsEnabled) return;
+
+            try
+            {
+                UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} Enabling {Name} patches...");
+
+                PatchMethods(harmony, typeof(PropInstance), m => m.Name == "RenderInstance", BindingFlags.Public | BindingFlags.Static);
+                PatchMethods(harmony, typeof(Graphics), m => m.Name == "DrawMesh", BindingFlags.Public | BindingFlags.Static);
+                PatchMethods(harmony, typeof(MaterialPropertyBlock), m => m.Name.StartsWith("Set"), BindingFlags.Public | BindingFlags.Instance);
+
+                IsEnabled = true;
+                UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} {Name} patches enabled: {patchedMethods.Count} methods");
+            }
+            catch (Exception e)
+            {
+                UnityEngine.Debug.LogError($"{Constants.LOG_PREFIX} Failed to enable {Name} patches: {e.Message}");
+                throw;
+            }
+        }
+
+        private void PatchMethods(HarmonyLib.Harmony harmony, Type type, Func<MethodInfo, bool> filter, BindingFlags flags)
+        {
+            var prefix = new HarmonyMethod(typeof(CS1Profiler.Profiling.LightweightPerformanceHooks), "ProfilerPrefix");
+            var postfix = new HarmonyMethod(typeof(CS1Profiler.Profiling.LightweightPerformanceHooks), "ProfilerPostfix");
+
+            foreach (var method in type.GetMethods(flags | BindingFlags.DeclaredOnly))
+            {
+                // externメソッド（本体なし）やジェネリックメソッドはパッチ不可
+                if (!filter(method) || method.IsGenericMethod || method.GetMethodBody() == null) continue;
+
+                try
+                {
+                    harmony.Patch(method, prefix, postfix);
+                    patchedMethods.Add(method);
+                }
+                catch (Exception e)
+                {
+                    UnityEngine.Debug.LogWarning($"{Constants.LOG_PREFIX} Failed to patch {type.Name}.{method.Name}: {e.Message}");
+                }
+            }
+        }
+
+        public void Disable(HarmonyLib.Harmony harmony)
+        {
+            if (!IsEnabled) return;
+
+            try
+            {
+                UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} Disabling {Name} patches...");
+
+                foreach (var method in patchedMethods)
+                {
+                    harmony.Unpatch(method, typeof(CS1Profiler.Profiling.LightweightPerformanceHooks).GetMethod("ProfilerPrefix"));
+                    harmony.Unpatch(method, typeof(CS1Profiler.Profiling.LightweightPerformanceHooks).GetMethod("ProfilerPostfix"));
+                }
+
+                patchedMethods.Clear();
+                IsEnabled = false;
+                UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} {Name} patches disabled");
+            }
+            catch (Exception e)
+            {
+                UnityEngine.Debug.LogError($"{Constants.LOG_PREFIX} Failed to disable {Name} patches: {e.Message}");
+                throw;
+            }
+        }
+    }
+
     /// <summary>
     /// Building.RenderInstance詳細分析パッチプロバイダー
     /// 各処理段階の時間を細分化して測定
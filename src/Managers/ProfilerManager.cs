@@ -1,4 +1,6 @@
 ﻿using System;
+using System.IO;
+using System.Threading;
 using UnityEngine;
 
 // 明示的に追加（同じ名前空間だが必要な場合）
@@ -87,6 +89,9 @@ namespace CS1Profiler.Managers
 
         void Update()
         {
+            // MPSCトレースにフレーム境界を記録（計測停止中は即座にリターン）
+            CS1Profiler.Profiling.MPSCLogger.MarkFrame(Time.frameCount);
+
             // 要件対応: F12キーでTop100をCSV出力
             if (Input.GetKeyDown(KeyCode.F12))
             {
@@ -151,6 +156,43 @@ namespace CS1Profiler.Managers
                 csvManager.ExportToCSV();
             }
             */
+            ExportAllDataSnapshot();
+        }
+
+        /// <summary>
+        /// PerformanceProfilerの累積値スナップショットを CS1Profiler_All_yyyyMMdd_HHmmss.csv に保存
+        /// （tools/cumulative_snapshot_analyzer.py で区間ごとの差分を解析）
+        /// 集計の読み出しのみメインスレッドで行い、ファイル書き込みはスレッドプールで行う
+        /// </summary>
+        private void ExportAllDataSnapshot()
+        {
+            try
+            {
+                string csv = CS1Profiler.Profiling.PerformanceProfiler.GetAllDataCSV();
+                string gameDirectory = Application.dataPath;
+                if (gameDirectory.EndsWith("_Data"))
+                {
+                    gameDirectory = Directory.GetParent(gameDirectory).FullName;
+                }
+                string path = Path.Combine(gameDirectory,
+                    "CS1Profiler_All_" + DateTime.Now.ToString("yyyyMMdd_HHmmss") + ".csv");
+
+                ThreadPool.QueueUserWorkItem(_ =>
+                {
+                    try
+                    {
+                        File.WriteAllText(path, csv);
+                    }
+                    catch (Exception e)
+                    {
+                        Debug.LogError($"{Constants.LOG_PREFIX} All CSV snapshot write error: {e.Message}");
+                    }
+                });
+            }
+            catch (Exception e)
+            {
+                Debug.LogError($"{Constants.LOG_PREFIX} All CSV snapshot error: {e.Message}");
+            }
         }
 
         public string GetCsvPath()
@@ -1,5 +1,8 @@
-﻿using System.Diagnostics;
+﻿using System;
+using System.Collections.Generic;
+using System.Diagnostics;
 using System.Reflection;
+using System.Threading;
 using CS1Profiler.Harmony;
 using CS1Profiler.Core;
 
@@ -12,31 +15,168 @@ namespace CS1Profiler.Profiling
     /// </summary>
     public static class LightweightPerformanceHooks
     {
+        /// <summary>
+        /// 1/Nサンプリングモード（PropInstance.RenderInstanceなど高頻度メソッドの計測オーバーヘッド削減）
+        /// 有効時はメソッドごとに呼び出し頻度からNを決め、約N回に1回だけ計測してCSVのCount列に重みNを記録する
+        /// 解析ツールはCount列で呼び出し数・合計時間を拡大する（TotalImpactMsは不偏推定）
+        /// ストリーム送信中はプロトコルに重みがないため全数記録
+        /// </summary>
+        public static bool SamplingEnabled = false;
+        
+        /// <summary>
+        /// メソッドあたりの目標計測数（回/秒）。これを超える頻度で呼ばれるメソッドを間引く
+        /// </summary>
+        public static int TargetSamplesPerSecond = 1000;
+        
+        /// <summary>
+        /// Nの上限（Nは2の累乗で、この値を超えない）
+        /// </summary>
+        public static int MaxSamplingInterval = 1024;
+        
+        // Nの再計算間隔（計測した呼び出しのみで判定するため、間引かれた呼び出しのコストは増えない）
+        private const int SAMPLING_WINDOW_MS = 500;
+        private static readonly long _samplingWindowTicks = Stopwatch.Frequency * SAMPLING_WINDOW_MS / 1000;
+        
+        // メソッド別サンプラー（コピーオンライト: 読み取りはロックなし、初回の追加時のみロックして差し替え）
+        private static volatile Dictionary<MethodBase, MethodSampler> _samplers = new Dictionary<MethodBase, MethodSampler>();
+        private static readonly object _samplersLock = new object();
+        
+        /// <summary>
+        /// プレフィックス→ポストフィックスの受け渡し（StartTicks = 0 は計測しない呼び出し）
+        /// </summary>
+        public struct SampledCall
+        {
+            public long StartTicks;
+            public int Weight;
+        }
+        
+        /// <summary>
+        /// メソッド別の1/Nサンプリング状態
+        /// </summary>
+        private sealed class MethodSampler
+        {
+            public int Countdown = 1;          // デクリメントして0になった呼び出しを計測
+            public int Interval = 1;           // 現在のN
+            public int CountdownInterval = 1;  // 現在のカウントダウンを決めたときのN（= 次に計測する呼び出しの重み）
+            public long WindowStartTicks;
+            public long WindowCalls;           // 窓内の推定呼び出し数（計測した呼び出しの重みの合計）
+            public uint RandomState;           // xorshift32の状態（0以外）
+            
+            public MethodSampler(int seed)
+            {
+                RandomState = (uint)seed | 1u;
+            }
+            
+            /// <summary>
+            /// 計測する呼び出しで呼ぶ（カウントダウンが0になったスレッドだけが通るため、ロック不要）
+            /// 戻り値: この呼び出しの重み
+            /// </summary>
+            public int OnSampled(long nowTicks)
+            {
+                int weight = CountdownInterval;
+                WindowCalls += weight;
+                if (WindowStartTicks == 0)
+                {
+                    WindowStartTicks = nowTicks;
+                }
+                else if (nowTicks - WindowStartTicks >= _samplingWindowTicks)
+                {
+                    double callsPerSecond = WindowCalls * (double)Stopwatch.Frequency / (nowTicks - WindowStartTicks);
+                    Interval = NextInterval(callsPerSecond);
+                    WindowStartTicks = nowTicks;
+                    WindowCalls = 0;
+                }
+                
+                // 次の計測までの呼び出し数を [1, 2N-1] の一様乱数にする
+                // （平均N回に1回 = 各呼び出しの計測確率1/N。固定間隔だと周期的な呼び出しパターンと干渉する）
+                // 0になってから次のカウントダウンを加えるまでに他スレッドが負へ進めた分は次の間隔に繰り越し、
+                // 間隔を丸ごと使い切った場合はこの呼び出しの重みに加える（呼び出し数を取りこぼさない）
+                int interval = Interval;
+                CountdownInterval = interval;
+                while (Interlocked.Add(ref Countdown, NextCountdown(interval)) <= 0)
+                {
+                    weight += interval;
+                }
+                return weight;
+            }
+            
+            private int NextCountdown(int interval)
+            {
+                if (interval <= 1) return 1;
+                RandomState ^= RandomState << 13;
+                RandomState ^= RandomState >> 17;
+                RandomState ^= RandomState << 5;
+                return 1 + (int)(RandomState % (uint)(2 * interval - 1));
+            }
+        }
+        
+        /// <summary>
+        /// 呼び出し頻度から次のNを決める（目標計測数を下回る最小の2の累乗、上限MaxSamplingInterval）
+        /// </summary>
+        private static int NextInterval(double callsPerSecond)
+        {
+            double target = Math.Max(1, TargetSamplesPerSecond);
+            int interval = 1;
+            while (interval * 2 <= MaxSamplingInterval && callsPerSecond / interval > target)
+            {
+                interval *= 2;
+            }
+            return interval;
+        }
+        
+        private static MethodSampler GetSampler(MethodBase method)
+        {
+            MethodSampler sampler;
+            if (_samplers.TryGetValue(method, out sampler)) return sampler;
+            
+            lock (_samplersLock)
+            {
+                if (_samplers.TryGetValue(method, out sampler)) return sampler;
+                var samplers = new Dictionary<MethodBase, MethodSampler>(_samplers);
+                sampler = new MethodSampler(method.GetHashCode());
+                samplers[method] = sampler;
+                _samplers = samplers;
+                return sampler;
+            }
+        }
+        
         /// <summary>
         /// 超軽量プレフィックス（計測開始）
-        /// 返り値: タイムスタンプ（long）
+        /// 返り値: タイムスタンプと重み（SampledCall）
         /// </summary>
-        public static void ProfilerPrefix(MethodBase __originalMethod, out long __state)
+        public static void ProfilerPrefix(MethodBase __originalMethod, out SampledCall __state)
         {
             // PatchController.PerformanceProfilingEnabled の状態チェック（高速）
             if (!PatchController.PerformanceProfilingEnabled)
             {
-                __state = 0;
+                __state = default(SampledCall);
                 return; // 即座にリターン（分岐オーバーヘッドのみ）
             }
             
+            int weight = 1;
+            if (SamplingEnabled && MPSCLogger.SupportsWeightedEvents)
+            {
+                MethodSampler sampler = GetSampler(__originalMethod);
+                if (Interlocked.Decrement(ref sampler.Countdown) != 0)
+                {
+                    __state = default(SampledCall);
+                    return; // 間引き（タイムスタンプ取得・エンキューなし）
+                }
+                weight = sampler.OnSampled(Stopwatch.GetTimestamp());
+            }
+            
             // Stopwatch.GetTimestamp()のみ（最高精度、最軽量）
-            __state = Stopwatch.GetTimestamp();
+            __state = new SampledCall { StartTicks = Stopwatch.GetTimestamp(), Weight = weight };
         }
         
         /// <summary>
         /// 超軽量ポストフィックス（計測終了→エンキュー）
         /// メソッド名文字列化はConsumer側で実行
         /// </summary>
-        public static void ProfilerPostfix(MethodBase __originalMethod, long __state)
+        public static void ProfilerPostfix(MethodBase __originalMethod, SampledCall __state)
         {
-            // 早期リターン（無効状態またはstartTicks=0）
-            if (__state == 0 || !PatchController.PerformanceProfilingEnabled)
+            // 早期リターン（無効状態・間引き対象またはstartTicks=0）
+            if (__state.StartTicks == 0 || !PatchController.PerformanceProfilingEnabled)
                 return;
             
             // 終了時刻取得（高精度）
@@ -45,7 +185,7 @@ namespace CS1Profiler.Profiling
             // 💡重要最適化：文字列化をConsumer側に移譲
             // Producer側ではMethodBaseの型情報のみ渡す
             // （文字列化・反射処理は絶対しない）
-            MPSCLogger.EnqueueMethod(__originalMethod, __state, endTicks);
+            MPSCLogger.EnqueueMethod(__originalMethod, __state.StartTicks, endTicks, __state.Weight);
         }
     }
 }
@@ -1,5 +1,6 @@
 ﻿using System;
 using System.Collections.Generic;
+using System.Globalization;
 using System.IO;
 using System.Threading;
 using System.Reflection;
@@ -21,6 +22,17 @@ namespace CS1Profiler.Profiling
         private static volatile int _writeIndex = 0;
         private static volatile int _readIndex = 0;
         
+        // オーバーラン検出（未読イベントを上書きせずDropしてカウント）
+        private static volatile int _droppedCount = 0;
+        
+        // シーケンス統計行の出力間隔（Consumer側）
+        private const int SEQUENCE_STATS_INTERVAL_MS = 1000;
+        
+        // メモリサンプル（#MEM行）の出力間隔（GC回数が増えたフレームは間隔に関係なく出力）
+        private const int MEMORY_SAMPLE_INTERVAL_MS = 100;
+        private static int _lastGcCount = -1;
+        private static long _lastMemorySampleTicks = 0;
+        
         // 専用Writer thread
         private static Thread _writerThread;
         private static volatile bool _running = false;
@@ -33,6 +45,28 @@ namespace CS1Profiler.Profiling
         // 出力先
         private static string _outputPath;
         
+        /// <summary>
+        /// ストリーム送信先 "host:port"（tools/ingest_server.py）。null/空ならCSVファイルに出力
+        /// 接続できない場合はCSV出力にフォールバックする（StartWriter前に設定）
+        /// </summary>
+        public static string StreamEndpoint = null;
+        
+        /// <summary>
+        /// ストリーム送信にTCPではなくUDPを使用
+        /// </summary>
+        public static bool StreamUseUdp = false;
+        
+        // ストリーム送信中（プロトコルに重みがないため、LightweightPerformanceHooksは間引かずに全数記録する）
+        private static volatile bool _streaming = false;
+        
+        /// <summary>
+        /// 1/Nサンプリングの重みを記録できる出力か（CSV出力時のみtrue）
+        /// </summary>
+        public static bool SupportsWeightedEvents
+        {
+            get { return _running && !_streaming; }
+        }
+        
         /// <summary>
         /// ログイベント構造体（軽量）
         /// </summary>
@@ -41,6 +75,11 @@ namespace CS1Profiler.Profiling
             public long StartTicks;
             public long EndTicks;
             public MethodBase MethodInfo;  // ★文字列ではなくMethodBase（Producer側は文字列化しない）
+            public int FrameCount;         // >0 の場合はフレーム境界マーカー（#FRAME行）
+            public int ThreadId;           // 記録スレッド（メイン/シミュレーションのレーン分離用）
+            public long HeapBytes;         // >0 の場合はメモリサンプル（#MEM行）
+            public int GcCount;            // メモリサンプル時点の累積GC回数
+            public int Weight;             // 1/Nサンプリングの重み N（0は全数記録 = 1）
         }
         
         /// <summary>
@@ -53,6 +92,7 @@ namespace CS1Profiler.Profiling
                 if (_running) return;
                 
                 _running = true;
+                _streaming = !string.IsNullOrEmpty(StreamEndpoint);
                 
                 // 日時ベースのファイル名（MPSCではない通常のファイル名）
                 string timestamp = DateTime.Now.ToString("yyyyMMdd_HHmmss");
@@ -66,7 +106,8 @@ namespace CS1Profiler.Profiling
                 };
                 _writerThread.Start();
                 
-                Debug.Log(string.Format($"{Constants.LOG_PREFIX} Writer thread started. Output: {0}", fileName));
+                string output = string.IsNullOrEmpty(StreamEndpoint) ? fileName : StreamEndpoint;
+                Debug.Log($"{Constants.LOG_PREFIX} Writer thread started. Output: {output}");
             }
         }
         
@@ -86,6 +127,8 @@ namespace CS1Profiler.Profiling
                 // ★Ring Bufferクリア（残データ書き込み防止）
                 _writeIndex = 0;
                 _readIndex = 0;
+                _droppedCount = 0;
+                _lastGcCount = -1;
                 
                 if (_writerThread != null && _writerThread.IsAlive)
                 {
@@ -105,6 +148,15 @@ namespace CS1Profiler.Profiling
         /// Producer側では文字列化を一切行わない
         /// </summary>
         public static void EnqueueMethod(MethodBase methodInfo, long startTicks, long endTicks)
+        {
+            EnqueueMethod(methodInfo, startTicks, endTicks, 1);
+        }
+        
+        /// <summary>
+        /// 超軽量：Producer側エンキュー（1/Nサンプリングの重み付き）
+        /// weight = N の場合、1件でN回分の呼び出しを代表する（CSVのCount列）
+        /// </summary>
+        public static void EnqueueMethod(MethodBase methodInfo, long startTicks, long endTicks, int weight)
         {
             // ★即座停止チェック（running + forceStop）
             if (!_running || _forceStop) return;
@@ -127,15 +179,17 @@ namespace CS1Profiler.Profiling
             }
             
             // Lock-free Ring Buffer書き込み（.NET 3.5対応）
-            int currentWrite = System.Threading.Interlocked.Increment(ref _writeIndex) - 1;
-            int bufferIndex = currentWrite & (RING_BUFFER_SIZE - 1); // 高速ビット演算
+            int bufferIndex;
+            if (!TryReserveSlot(out bufferIndex)) return; // オーバーラン時はDrop
             
             // Ring Bufferに直接書き込み（競合なし）
             _ringBuffer[bufferIndex] = new LogEvent
             {
                 MethodInfo = methodInfo,  // ★MethodBaseをそのまま渡す（文字列化なし）
                 StartTicks = startTicks,
-                EndTicks = endTicks
+                EndTicks = endTicks,
+                ThreadId = Thread.CurrentThread.ManagedThreadId,
+                Weight = weight
             };
         }
         
@@ -149,28 +203,214 @@ namespace CS1Profiler.Profiling
             if (!_running || _forceStop) return;
             
             // Lock-free Ring Buffer書き込み
-            int currentWrite = System.Threading.Interlocked.Increment(ref _writeIndex) - 1;
-            int bufferIndex = currentWrite & (RING_BUFFER_SIZE - 1);
+            int bufferIndex;
+            if (!TryReserveSlot(out bufferIndex)) return;
             
             _ringBuffer[bufferIndex] = new LogEvent
             {
                 MethodInfo = null,  // 文字列版では後でmethodNameを使用
                 StartTicks = startTicks,
-                EndTicks = endTicks
+                EndTicks = endTicks,
+                ThreadId = Thread.CurrentThread.ManagedThreadId
             };
         }
         
+        /// <summary>
+        /// フレーム境界マーカーをエンキュー（メインスレッドのUpdateから毎フレーム呼び出し）
+        /// 解析ツールは#FRAME行でイベントをフレームに割り当て、フレーム範囲の切り出しに使用する
+        /// #FRAME行のThreadIdはメインスレッドの識別にも使用する
+        /// </summary>
+        public static void MarkFrame(int frameCount)
+        {
+            if (!_running || _forceStop) return;
+            
+            int bufferIndex;
+            if (!TryReserveSlot(out bufferIndex)) return;
+            
+            long now = System.Diagnostics.Stopwatch.GetTimestamp();
+            _ringBuffer[bufferIndex] = new LogEvent
+            {
+                MethodInfo = null,
+                StartTicks = now,
+                EndTicks = now,
+                FrameCount = frameCount,
+                ThreadId = Thread.CurrentThread.ManagedThreadId
+            };
+            
+            SampleMemory(now);
+        }
+        
+        /// <summary>
+        /// ヒープサイズと累積GC回数のサンプルをエンキュー（MarkFrameから呼び出し）
+        /// GC回数が増えた場合は毎回、それ以外は MEMORY_SAMPLE_INTERVAL_MS ごとに出力する
+        /// フレーム境界と同じ時刻で記録するため、GC回数の増加は直前のフレーム内で発生したことになる
+        /// </summary>
+        private static void SampleMemory(long now)
+        {
+            int gcCount = GC.CollectionCount(0);
+            long intervalTicks = System.Diagnostics.Stopwatch.Frequency * MEMORY_SAMPLE_INTERVAL_MS / 1000;
+            if (gcCount == _lastGcCount && now - _lastMemorySampleTicks < intervalTicks) return;
+            
+            int bufferIndex;
+            if (!TryReserveSlot(out bufferIndex)) return;
+            
+            _ringBuffer[bufferIndex] = new LogEvent
+            {
+                MethodInfo = null,
+                StartTicks = now,
+                EndTicks = now,
+                HeapBytes = Math.Max(1L, GC.GetTotalMemory(false)),
+                GcCount = gcCount,
+                ThreadId = Thread.CurrentThread.ManagedThreadId
+            };
+            _lastGcCount = gcCount;
+            _lastMemorySampleTicks = now;
+        }
+        
+        /// <summary>
+        /// Ring Bufferのスロットを予約（Lock-free CAS）
+        /// Writer threadが追いついていない場合は未読イベントを上書きせずDropを記録
+        /// </summary>
+        private static bool TryReserveSlot(out int bufferIndex)
+        {
+            while (true)
+            {
+                int currentWrite = _writeIndex;
+                if (currentWrite - _readIndex >= RING_BUFFER_SIZE)
+                {
+                    System.Threading.Interlocked.Increment(ref _droppedCount);
+                    bufferIndex = 0;
+                    return false;
+                }
+                
+                if (System.Threading.Interlocked.CompareExchange(ref _writeIndex, currentWrite + 1, currentWrite) == currentWrite)
+                {
+                    bufferIndex = currentWrite & (RING_BUFFER_SIZE - 1); // 高速ビット演算
+                    return true;
+                }
+            }
+        }
+        
+        /// <summary>
+        /// シーケンス統計行を出力（Consumer側）
+        /// 形式: #SEQ,TimeMs,Enqueued,Dropped,Written（TimeMsはStartTime/EndTimeと同じ時計）
+        /// 解析ツールは連続する2行の差分から区間ごとのロス率を算出する
+        /// </summary>
+        private static void WriteSequenceStats(StreamWriter writer, long nowTicks, long writtenCount)
+        {
+            double nowMs = nowTicks / (double)System.Diagnostics.Stopwatch.Frequency * 1000.0;
+            writer.WriteLine(string.Format(CultureInfo.InvariantCulture, "#SEQ,{0:F3},{1},{2},{3}",
+                nowMs,
+                _writeIndex,
+                _droppedCount,
+                writtenCount));
+        }
+        
+        /// <summary>
+        /// メソッド名を "Namespace.Class.Method" 形式に変換（Consumer側のみ）
+        /// </summary>
+        internal static string FormatMethodName(MethodBase methodInfo)
+        {
+            string namespaceName = methodInfo.DeclaringType?.Namespace ?? "Unknown";
+            string className = methodInfo.DeclaringType?.Name ?? "Unknown";
+            string methodLocalName = methodInfo.Name ?? "Unknown";
+            return string.Format("{0}.{1}.{2}", namespaceName, className, methodLocalName);
+        }
+        
+        /// <summary>
+        /// ストリーム送信ループ（Consumer側）
+        /// Ring Bufferをまとめて読み出してバイナリバッチで送信し、ファイルI/Oを行わない
+        /// 送信エラー時はfalseを返し、呼び出し側でCSV出力に切り替える
+        /// </summary>
+        private static bool StreamWriterMain(MPSCStreamSender sender)
+        {
+            try
+            {
+                long writtenCount = 0;
+                long statsIntervalTicks = System.Diagnostics.Stopwatch.Frequency * SEQUENCE_STATS_INTERVAL_MS / 1000;
+                long lastStatsTicks = System.Diagnostics.Stopwatch.GetTimestamp();
+                sender.SendSequence(lastStatsTicks, _writeIndex, _droppedCount, writtenCount);
+                
+                while (_running && !_forceStop)
+                {
+                    // 読み出せる分をまとめて処理
+                    int available = _writeIndex - _readIndex;
+                    for (int i = 0; i < available && !_forceStop; i++)
+                    {
+                        LogEvent logEvent = _ringBuffer[_readIndex & (RING_BUFFER_SIZE - 1)];
+                        _readIndex++;
+                        
+                        if (logEvent.FrameCount > 0)
+                        {
+                            sender.AddFrame(logEvent.FrameCount, logEvent.ThreadId, logEvent.StartTicks);
+                        }
+                        else if (logEvent.HeapBytes > 0)
+                        {
+                            // メモリサンプルはストリームプロトコル未対応（CSV出力時のみ#MEM行として記録）
+                        }
+                        else
+                        {
+                            sender.AddEvent(logEvent.MethodInfo, logEvent.ThreadId, logEvent.StartTicks, logEvent.EndTicks);
+                        }
+                        writtenCount++;
+                    }
+                    
+                    if (_forceStop) break;
+                    
+                    if (available == 0)
+                    {
+                        // 空になったら送信してからCPU使用率軽減
+                        sender.Flush();
+                        Thread.Sleep(10);
+                    }
+                    
+                    long nowTicks = System.Diagnostics.Stopwatch.GetTimestamp();
+                    if (nowTicks - lastStatsTicks >= statsIntervalTicks)
+                    {
+                        sender.SendSequence(nowTicks, _writeIndex, _droppedCount, writtenCount);
+                        lastStatsTicks = nowTicks;
+                    }
+                }
+                
+                Debug.Log($"{Constants.LOG_PREFIX} MPSC stream sender completed");
+                return true;
+            }
+            catch (Exception e)
+            {
+                Debug.LogError($"{Constants.LOG_PREFIX} MPSC stream error, falling back to CSV: {e.Message}");
+                return false;
+            }
+            finally
+            {
+                sender.Dispose();
+            }
+        }
+        
         /// <summary>
         /// Writer thread main loop（Consumer側）
         /// </summary>
         private static void WriterThreadMain()
         {
+            // ストリーム送信先が設定されていれば優先（接続失敗・送信エラー時はCSV出力）
+            if (!string.IsNullOrEmpty(StreamEndpoint))
+            {
+                MPSCStreamSender sender = MPSCStreamSender.TryConnect(StreamEndpoint, StreamUseUdp);
+                if (sender != null && StreamWriterMain(sender)) return;
+                _streaming = false;
+            }
+            
             try
             {
                 using (var writer = new StreamWriter(_outputPath, false))
                 {
-                    // CSVヘッダー（日時列追加）
-                    writer.WriteLine("MethodName,Duration(ms),StartTime,EndTime,Timestamp");
+                    // CSVヘッダー（日時列・スレッドID列・サンプリング重みのCount列追加）
+                    writer.WriteLine("MethodName,Duration(ms),StartTime,EndTime,Timestamp,ThreadId,Count");
+                    
+                    // シーケンス統計（オーバーラン検出用）
+                    long writtenCount = 0;
+                    long statsIntervalTicks = System.Diagnostics.Stopwatch.Frequency * SEQUENCE_STATS_INTERVAL_MS / 1000;
+                    long lastStatsTicks = System.Diagnostics.Stopwatch.GetTimestamp();
+                    WriteSequenceStats(writer, lastStatsTicks, writtenCount);
                     
                     // ★即座停止対応：forceStopで即座終了
                     while (_running && !_forceStop)
@@ -194,7 +434,21 @@ namespace CS1Profiler.Profiling
                         // ★強制停止チェック
                         if (_forceStop) break;
                         
-                        if (hasEvent)
+                        if (hasEvent && logEvent.FrameCount > 0)
+                        {
+                            // フレーム境界マーカー（形式: #FRAME,TimeMs,FrameCount,ThreadId）
+                            double frameTimeMs = logEvent.StartTicks / (double)System.Diagnostics.Stopwatch.Frequency * 1000.0;
+                            writer.WriteLine(string.Format(CultureInfo.InvariantCulture, "#FRAME,{0:F3},{1},{2}", frameTimeMs, logEvent.FrameCount, logEvent.ThreadId));
+                            writtenCount++;
+                        }
+                        else if (hasEvent && logEvent.HeapBytes > 0)
+                        {
+                            // メモリサンプル（形式: #MEM,TimeMs,HeapBytes,GcCount）
+                            double sampleTimeMs = logEvent.StartTicks / (double)System.Diagnostics.Stopwatch.Frequency * 1000.0;
+                            writer.WriteLine(string.Format(CultureInfo.InvariantCulture, "#MEM,{0:F3},{1},{2}", sampleTimeMs, logEvent.HeapBytes, logEvent.GcCount));
+                            writtenCount++;
+                        }
+                        else if (hasEvent)
                         {
                             // タイマー精度でミリ秒計算
                             double durationMs = (logEvent.EndTicks - logEvent.StartTicks) / (double)System.Diagnostics.Stopwatch.Frequency * 1000.0;
@@ -204,10 +458,7 @@ namespace CS1Profiler.Profiling
                             if (logEvent.MethodInfo != null)
                             {
                                 // MethodBaseから文字列化（Consumer側のみ）
-                                string namespaceName = logEvent.MethodInfo.DeclaringType?.Namespace ?? "Unknown";
-                                string className = logEvent.MethodInfo.DeclaringType?.Name ?? "Unknown";
-                                string methodLocalName = logEvent.MethodInfo.Name ?? "Unknown";
-                                methodName = string.Format("{0}.{1}.{2}", namespaceName, className, methodLocalName);
+                                methodName = FormatMethodName(logEvent.MethodInfo);
                             }
                             else
                             {
@@ -231,20 +482,32 @@ namespace CS1Profiler.Profiling
                             double startTimeMs = logEvent.StartTicks / (double)System.Diagnostics.Stopwatch.Frequency * 1000.0;
                             double endTimeMs = logEvent.EndTicks / (double)System.Diagnostics.Stopwatch.Frequency * 1000.0;
                             
-                            writer.WriteLine(string.Format("{0},{1:F3},{2:F3},{3:F3},{4}",
+                            writer.WriteLine(string.Format(CultureInfo.InvariantCulture, "{0},{1:F3},{2:F3},{3:F3},{4},{5},{6}",
                                 cachedMethodName,
                                 durationMs,
                                 startTimeMs,
                                 endTimeMs,
-                                now.ToString("yyyy-MM-dd HH:mm:ss.fff")));
+                                now.ToString("yyyy-MM-dd HH:mm:ss.fff", CultureInfo.InvariantCulture),
+                                logEvent.ThreadId,
+                                Math.Max(1, logEvent.Weight)));
+                            writtenCount++;
                         }
                         else
                         {
                             // CPU使用率軽減
                             Thread.Sleep(10);
                         }
+                        
+                        // 定期的にシーケンス・Dropカウンターを出力
+                        long nowTicks = System.Diagnostics.Stopwatch.GetTimestamp();
+                        if (nowTicks - lastStatsTicks >= statsIntervalTicks)
+                        {
+                            WriteSequenceStats(writer, nowTicks, writtenCount);
+                            lastStatsTicks = nowTicks;
+                        }
                     }
                     
+                    // 停止時はStopWriterがカウンターをリセット済みのため最終統計行は出力しない
                     writer.Flush();
                 }
                 
@@ -0,0 +1,225 @@
+﻿using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Net.Sockets;
+using System.Reflection;
+using System.Text;
+using UnityEngine;
+using CS1Profiler.Core;
+
+namespace CS1Profiler.Profiling
+{
+    /// <summary>
+    /// MPSCLoggerのストリーム送信（Consumer側専用）
+    /// tools/ingest_server.py へ長さ付きバイナリバッチをTCP/UDPで送信する
+    /// メッセージ = uint32 長さ + uint8 種別 + 本体（リトルエンディアン、形式はingest_server.py参照）
+    /// </summary>
+    internal sealed class MPSCStreamSender : IDisposable
+    {
+        private const int PROTOCOL_VERSION = 1;
+        private const byte MSG_HELLO = 0;
+        private const byte MSG_METHOD = 1;
+        private const byte MSG_EVENTS = 2;
+        private const byte MSG_FRAMES = 3;
+        private const byte MSG_SEQ = 4;
+        
+        private const int EVENT_SIZE = 24;   // int32 メソッドID, int32 スレッドID, int64 開始tick, int64 終了tick
+        private const int FRAME_SIZE = 16;   // int32 フレーム番号, int32 スレッドID, int64 tick
+        private const int HEADER_SIZE = 5;
+        private const int MAX_EVENTS_PER_BATCH = 2048;  // UDPデータグラムに収まるサイズ（48KB）
+        private const int MAX_FRAMES_PER_BATCH = 256;
+        
+        private readonly TcpClient _tcpClient;
+        private readonly Stream _stream;
+        private readonly UdpClient _udpClient;
+        
+        // メソッドID（Consumer側のみ使用）
+        private readonly Dictionary<MethodBase, int> _methodIds = new Dictionary<MethodBase, int>();
+        private readonly Dictionary<string, int> _legacyIds = new Dictionary<string, int>();
+        
+        private readonly byte[] _eventBuffer = new byte[HEADER_SIZE + MAX_EVENTS_PER_BATCH * EVENT_SIZE];
+        private int _eventCount = 0;
+        private readonly byte[] _frameBuffer = new byte[HEADER_SIZE + MAX_FRAMES_PER_BATCH * FRAME_SIZE];
+        private int _frameCount = 0;
+        private readonly byte[] _scratch = new byte[64];
+        
+        private MPSCStreamSender(TcpClient tcpClient, UdpClient udpClient)
+        {
+            _tcpClient = tcpClient;
+            _udpClient = udpClient;
+            if (tcpClient != null)
+            {
+                tcpClient.NoDelay = true;
+                _stream = new BufferedStream(tcpClient.GetStream(), 64 * 1024);
+            }
+        }
+        
+        /// <summary>
+        /// 送信先 "host:port" に接続（失敗時はnullを返し、呼び出し側はCSV出力にフォールバック）
+        /// </summary>
+        public static MPSCStreamSender TryConnect(string endpoint, bool udp)
+        {
+            try
+            {
+                int separator = endpoint.LastIndexOf(':');
+                string host = endpoint.Substring(0, separator);
+                int port = int.Parse(endpoint.Substring(separator + 1));
+                
+                MPSCStreamSender sender;
+                if (udp)
+                {
+                    var udpClient = new UdpClient();
+                    udpClient.Connect(host, port);
+                    sender = new MPSCStreamSender(null, udpClient);
+                }
+                else
+                {
+                    sender = new MPSCStreamSender(new TcpClient(host, port), null);
+                }
+                
+                int length = PutInt64(sender._scratch, HEADER_SIZE, System.Diagnostics.Stopwatch.Frequency);
+                length = PutInt32(sender._scratch, length, PROTOCOL_VERSION);
+                sender.Send(sender._scratch, MSG_HELLO, length);
+                return sender;
+            }
+            catch (Exception e)
+            {
+                Debug.LogWarning($"{Constants.LOG_PREFIX} Stream endpoint {endpoint} unavailable: {e.Message}");
+                return null;
+            }
+        }
+        
+        /// <summary>
+        /// メソッド呼び出しイベントを追加（初出のメソッドは名前定義を先に送信）
+        /// </summary>
+        public void AddEvent(MethodBase methodInfo, int threadId, long startTicks, long endTicks)
+        {
+            int methodId = GetMethodId(methodInfo);
+            int offset = HEADER_SIZE + _eventCount * EVENT_SIZE;
+            offset = PutInt32(_eventBuffer, offset, methodId);
+            offset = PutInt32(_eventBuffer, offset, threadId);
+            offset = PutInt64(_eventBuffer, offset, startTicks);
+            PutInt64(_eventBuffer, offset, endTicks);
+            
+            if (++_eventCount == MAX_EVENTS_PER_BATCH) Flush();
+        }
+        
+        /// <summary>
+        /// フレーム境界マーカーを追加
+        /// </summary>
+        public void AddFrame(int frameCount, int threadId, long ticks)
+        {
+            int offset = HEADER_SIZE + _frameCount * FRAME_SIZE;
+            offset = PutInt32(_frameBuffer, offset, frameCount);
+            offset = PutInt32(_frameBuffer, offset, threadId);
+            PutInt64(_frameBuffer, offset, ticks);
+            
+            if (++_frameCount == MAX_FRAMES_PER_BATCH) Flush();
+        }
+        
+        /// <summary>
+        /// シーケンス統計（#SEQ行と同じ累積カウンター）を送信
+        /// </summary>
+        public void SendSequence(long nowTicks, long enqueued, long dropped, long written)
+        {
+            int length = PutInt64(_scratch, HEADER_SIZE, nowTicks);
+            length = PutInt64(_scratch, length, enqueued);
+            length = PutInt64(_scratch, length, dropped);
+            length = PutInt64(_scratch, length, written);
+            Send(_scratch, MSG_SEQ, length);
+        }
+        
+        /// <summary>
+        /// バッファ済みのフレーム・イベントを送信（フレームを先に送り、サーバー側のフレーム割り当てを確定させる）
+        /// </summary>
+        public void Flush()
+        {
+            if (_frameCount > 0)
+            {
+                Send(_frameBuffer, MSG_FRAMES, HEADER_SIZE + _frameCount * FRAME_SIZE);
+                _frameCount = 0;
+            }
+            if (_eventCount > 0)
+            {
+                Send(_eventBuffer, MSG_EVENTS, HEADER_SIZE + _eventCount * EVENT_SIZE);
+                _eventCount = 0;
+            }
+            if (_stream != null) _stream.Flush();
+        }
+        
+        public void Dispose()
+        {
+            try
+            {
+                Flush();
+            }
+            catch (Exception)
+            {
+                // 切断済みの場合は残りを破棄
+            }
+            if (_tcpClient != null) _tcpClient.Close();
+            if (_udpClient != null) _udpClient.Close();
+        }
+        
+        private int GetMethodId(MethodBase methodInfo)
+        {
+            int methodId;
+            if (methodInfo != null)
+            {
+                if (_methodIds.TryGetValue(methodInfo, out methodId)) return methodId;
+                methodId = _methodIds.Count + _legacyIds.Count;
+                _methodIds[methodInfo] = methodId;
+                SendMethodName(methodId, MPSCLogger.FormatMethodName(methodInfo));
+                return methodId;
+            }
+            
+            // 旧互換性（文字列版）
+            if (_legacyIds.TryGetValue("LegacyStringMethod", out methodId)) return methodId;
+            methodId = _methodIds.Count + _legacyIds.Count;
+            _legacyIds["LegacyStringMethod"] = methodId;
+            SendMethodName(methodId, "LegacyStringMethod");
+            return methodId;
+        }
+        
+        private void SendMethodName(int methodId, string methodName)
+        {
+            byte[] name = Encoding.UTF8.GetBytes(methodName);
+            byte[] message = new byte[HEADER_SIZE + 4 + name.Length];
+            PutInt32(message, HEADER_SIZE, methodId);
+            Buffer.BlockCopy(name, 0, message, HEADER_SIZE + 4, name.Length);
+            Send(message, MSG_METHOD, message.Length);
+        }
+        
+        /// <summary>
+        /// buffer[HEADER_SIZE..length) を本体としてヘッダーを書き込み送信
+        /// </summary>
+        private void Send(byte[] buffer, byte kind, int length)
+        {
+            PutInt32(buffer, 0, length - 4);
+            buffer[4] = kind;
+            if (_udpClient != null)
+            {
+                _udpClient.Send(buffer, length);
+            }
+            else
+            {
+                _stream.Write(buffer, 0, length);
+            }
+        }
+        
+        private static int PutInt32(byte[] buffer, int offset, int value)
+        {
+            buffer[offset] = (byte)value;
+            buffer[offset + 1] = (byte)(value >> 8);
+            buffer[offset + 2] = (byte)(value >> 16);
+            buffer[offset + 3] = (byte)(value >> 24);
+            return offset + 4;
+        }
+        
+        private static int PutInt64(byte[] buffer, int offset, long value)
+        {
+            PutInt32(buffer, offset, (int)value);
+            return PutInt32(buffer, offset + 4, (int)(value >> 32));
+        }
+    }
+}
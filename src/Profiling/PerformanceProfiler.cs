@@ -1,6 +1,7 @@
 ﻿using System;
 using System.Collections.Generic;
 using System.Diagnostics;
+using System.Globalization;
 using System.Reflection;
 using CS1Profiler.Core;
 
@@ -254,7 +255,8 @@ namespace CS1Profiler.Profiling
                 for (int i = 0; i < methodList.Count; i++)
                 {
                     var method = methodList[i];
-                    csv.AppendLine(string.Format("{0},{1},{2:F3},{3:F3},{4:F3},{5}",
+                    // 小数点はカルチャに依らず "."（tools/cumulative_snapshot_analyzer.py で解析）
+                    csv.AppendLine(string.Format(CultureInfo.InvariantCulture, "{0},{1},{2:F3},{3:F3},{4:F3},{5}",
                         i + 1, method.MethodName, method.AvgMs, method.MaxMs, method.TotalMs, method.CallCount));
                 }
                 
@@ -31,6 +31,13 @@ namespace CS1Profiler
         private static bool _startupProfilingActive = false;
         private static readonly List<string> _startupLog = new List<string>();
         
+        // 起動時ログのタイムスタンプ記録（output_logの行には時刻が無いため、起動解析中の全ログに経過時間と発行元を付けて別CSVに保存）
+        private const int STARTUP_LOG_MAX_ENTRIES = 100000;
+        private const int STARTUP_LOG_MAX_MESSAGE_LENGTH = 300;
+        private static readonly List<string> _startupLogLines = new List<string>();
+        private static readonly System.Diagnostics.Stopwatch _startupStopwatch = new System.Diagnostics.Stopwatch();
+        private static bool _startupLogHooked = false;
+        
         // CSV出力タイマー
         private static DateTime _lastCsvOutput = DateTime.MinValue;
         private const int CSV_OUTPUT_INTERVAL_SECONDS = 30; // 30秒間隔でCSV出力
@@ -177,6 +184,36 @@ namespace CS1Profiler
             }
         }
 
+        /// <summary>
+        /// Building描画ステージのフレーム別記録を開始（ModTools用）
+        /// </summary>
+        public static void StartBuildingStageRecording()
+        {
+            try
+            {
+                CS1Profiler.Harmony.BuildingRenderAnalysisHooks.StartStageRecording();
+            }
+            catch (Exception e)
+            {
+                UnityEngine.Debug.LogError($"{Constants.LOG_PREFIX} Failed to start building stage recording: {e.Message}");
+            }
+        }
+
+        /// <summary>
+        /// Building描画ステージのフレーム別記録を停止してCSVを確定（ModTools用）
+        /// </summary>
+        public static void StopBuildingStageRecording()
+        {
+            try
+            {
+                CS1Profiler.Harmony.BuildingRenderAnalysisHooks.StopStageRecording();
+            }
+            catch (Exception e)
+            {
+                UnityEngine.Debug.LogError($"{Constants.LOG_PREFIX} Failed to stop building stage recording: {e.Message}");
+            }
+        }
+
         // IUserMod必須プロパティ
         public string Name 
         { 
@@ -212,6 +249,7 @@ namespace CS1Profiler
             {
                 _gameStartTime = DateTime.Now;
                 _startupProfilingActive = true;
+                StartStartupLogCapture();
                 LogStartupEvent("MOD_ENABLED", $"{Constants.MOD_NAME} mod enabled and startup analysis started");
             }
             
@@ -355,6 +393,7 @@ namespace CS1Profiler
             // 統一パッチ管理システムをシャットダウン
             CS1Profiler.Harmony.PatchController.Shutdown();
             
+            StopStartupLogCapture();
             DestroyProfilerManager();
             UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} === MOD OnDisabled COMPLETED ===");
         }
@@ -431,6 +470,9 @@ namespace CS1Profiler
         {
             LogStartupEvent("LEVEL_UNLOADING", "Level unloading started");
             UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} OnLevelUnloading");
+            
+            // 建物描画ステージ記録中なら残りのフレームを書き出して閉じる
+            CS1Profiler.Harmony.BuildingRenderAnalysisHooks.StopStageRecording();
         }
 
         public override void OnCreated(ILoading loading)
@@ -455,7 +497,8 @@ namespace CS1Profiler
             {
                 DateTime now = DateTime.Now;
                 TimeSpan elapsed = now - _gameStartTime;
-                string logEntry = string.Format("[{0:HH:mm:ss.fff}] +{1:F3}s | {2} | {3}", 
+                // 小数点・時刻区切りはカルチャに依らず固定（tools/startup_log_analyzer.py で解析）
+                string logEntry = string.Format(System.Globalization.CultureInfo.InvariantCulture, "[{0:HH:mm:ss.fff}] +{1:F3}s | {2} | {3}", 
                     now, elapsed.TotalSeconds, eventType, description);
                 
                 _startupLog.Add(logEntry);
@@ -499,6 +542,10 @@ namespace CS1Profiler
                 
                 UnityEngine.Debug.Log(sb.ToString());
                 
+                // 全ログ行の経過時間CSVを保存（tools/startup_log_analyzer.py で解析）
+                StopStartupLogCapture();
+                WriteStartupLogCsv();
+                
                 // ProfilerManager経由でCSV統計を保存
                 if (ProfilerManager.Instance != null)
                 {
@@ -513,6 +560,115 @@ namespace CS1Profiler
             }
         }
         
+        // 起動解析中の全ログ行の記録を開始
+        private static void StartStartupLogCapture()
+        {
+            if (_startupLogHooked) return;
+            
+            lock (_startupLogLines)
+            {
+                _startupLogLines.Clear();
+                _startupLogLines.Add("ElapsedMs,Type,ThreadId,Source,Message");
+            }
+            _startupStopwatch.Reset();
+            _startupStopwatch.Start();
+            Application.logMessageReceivedThreaded += OnStartupLogMessage;
+            _startupLogHooked = true;
+        }
+        
+        private static void StopStartupLogCapture()
+        {
+            if (!_startupLogHooked) return;
+            
+            Application.logMessageReceivedThreaded -= OnStartupLogMessage;
+            _startupStopwatch.Stop();
+            _startupLogHooked = false;
+        }
+        
+        // 任意のスレッドから呼ばれる（Debug.Logは呼ばない：再入になるため）
+        private static void OnStartupLogMessage(string condition, string stackTrace, LogType type)
+        {
+            double elapsedMs = _startupStopwatch.Elapsed.TotalMilliseconds;
+            string message = FirstLine(condition);
+            if (message.Length > STARTUP_LOG_MAX_MESSAGE_LENGTH)
+            {
+                message = message.Substring(0, STARTUP_LOG_MAX_MESSAGE_LENGTH);
+            }
+            
+            string line = string.Format(System.Globalization.CultureInfo.InvariantCulture, "{0:F3},{1},{2},{3},{4}",
+                elapsedMs, type, System.Threading.Thread.CurrentThread.ManagedThreadId,
+                CsvQuote(LogSource(stackTrace)), CsvQuote(message));
+            
+            lock (_startupLogLines)
+            {
+                if (_startupLogLines.Count < STARTUP_LOG_MAX_ENTRIES)
+                {
+                    _startupLogLines.Add(line);
+                }
+            }
+        }
+        
+        // スタックトレースからログの発行元（UnityEngine以外の最初のフレームのクラス名）を取得
+        private static string LogSource(string stackTrace)
+        {
+            if (string.IsNullOrEmpty(stackTrace)) return "";
+            
+            foreach (string rawFrame in stackTrace.Split('\n'))
+            {
+                string frame = rawFrame.Trim();
+                if (frame.StartsWith("at ")) frame = frame.Substring(3);
+                if (frame.Length == 0 || frame.StartsWith("UnityEngine.")) continue;
+                
+                int end = frame.IndexOfAny(new[] { ':', ' ', '(' });
+                string method = end > 0 ? frame.Substring(0, end) : frame;
+                // Mono形式（Namespace.Class.Method）はメソッド名を落としてクラス名にする
+                if (frame.IndexOf(':') < 0)
+                {
+                    int lastDot = method.LastIndexOf('.');
+                    if (lastDot > 0) method = method.Substring(0, lastDot);
+                }
+                return method;
+            }
+            return "";
+        }
+        
+        private static string FirstLine(string text)
+        {
+            if (string.IsNullOrEmpty(text)) return "";
+            int end = text.IndexOfAny(new[] { '\r', '\n' });
+            return end >= 0 ? text.Substring(0, end) : text;
+        }
+        
+        private static string CsvQuote(string value)
+        {
+            return "\"" + value.Replace("\"", "\"\"") + "\"";
+        }
+        
+        private static void WriteStartupLogCsv()
+        {
+            try
+            {
+                string gameDirectory = Application.dataPath;
+                if (gameDirectory.EndsWith("_Data"))
+                {
+                    gameDirectory = System.IO.Directory.GetParent(gameDirectory).FullName;
+                }
+                string path = System.IO.Path.Combine(gameDirectory,
+                    "CS1Profiler_StartupLog_" + _gameStartTime.ToString("yyyyMMdd_HHmmss") + ".csv");
+                
+                lock (_startupLogLines)
+                {
+                    System.IO.File.WriteAllLines(path, _startupLogLines.ToArray(), new System.Text.UTF8Encoding(false));
+                    UnityEngine.Debug.Log($"{Constants.LOG_PREFIX} Startup log exported: {path} ({_startupLogLines.Count - 1} lines)");
+                    _startupLogLines.Clear();
+                }
+            }
+            catch (Exception e)
+            {
+                UnityEngine.Debug.LogError($"{Constants.LOG_PREFIX} Startup log export error: " + e.Message);
+            }
+        }
+        
         // オプション画面（修正版）
         /// <summary>
         /// パッチの現在状態を取得
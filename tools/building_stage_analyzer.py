@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+CS1Profiler 建物描画ステージ解析ツール
+BuildingRenderAnalysisPatcher のフレーム×ステージ記録（CS1Profiler_BuildingStages_*.csv）から
+ステージ別の処理時間分布、建物1件・prop1個あたりのコスト、可視建物数に対するスケーリングを計算し、
+RenderProps のコストが跳ね上がる可視建物数を検出する
+
+入力列（1行 = 1フレームの BuildingManager.EndRenderingImpl）:
+    Frame,TimeMs,RenderGroups,HighDetailCalls,LowDetailCalls,UniqueBuildings,
+    HighDetailMs,LowDetailMs,LodMs,TotalMs,MeshesCalls,MeshesMs,PropsCalls,PropsCount,PropsMs
+    HighDetailMs / LowDetailMs は Building.RenderInstance の合計で、RenderMeshes・RenderProps を含む
+    PropsCount は RenderProps を呼んだ建物の Info の prop 数の合計（距離・レイヤーで描画されないものも含む）
+    TimeMs は MPSCLogger と同じ Stopwatch 基準のミリ秒
+
+跳ね上がり点:
+    フレームを可視建物数の昇順に並べ、建物1件あたり・prop1個あたりのコスト列に平均シフトの変化点検出
+    （changepoint.binary_segmentation）を適用する。1件あたりコストの段差 = 合計コストの傾きの変化
+    件数の少ないフレームの比は分散が大きい（分散 ∝ 1/件数）ため、件数で重み付けして検出し、
+    区間の値は 合計時間 / 合計件数 とする
+"""
+
+import argparse
+import os
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+import changepoint
+
+plt.rcParams['font.family'] = ['DejaVu Sans', 'Yu Gothic', 'Hiragino Sans', 'Noto Sans CJK JP']
+
+STAGE_COLUMNS = ['TotalMs', 'HighDetailMs', 'LowDetailMs', 'LodMs', 'MeshesMs', 'PropsMs', 'OtherInstanceMs']
+UNIT_COST_COLUMNS = ['MeshesUsPerBuilding', 'PropsUsPerBuilding', 'PropsUsPerProp']
+# 跳ね上がり点を探すコスト列（可視建物数の昇順に並べて変化点検出）
+JUMP_SERIES = ['PropsUsPerBuilding', 'PropsUsPerProp', 'MeshesUsPerBuilding']
+# 各コスト列の分母（変化点検出の重み）
+JUMP_WEIGHTS = {'PropsUsPerBuilding': 'PropsCalls', 'PropsUsPerProp': 'PropsCount', 'MeshesUsPerBuilding': 'MeshesCalls'}
+QUANTILES = [0.5, 0.9, 0.95, 0.99]
+DEFAULT_SCALING_BINS = 20
+# 変化点間の最小フレーム数（フレーム数がこれより少ない短い記録では全体の1/10）
+DEFAULT_JUMP_MIN_SIZE = 120
+SCATTER_MAX_POINTS = 50000
+
+
+def load_stage_frames(csv_file):
+    """ステージ記録を読み込み、派生列（RenderInstance内のその他・1件あたりコスト）を追加"""
+    frames = pd.read_csv(csv_file)
+    frames['VisibleBuildings'] = frames['UniqueBuildings']
+    instance_ms = frames['HighDetailMs'] + frames['LowDetailMs']
+    frames['OtherInstanceMs'] = (instance_ms - frames['MeshesMs'] - frames['PropsMs']).clip(lower=0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frames['MeshesUsPerBuilding'] = np.where(frames['MeshesCalls'] > 0,
+                                                 frames['MeshesMs'] * 1000.0 / frames['MeshesCalls'], np.nan)
+        frames['PropsUsPerBuilding'] = np.where(frames['PropsCalls'] > 0,
+                                                frames['PropsMs'] * 1000.0 / frames['PropsCalls'], np.nan)
+        frames['PropsUsPerProp'] = np.where(frames['PropsCount'] > 0,
+                                            frames['PropsMs'] * 1000.0 / frames['PropsCount'], np.nan)
+        frames['PropsPerBuilding'] = np.where(frames['PropsCalls'] > 0,
+                                              frames['PropsCount'] / frames['PropsCalls'], np.nan)
+    return frames
+
+
+def stage_distributions(frames):
+    """ステージ別・1件あたりコスト別の分布（平均・分位点・最大・合計に対する割合）"""
+    rows = []
+    total_mean = frames['TotalMs'].mean()
+    for column in STAGE_COLUMNS + UNIT_COST_COLUMNS:
+        values = frames[column].dropna().to_numpy()
+        if len(values) == 0:
+            continue
+        row = {'Stage': column, 'Frames': len(values), 'Mean': values.mean(), 'Std': values.std()}
+        for q, value in zip(QUANTILES, np.quantile(values, QUANTILES)):
+            row[f'P{int(q * 100)}'] = value
+        row['Max'] = values.max()
+        row['ShareOfTotal'] = values.mean() / total_mean if column in STAGE_COLUMNS and total_mean > 0 else np.nan
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def scaling_table(frames, bins=DEFAULT_SCALING_BINS):
+    """
+    可視建物数の分位ビンごとのステージ時間（中央値・P95）と1件あたりコスト
+    ビンはフレーム数がほぼ等しくなるよう分位で区切る（同じ建物数が多い場合はビンが減る）
+    """
+    labels = pd.qcut(frames['VisibleBuildings'], bins, duplicates='drop')
+    grouped = frames.groupby(labels, observed=True)
+    table = pd.DataFrame({
+        'Frames': grouped.size(),
+        'VisibleBuildings': grouped['VisibleBuildings'].median(),
+        'PropsPerBuilding': grouped['PropsPerBuilding'].median(),
+    })
+    for column in STAGE_COLUMNS:
+        table[f'{column}_P50'] = grouped[column].median()
+        table[f'{column}_P95'] = grouped[column].quantile(0.95)
+    for column in UNIT_COST_COLUMNS:
+        table[f'{column}_P50'] = grouped[column].median()
+    table.index = table.index.astype(str)
+    return table.rename_axis('BuildingRange').reset_index()
+
+
+def scaling_fit(frames):
+    """各ステージ時間を可視建物数の一次式で近似（1000件あたりの傾き・切片・決定係数）"""
+    x = frames['VisibleBuildings'].to_numpy(dtype=np.float64)
+    rows = []
+    for column in STAGE_COLUMNS:
+        y = frames[column].to_numpy(dtype=np.float64)
+        valid = np.isfinite(y)
+        if valid.sum() < 3 or np.ptp(x[valid]) == 0:
+            continue
+        slope, intercept = np.polyfit(x[valid], y[valid], 1)
+        residual = y[valid] - (slope * x[valid] + intercept)
+        variance = y[valid].var()
+        rows.append({
+            'Stage': column,
+            'MsPer1000Buildings': slope * 1000.0,
+            'InterceptMs': intercept,
+            'R2': 1.0 - residual.var() / variance if variance > 0 else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+
+def cost_jumps(frames, penalty=changepoint.DEFAULT_PENALTY, min_size=DEFAULT_JUMP_MIN_SIZE):
+    """
+    可視建物数の昇順に並べた1件あたりコストの段差（跳ね上がり点、件数で重み付け）
+    戻り値の AtBuildings は段差の直後の区間が始まる可視建物数、BeforeUs / AfterUs は区間の 合計時間 / 合計件数
+    """
+    order = np.argsort(frames['VisibleBuildings'].to_numpy(), kind='stable')
+    buildings = frames['VisibleBuildings'].to_numpy()[order]
+    min_size = max(2, min(min_size, len(frames) // 10))
+    rows = []
+    for column in JUMP_SERIES:
+        series = frames[column].to_numpy(dtype=np.float64)[order]
+        if not np.isfinite(series).any():
+            continue
+        weights = frames[JUMP_WEIGHTS[column]].to_numpy(dtype=np.float64)[order]
+        breakpoints = changepoint.binary_segmentation(series, penalty, min_size, weights=weights)
+        means = changepoint.segment_means(series, breakpoints, weights)
+        for i, index in enumerate(breakpoints):
+            rows.append({
+                'Series': column,
+                'AtBuildings': int(buildings[index]),
+                'BeforeUs': means[i],
+                'AfterUs': means[i + 1],
+                'Ratio': means[i + 1] / means[i] if means[i] > 0 else np.nan,
+            })
+    return pd.DataFrame(rows, columns=['Series', 'AtBuildings', 'BeforeUs', 'AfterUs', 'Ratio'])
+
+
+def plot_scaling(frames, scaling, jumps, output):
+    """RenderProps / RenderMeshes の時間と1件あたりコストを可視建物数に対してプロット"""
+    sample = frames.sample(SCATTER_MAX_POINTS, random_state=0) if len(frames) > SCATTER_MAX_POINTS else frames
+    props_jumps = jumps[jumps['Series'] == 'PropsUsPerBuilding']['AtBuildings']
+
+    fig, (total_ax, unit_ax) = plt.subplots(2, 1, figsize=(14, 10), sharex=True)
+    for column, color in (('PropsMs', 'tab:red'), ('MeshesMs', 'tab:blue'), ('OtherInstanceMs', 'tab:gray')):
+        total_ax.scatter(sample['VisibleBuildings'], sample[column], s=3, alpha=0.15, color=color)
+        total_ax.plot(scaling['VisibleBuildings'], scaling[f'{column}_P50'], color=color, linewidth=2, label=f'{column} (中央値)')
+    total_ax.set_ylabel('ms / フレーム')
+    total_ax.set_title('ステージ時間と可視建物数')
+    total_ax.legend(fontsize=8)
+    total_ax.grid(True, alpha=0.3)
+
+    for column, color in (('PropsUsPerBuilding', 'tab:red'), ('MeshesUsPerBuilding', 'tab:blue')):
+        unit_ax.scatter(sample['VisibleBuildings'], sample[column], s=3, alpha=0.15, color=color)
+        unit_ax.plot(scaling['VisibleBuildings'], scaling[f'{column}_P50'], color=color, linewidth=2, label=f'{column} (中央値)')
+    unit_ax.set_ylabel('μs / 建物')
+    unit_ax.set_xlabel('可視建物数（RenderInstanceされた建物のユニーク数）')
+    unit_ax.set_title('建物1件あたりのコスト')
+    unit_ax.grid(True, alpha=0.3)
+
+    for ax in (total_ax, unit_ax):
+        for at in props_jumps:
+            ax.axvline(x=at, color='red', linestyle='--', alpha=0.7)
+    if len(props_jumps) > 0:
+        unit_ax.plot([], [], color='red', linestyle='--', label='RenderProps 跳ね上がり点')
+    unit_ax.legend(fontsize=8)
+    plt.tight_layout()
+    plt.savefig(output, dpi=200, bbox_inches='tight')
+    plt.close()
+
+
+def plot_distributions(frames, output):
+    """ステージ別の処理時間分布（外れ値はP99で丸めた箱ひげ図）"""
+    columns = [column for column in STAGE_COLUMNS if frames[column].notna().any()]
+    data = [frames[column].dropna().clip(upper=frames[column].quantile(0.99)) for column in columns]
+    plt.figure(figsize=(12, 6))
+    plt.boxplot(data, vert=False, showfliers=False, whis=(1, 99))
+    plt.yticks(range(1, len(columns) + 1), columns)
+    plt.scatter([values.mean() for values in data], range(1, len(data) + 1), marker='D', color='tab:red', s=15, label='平均')
+    plt.xlabel('ms / フレーム')
+    plt.title('EndRenderingImpl ステージ別処理時間（ひげ: P1〜P99）')
+    plt.legend(fontsize=8)
+    plt.grid(True, axis='x', alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(output, dpi=200, bbox_inches='tight')
+    plt.close()
+
+
+def main():
+    default_output = f"building_stage_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    parser = argparse.ArgumentParser(description='CS1Profiler Building Render Stage Analyzer')
+    parser.add_argument('csv_file', help='CS1Profiler_BuildingStages_*.csv')
+    parser.add_argument('-o', '--output', default=default_output, help=f'出力ディレクトリ (デフォルト: {default_output})')
+    parser.add_argument('--bins', type=int, default=DEFAULT_SCALING_BINS, help='可視建物数の分位ビン数')
+    parser.add_argument('--cp-penalty', type=float, default=changepoint.DEFAULT_PENALTY,
+                        help=f'跳ね上がり点検出のペナルティ倍率（大きいほど検出が減る、デフォルト: {changepoint.DEFAULT_PENALTY}）')
+    parser.add_argument('--cp-min-size', type=int, default=DEFAULT_JUMP_MIN_SIZE,
+                        help=f'跳ね上がり点間の最小フレーム数 (デフォルト: {DEFAULT_JUMP_MIN_SIZE})')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv_file):
+        print(f"❌ ファイルが見つかりません: {args.csv_file}")
+        return
+
+    print(f"📂 読み込み中: {args.csv_file}")
+    frames = load_stage_frames(args.csv_file)
+    if len(frames) == 0:
+        print("❌ フレームが記録されていません（BuildingRenderAnalysisパッチが有効か確認してください）")
+        return
+
+    distributions = stage_distributions(frames)
+    scaling = scaling_table(frames, args.bins)
+    fit = scaling_fit(frames)
+    jumps = cost_jumps(frames, args.cp_penalty, args.cp_min_size)
+
+    os.makedirs(args.output, exist_ok=True)
+    distributions.to_csv(f'{args.output}/stage_distributions.csv', index=False, encoding='utf-8-sig')
+    scaling.to_csv(f'{args.output}/stage_scaling.csv', index=False, encoding='utf-8-sig')
+    fit.to_csv(f'{args.output}/stage_scaling_fit.csv', index=False, encoding='utf-8-sig')
+    jumps.to_csv(f'{args.output}/stage_cost_jumps.csv', index=False, encoding='utf-8-sig')
+    plot_scaling(frames, scaling, jumps, f'{args.output}/stage_scaling.png')
+    plot_distributions(frames, f'{args.output}/stage_distributions.png')
+
+    with open(f'{args.output}/stage_report.txt', 'w', encoding='utf-8') as f:
+        f.write("建物描画ステージ解析レポート\n")
+        f.write("=" * 50 + "\n")
+        f.write(f"解析日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"入力: {args.csv_file}\n")
+        f.write(f"フレーム数: {len(frames):,} (可視建物数 {frames['VisibleBuildings'].min()}～{frames['VisibleBuildings'].max()}, "
+                f"中央値 {frames['VisibleBuildings'].median():.0f})\n\n")
+
+        f.write("⏱️ ステージ別処理時間（ms/フレーム）\n")
+        f.write("-" * 30 + "\n")
+        for row in distributions[distributions['Stage'].isin(STAGE_COLUMNS)].itertuples():
+            f.write(f"{row.Stage}: 平均 {row.Mean:.3f}, P50 {row.P50:.3f}, P95 {row.P95:.3f}, P99 {row.P99:.3f}, "
+                    f"最大 {row.Max:.3f} ({row.ShareOfTotal * 100:.1f}%)\n")
+        f.write("\n")
+
+        f.write("🏢 1件あたりのコスト（μs）\n")
+        f.write("-" * 30 + "\n")
+        for row in distributions[distributions['Stage'].isin(UNIT_COST_COLUMNS)].itertuples():
+            f.write(f"{row.Stage}: 平均 {row.Mean:.2f}, P50 {row.P50:.2f}, P95 {row.P95:.2f}\n")
+        f.write(f"建物あたりprop数（中央値）: {frames['PropsPerBuilding'].median():.1f}\n\n")
+
+        f.write("📈 可視建物数に対するスケーリング（1000件あたり）\n")
+        f.write("-" * 30 + "\n")
+        for row in fit.itertuples():
+            f.write(f"{row.Stage}: {row.MsPer1000Buildings:+.3f} ms, 切片 {row.InterceptMs:.3f} ms (R² {row.R2:.2f})\n")
+        f.write("\n")
+
+        f.write("⚠️ コストの跳ね上がり点（可視建物数）\n")
+        f.write("-" * 30 + "\n")
+        if jumps.empty:
+            f.write("検出なし\n")
+        for row in jumps.itertuples():
+            f.write(f"{row.Series}: {row.AtBuildings} 件以上で {row.BeforeUs:.2f} → {row.AfterUs:.2f} μs (x{row.Ratio:.2f})\n")
+
+    props = distributions.set_index('Stage')
+    print(f"\n🎯 {len(frames):,} フレーム, RenderProps 平均 {props.loc['PropsMs', 'Mean']:.3f} ms "
+          f"({props.loc['PropsMs', 'ShareOfTotal'] * 100:.1f}%), RenderMeshes 平均 {props.loc['MeshesMs', 'Mean']:.3f} ms")
+    for row in jumps[jumps['Series'] == 'PropsUsPerBuilding'].itertuples():
+        print(f"   ⚠️ RenderProps 跳ね上がり: 可視建物 {row.AtBuildings} 件以上で x{row.Ratio:.2f}")
+    print(f"\n✅ 解析完了! 結果: {args.output}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+変化点検出ユーティリティ
+長時間セッションのフレーム時間・メソッド別コストの時系列から「段差状の性能変化」を検出する
+
+アルゴリズムは平均シフトに対する二分割法（Binary Segmentation）:
+    累積和を使うと区間 [a, b) の全分割候補の利得を O(b - a) で一括計算できるため、
+    再帰の各段で合計 O(n)、全体で O(n log n)（数百万フレームでも実用的な速度）
+ペナルティは BIC 相当の penalty * sigma^2 * log(n) で、sigma は一階差分のMADから頑健に推定する
+（段差そのものの影響を受けにくく、スパイクは上位パーセンタイルで丸めてから検出する）
+weights を渡すと重み付き二乗和で検出する（分散が 1/重み に比例する系列。例: 件数で割った1件あたりコスト）
+"""
+
+import numpy as np
+
+DEFAULT_PENALTY = 3.0
+DEFAULT_MIN_SIZE = 60
+WINSORIZE_QUANTILE = 0.995
+
+
+def robust_sigma(x):
+    """一階差分のMADからノイズの標準偏差を推定（平均の段差に影響されない）"""
+    if len(x) < 3:
+        return 0.0
+    mad = np.median(np.abs(np.diff(x) - np.median(np.diff(x))))
+    return mad / (0.6745 * np.sqrt(2.0))
+
+
+def weighted_robust_sigma(x, w):
+    """
+    重み付き系列の単位重みあたりのノイズ標準偏差（隣接差分を分散 1/w_i + 1/w_j で標準化したMAD）
+    重み0の点は除外する
+    """
+    keep = w > 0
+    x, w = x[keep], w[keep]
+    if len(x) < 3:
+        return 0.0
+    z = np.diff(x) / np.sqrt(1.0 / w[1:] + 1.0 / w[:-1])
+    return np.median(np.abs(z - np.median(z))) / 0.6745
+
+
+def binary_segmentation(values, penalty=DEFAULT_PENALTY, min_size=DEFAULT_MIN_SIZE, max_changepoints=None, weights=None):
+    """
+    平均シフトの変化点を検出（weights 指定時は重み付き平均のシフト）
+    戻り値: 新しい区間が始まるインデックスの昇順配列
+    """
+    x = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(x)
+    w = np.ones(len(x)) if weights is None else np.where(finite, np.asarray(weights, dtype=np.float64), 0.0)
+    if not finite.all():
+        # 欠損（最終フレームの実測間隔など）は中央値で埋めてインデックスを保つ
+        x = np.where(finite, x, np.median(x[finite]) if finite.any() else 0.0)
+    n = len(x)
+    if n < 2 * min_size:
+        return np.array([], dtype=np.int64)
+
+    # スパイクを段差と誤検出しないよう上位を丸める
+    x = np.minimum(x, np.quantile(x, WINSORIZE_QUANTILE))
+    if weights is None:
+        sigma = robust_sigma(x)
+        if sigma <= 0:
+            sigma = x.std()
+    else:
+        sigma = weighted_robust_sigma(x, w)
+        if sigma <= 0 and w.sum() > 0:
+            sigma = np.sqrt(np.average(np.square(x - np.average(x, weights=w)), weights=w) * np.mean(w))
+    if sigma <= 0:
+        return np.array([], dtype=np.int64)
+    threshold = penalty * sigma ** 2 * np.log(n)
+
+    cumsum = np.concatenate([[0.0], np.cumsum(w * x)])
+    cumweight = np.concatenate([[0.0], np.cumsum(w)])
+    changepoints = []
+    segments = [(0, n)]
+    while segments:
+        start, end = segments.pop()
+        if end - start < 2 * min_size:
+            continue
+        # 分割位置 t の利得 = 左右平均で説明できる二乗和の増分（全候補を一括計算）
+        t = np.arange(start + min_size, end - min_size + 1)
+        left = cumsum[t] - cumsum[start]
+        right = cumsum[end] - cumsum[t]
+        total = cumsum[end] - cumsum[start]
+        left_weight = cumweight[t] - cumweight[start]
+        right_weight = cumweight[end] - cumweight[t]
+        total_weight = cumweight[end] - cumweight[start]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gain = (np.where(left_weight > 0, left ** 2 / left_weight, 0.0) +
+                    np.where(right_weight > 0, right ** 2 / right_weight, 0.0) -
+                    (total ** 2 / total_weight if total_weight > 0 else 0.0))
+        best = int(np.argmax(gain))
+        if gain[best] <= threshold:
+            continue
+        split = int(t[best])
+        changepoints.append(split)
+        segments.append((start, split))
+        segments.append((split, end))
+
+    changepoints = np.sort(np.asarray(changepoints, dtype=np.int64))
+    if max_changepoints is not None and len(changepoints) > max_changepoints:
+        # 段差の大きい順に残す
+        shifts = np.abs(segment_shift(x, changepoints, None if weights is None else w))
+        changepoints = np.sort(changepoints[np.argsort(-shifts)[:max_changepoints]])
+    return changepoints
+
+
+def segment_means(values, changepoints, weights=None):
+    """変化点で区切った各区間の平均（区間数 = 変化点数 + 1、欠損値は除外、weights 指定時は重み付き平均）"""
+    x = np.asarray(values, dtype=np.float64)
+    labels = np.zeros(len(x), dtype=np.int64)
+    labels[changepoints] = 1
+    labels = np.cumsum(labels)
+    finite = np.isfinite(x)
+    w = np.ones(len(x)) if weights is None else np.asarray(weights, dtype=np.float64)
+    totals = np.bincount(labels[finite], weights=(w * x)[finite], minlength=len(changepoints) + 1)
+    counts = np.bincount(labels[finite], weights=w[finite], minlength=len(changepoints) + 1)
+    if weights is None:
+        return totals / np.maximum(counts, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, totals / counts, np.nan)
+
+
+def segment_shift(values, changepoints, weights=None):
+    """各変化点での平均の変化量（後区間 - 前区間）"""
+    means = segment_means(values, changepoints, weights)
+    return np.diff(means)
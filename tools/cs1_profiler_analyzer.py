@@ -9,26 +9,84 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import argparse
+import io
 import os
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+import mpsc_trace
+import changepoint
+import html_report
+import method_heatmap
+import reservoir
+import stage_cache
+
 # 日本語フォント設定（Windows環境対応）
 plt.rcParams['font.family'] = ['DejaVu Sans', 'Yu Gothic', 'Hiragino Sans', 'Noto Sans CJK JP']
 plt.rcParams['figure.figsize'] = (12, 8)
 
+# リザーバー更新のチャンク行数
+RESERVOIR_CHUNK_ROWS = 1_000_000
+# 処理時間分布グラフのメソッド数
+DISTRIBUTION_PLOT_METHODS = 12
+# GCに帰属させた停止時間のイベント名（#MEM行でGC回数が増えたフレームに1件追加）
+GC_METHOD_NAME = 'Mono.GC.Collect'
+# GC停止時間の基準にする周辺の非GCフレーム数（中央値）
+GC_BASELINE_FRAMES = 121
+# GC帰属で短くしたイベントを、トレースを読み直すステージで特定するキー
+GC_EVENT_KEYS = ['MethodName', 'StartTime', 'ThreadId']
+# GC停止時間とみなす下限（ログの分解能0.001msの10倍、または基準フレーム時間の2%の大きい方。これ未満は誤差として0）
+GC_MIN_PAUSE_MS = 0.01
+GC_MIN_PAUSE_FRACTION = 0.02
+# 割り当て速度の集計区間
+ALLOCATION_WINDOW_MS = 1000.0
+
 class CS1ProfilerAnalyzer:
-    def __init__(self, csv_file):
-        """CSVファイルを読み込んで初期化"""
+    def __init__(self, csv_file, reweight_loss=False, time_range=None, frame_range=None, sim_base_rate=60.0,
+                 cp_penalty=changepoint.DEFAULT_PENALTY, cp_min_size=changepoint.DEFAULT_MIN_SIZE,
+                 reservoir_size=reservoir.DEFAULT_RESERVOIR_SIZE, heatmap_order=method_heatmap.DEFAULT_ROW_ORDER,
+                 defer_load=False):
+        """CSVファイルを読み込んで初期化（defer_load=True の場合は読み込みを data ステージまで遅延）"""
         self.csv_file = csv_file
+        self.reweight_loss = reweight_loss
+        self.sim_base_rate = sim_base_rate
+        self.cp_penalty = cp_penalty
+        self.cp_min_size = cp_min_size
+        self.reservoir_size = reservoir_size
+        self.heatmap_order = heatmap_order
+        self.time_range = time_range
+        self.frame_range = frame_range
         self.df = None
-        self.load_data()
+        self.index = None
+        self.meta = None
+        self.clock_offset_ms = None
+        self.loss_windows = mpsc_trace.sequence_windows(None)
+        self.gc_frames = None
+        self.malformed_lines = 0
+        # 読み込んだ StartTime の範囲（--from/--to/--frames 指定時のみ有限）
+        self.event_range = (-np.inf, np.inf)
+        if not defer_load:
+            self.load_data()
     
     def load_data(self):
         """CSVデータを読み込み（Phase2フォーマット対応）"""
         try:
-            self.df = pd.read_csv(self.csv_file)
+            if self.time_range or self.frame_range:
+                # ブロックインデックスで該当範囲のみ読み込み（MPSCフォーマット専用）
+                self.index = mpsc_trace.load_index(self.csv_file)
+                self.meta = self.index['meta']
+                from_ms, to_ms = self._resolve_range()
+                self.event_range = (from_ms, to_ms)
+                self.df, self.malformed_lines = mpsc_trace.read_time_range(self.csv_file, self.index, from_ms, to_ms)
+            elif mpsc_trace.is_event_header(mpsc_trace.read_header(self.csv_file)):
+                # MethodNameは引用符なしのためカンマを含み得る → 右から固定列を切り出す専用パーサー
+                self.df, self.malformed_lines = mpsc_trace.read_events(self.csv_file)
+            else:
+                # '#'で始まる行はMPSCLoggerのメタ行（#SEQ等）
+                self.df = pd.read_csv(self.csv_file, comment='#')
+            if self.malformed_lines:
+                print(f"⚠️ 不正な行を {self.malformed_lines} 行スキップしました（フィールド不足・数値不正）")
             
             # フォーマット自動検出
             columns = self.df.columns.tolist()
@@ -51,12 +109,24 @@ class CS1ProfilerAnalyzer:
             elif 'Timestamp' in columns and 'MethodName' in columns:
                 # 新MPSC フォーマット（Timestamp有り）
                 print("📊 新MPSCフォーマット検出")
-                # Timestamp列をDateTime形式に変換
-                self.df['DateTime'] = pd.to_datetime(self.df['Timestamp'])
+                if self.meta is None:
+                    self.meta = mpsc_trace.read_meta_rows(self.csv_file)
+                self._anchor_event_time()
+                self.df['Lane'] = mpsc_trace.classify_lanes(
+                    self.df['MethodName'],
+                    self.df['ThreadId'] if 'ThreadId' in self.df.columns else None,
+                    self.meta['FRAME'])
                 method_name_col = 'MethodName'
                 # Count列がない場合は1として扱う
                 if 'Count' not in self.df.columns:
                     self.df['Count'] = 1
+                sampled = self.df['Count'] > 1
+                if sampled.any():
+                    # Modの1/Nサンプリング: Count列がサンプリングの重み（1行 = N回の呼び出しを代表）
+                    print(f"🎯 1/Nサンプリングのトレース: {sampled.mean() * 100:.1f}% の行が重み付き"
+                          f"（最大N={self.df['Count'].max():.0f}）")
+                self._apply_loss_accounting()
+                self._attribute_gc_pauses()
             else:
                 # デフォルト
                 print("📊 デフォルトフォーマット検出")
@@ -89,65 +159,314 @@ class CS1ProfilerAnalyzer:
             print(f"❌ CSVファイル読み込みエラー: {e}")
             raise
 
-    def method_statistics(self, spike_multiplier=2.0):
-        """メソッド別統計情報を生成"""
+    def data_state(self):
+        """読み込み・正規化済みのデータ一式（data ステージのキャッシュ内容）"""
+        if self.df is None:
+            self.load_data()
+        return {'df': self.df, 'meta': self.meta, 'clock_offset_ms': self.clock_offset_ms,
+                'loss_windows': self.loss_windows, 'gc_frames': self.gc_frames, 'malformed_lines': self.malformed_lines,
+                'event_range': self.event_range}
+
+    def use_data_state(self, state):
+        """キャッシュから復元したデータ一式を解析対象にする"""
+        if self.df is not state['df']:
+            self.df = state['df']
+            self.meta = state['meta']
+            self.clock_offset_ms = state['clock_offset_ms']
+            self.loss_windows = state['loss_windows']
+            self.gc_frames = state['gc_frames']
+            self.malformed_lines = state['malformed_lines']
+            self.event_range = state['event_range']
+
+    def trace_info(self):
+        """レポート見出し用のトレース概要（df を読み込まずにレポートを書けるよう分離）"""
+        info = {
+            'Records': len(self.df),
+            'Methods': self.df['Description'].nunique(),
+            'Frames': self.df['FrameCount'].nunique() if 'FrameCount' in self.df.columns else None,
+            'TimeRange': (self.df['DateTime'].min(), self.df['DateTime'].max()),
+            'LossWindows': self.loss_windows,
+            'MalformedLines': self.malformed_lines,
+        }
+        return info
+
+    def _resolve_range(self):
+        """--from/--to/--frames を StartTime（Stopwatchミリ秒）の範囲に変換"""
+        if self.frame_range:
+            return mpsc_trace.frames_to_time_range(self.meta['FRAME'], *self.frame_range)
+
+        trace_start_ms = self.index['blocks']['MinStartMs'].min()
+        offset = self.index['clock_offset_ms']
+
+        def to_tick_ms(value, default):
+            if value is None:
+                return default
+            try:
+                # 数値はトレース先頭からの秒数
+                return trace_start_ms + float(value) * 1000.0
+            except ValueError:
+                if np.isnan(offset):
+                    raise ValueError("時計オフセットを推定できないため日時指定は使えません（秒数で指定してください）")
+                return pd.Timestamp(value).value / 1e6 - offset
+
+        from_value, to_value = self.time_range
+        return to_tick_ms(from_value, -np.inf), to_tick_ms(to_value, np.inf)
+
+    def _anchor_event_time(self):
+        """
+        DateTimeをWriter書き込み時刻（Timestamp）ではなくイベント発生時刻に揃える
+        StartTime + ファイル単位の時計オフセット、#FRAME行があればフレーム番号も付与
+        """
+        if self.index is not None and not np.isnan(self.index['clock_offset_ms']):
+            self.clock_offset_ms = self.index['clock_offset_ms']
+        elif 'StartTime' in self.df.columns:
+            sample = self.df.sample(min(len(self.df), 20000), random_state=0) if len(self.df) > 0 else self.df
+            self.clock_offset_ms = mpsc_trace.fit_clock_offset(sample['EndTime'], sample['Timestamp'])
+
+        if self.clock_offset_ms is not None:
+            self.df['DateTime'] = mpsc_trace.anchor_datetime(self.df['StartTime'], self.clock_offset_ms)
+            print(f"🕐 イベント時刻をStartTimeから復元 (オフセット {self.clock_offset_ms:.1f}ms)")
+        else:
+            self.df['DateTime'] = pd.to_datetime(self.df['Timestamp'])
+
+        if len(self.meta['FRAME']) > 0:
+            self.df['FrameCount'] = mpsc_trace.assign_frames(self.df['StartTime'], self.meta['FRAME'])
+
+    def _apply_loss_accounting(self):
+        """#SEQ行からRing Bufferオーバーランによるロス率を区間ごとに付与"""
+        self.df['LossRate'] = 0.0
+        if 'EndTime' not in self.df.columns:
+            return
+
+        self.loss_windows = mpsc_trace.sequence_windows(self.meta['SEQ'])
+        if len(self.loss_windows) == 0:
+            print("⚠️ #SEQ行がありません（旧バージョンのログ）: Drop数は不明です")
+            return
+
+        window_idx = mpsc_trace.assign_windows(self.df['EndTime'], self.loss_windows)
+        loss_rate = self.loss_windows['LossRate'].to_numpy()
+        self.df['LossRate'] = np.where(window_idx >= 0, loss_rate[np.clip(window_idx, 0, None)], 0.0)
+
+        total_dropped = self.loss_windows['Dropped'].sum()
+        total_attempted = total_dropped + self.loss_windows['Enqueued'].sum()
+        if total_dropped > 0:
+            lossy_windows = (self.loss_windows['Dropped'] > 0).sum()
+            print(f"⚠️ Ring Bufferオーバーラン: {total_dropped:.0f} イベントDrop "
+                  f"({total_dropped / total_attempted * 100:.2f}%, {lossy_windows}/{len(self.loss_windows)} 区間)")
+            if self.reweight_loss:
+                # Dropはメソッドに依存せず発生すると仮定し、区間ごとに呼び出し数を補正
+                self.df['Count'] = self.df['Count'] / (1.0 - self.df['LossRate'].clip(upper=0.99))
+                print("⚖️ ロス区間のイベントを 1/(1-LossRate) で重み付けしました")
+
+    def _attribute_gc_pauses(self):
+        """
+        GC回数が増えたフレームのスパイク時間を、実行中だったメソッドではなくGCに帰属させる
+        GC自体の時間は記録されないため、停止時間 = 実測フレーム時間 - 周辺の非GCフレームの中央値 と推定する
+        GCはメインスレッドのフレーム時間を押し上げるため、対象はGCフレーム内のRenderレーン・メインスレッドの
+        最外側のイベント（入れ子の内側は外側に含まれるので除く）に限る
+        通常（メソッド別の中央値）より長かった分を、超過の大きい順にフレームの停止時間まで差し引き
+        （Count倍した合計時間で数えるため、フレームあたりの差し引き合計は GcPauseMs 以下）、
+        代わりにフレーム末尾へ GC_METHOD_NAME のイベントを1件追加する
+        """
+        memory = self.meta.get('MEM') if self.meta is not None else None
+        if memory is None or len(memory) == 0 or 'FrameCount' not in self.df.columns:
+            return
+
+        frames = mpsc_trace.align_memory_to_frames(self.meta['FRAME'], memory)
+        has_gc = frames['GcCollections'] > 0
+        baseline = frames['MeasuredFrameMs'].where(~has_gc).rolling(
+            GC_BASELINE_FRAMES, center=True, min_periods=1).median()
+        frames['BaselineFrameMs'] = baseline
+        pause = (frames['MeasuredFrameMs'] - baseline).where(has_gc, 0.0).fillna(0.0)
+        min_pause = np.maximum(GC_MIN_PAUSE_MS, baseline.fillna(0.0) * GC_MIN_PAUSE_FRACTION)
+        frames['GcPauseMs'] = pause.where(pause > min_pause, 0.0)
+        # 基準はトレース全体のフレームで求め、帰属は読み込んだ範囲（--from/--to/--frames）のフレームだけに行う
+        frames = frames[frames['FrameCount'].isin(self.df['FrameCount'].unique())].reset_index(drop=True)
+        has_gc = frames['GcCollections'] > 0
+        self.gc_frames = frames
+
+        pauses = frames[frames['GcPauseMs'] > 0].set_index('FrameCount')['GcPauseMs']
+        print(f"🗑️ GC: {int(frames['GcCollections'].sum())} 回 ({int(has_gc.sum())} フレーム), "
+              f"推定停止時間 合計 {pauses.sum():.1f}ms")
+        if len(pauses) == 0:
+            return
+
+        main_thread = self.meta['FRAME']['ThreadId'].dropna()
+        main_thread_id = main_thread.mode().iloc[0] if len(main_thread) > 0 else np.nan
+        in_gc = self.df['FrameCount'].isin(pauses.index)
+        if 'Lane' in self.df.columns:
+            in_gc &= self.df['Lane'] == mpsc_trace.LANE_RENDER
+        if 'ThreadId' in self.df.columns and not np.isnan(main_thread_id):
+            in_gc &= self.df['ThreadId'] == main_thread_id
+        candidates = self.df.loc[in_gc, ['FrameCount', 'MethodName', 'Duration(ms)', 'StartTime', 'EndTime', 'Count']]
+
+        # 最外側のイベント: 同じフレームで先に始まったイベントの終了時刻の最大値より後に終わるもの
+        candidates = candidates.sort_values(['FrameCount', 'StartTime', 'EndTime'], ascending=[True, True, False])
+        previous_end = candidates.groupby('FrameCount')['EndTime'].transform(lambda end: end.cummax().shift())
+        candidates = candidates[~(candidates['EndTime'] <= previous_end)]
+
+        # 中央値はGCフレームに現れたメソッドだけ求める
+        durations = self.df['Duration(ms)']
+        names = self.df['MethodName']
+        related = names.isin(candidates['MethodName'].unique()).to_numpy()
+        typical = durations[related].groupby(names[related]).median()
+        excess = (candidates['Duration(ms)'] - candidates['MethodName'].map(typical)).clip(lower=0) * candidates['Count']
+
+        # 超過（合計時間）の大きい順にフレームの停止時間を割り当てる
+        order = np.lexsort((-excess.to_numpy(), candidates['FrameCount'].to_numpy()))
+        candidates, excess = candidates.iloc[order], excess.iloc[order]
+        taken_before = excess.groupby(candidates['FrameCount']).cumsum() - excess
+        moved = (candidates['FrameCount'].map(pauses) - taken_before).clip(lower=0)
+        moved = np.minimum(moved, excess)
+
+        self.df['GcAttributedMs'] = 0.0
+        self.df.loc[moved.index, 'GcAttributedMs'] = moved / candidates['Count']
+        self.df['Duration(ms)'] = durations - self.df['GcAttributedMs']
+
+        gc_frames = frames[frames['GcPauseMs'] > 0]
+        gc_rows = pd.DataFrame({
+            'MethodName': GC_METHOD_NAME,
+            'Duration(ms)': gc_frames['GcPauseMs'].to_numpy(),
+            'StartTime': (gc_frames['EndMs'] - gc_frames['GcPauseMs']).to_numpy(),
+            'EndTime': gc_frames['EndMs'].to_numpy(),
+            'ThreadId': main_thread_id,
+            'FrameCount': gc_frames['FrameCount'].to_numpy(),
+            'Lane': mpsc_trace.LANE_RENDER,
+            'Count': 1,
+            'LossRate': 0.0,
+            'GcAttributedMs': 0.0,
+        })
+        if self.clock_offset_ms is not None:
+            gc_rows['DateTime'] = mpsc_trace.anchor_datetime(gc_rows['StartTime'], self.clock_offset_ms)
+        self.df = pd.concat([self.df, gc_rows], ignore_index=True)
+        print(f"⚖️ GCフレームのメソッドから {moved.sum():.1f}ms を {GC_METHOD_NAME} に移しました")
+
+    def memory_statistics(self):
+        """
+        GC・メモリ統計
+        戻り値: (フレーム別GC表（#MEM行がない場合はNone）, 区間別割り当て速度)
+        """
+        if self.gc_frames is None or len(self.gc_frames) == 0:
+            return self.gc_frames, mpsc_trace.allocation_rate(None)
+        memory = self.meta['MEM']
+        in_range = memory['TimeMs'].between(self.gc_frames['StartMs'].min(), self.gc_frames['EndMs'].max())
+        return self.gc_frames, mpsc_trace.allocation_rate(memory[in_range], ALLOCATION_WINDOW_MS)
+
+    def loss_statistics(self):
+        """区間ごとのイベントロス統計を返す"""
+        return self.loss_windows
+
+    def event_aggregates(self):
+        """
+        閾値を持つステージ（method_stats / changepoints / html_report）が使う集計（行単位のデータは持たない）
+        durations: (メソッド, 処理時間) ごとの重み合計・行数・分散項 Σw(w-1)
+                   （MPSCLoggerは処理時間を0.001ms単位で書くため、行数はメソッドごとの異なる値の数で頭打ち）
+        frames: (メソッド, レーン, フレーム) ごとの合計時間・呼び出し数
+        methods: メソッドごとのレーン（最頻値）・カテゴリ・メモリ
+        """
+        print("\n🧮 メソッド別集計を作成中...")
+        df = self.df
+        if 'FrameCount' in df.columns:
+            group_by_col, frame_keys = 'FrameCount', df['FrameCount']
+        else:
+            # 新MPSCフォーマットでは時間軸でグループ化（1秒単位）
+            group_by_col, frame_keys = 'TimeGroup', df['DateTime'].dt.floor('1S')
+        names = df['Description'].astype('category')
+        weights = df['Count'].astype(np.float64) if 'Count' in df.columns else pd.Series(1.0, index=df.index)
+        lanes = df['Lane'] if 'Lane' in df.columns else pd.Series('', index=df.index)
+        
+        durations = pd.DataFrame({
+            'Description': names,
+            'Duration(ms)': df['Duration(ms)'],
+            'Weight': weights,
+            # 重み付き合計の分散項（Horvitz-Thompson、各行が確率 1/w で独立に記録されたとみなす）
+            'Excess': (weights * (weights - 1)).clip(lower=0),
+            'Rows': 1,
+        }).groupby(['Description', 'Duration(ms)'], observed=True, sort=False).sum().reset_index()
+        
+        frames = pd.DataFrame({
+            'Description': names,
+            'Lane': lanes.astype('category'),
+            'Frame': frame_keys,
+            'TotalMs': df['TotalDurationPerFrame'],
+            'Calls': weights,
+        }).groupby(['Description', 'Lane', 'Frame'], observed=True, sort=False).sum().reset_index()
+        
+        # レーンは行数の最頻値（同数なら名前順で先のもの = Series.mode と同じ）
+        lane_rows = pd.DataFrame({'Description': names, 'Lane': lanes}).value_counts().rename('Rows').reset_index()
+        lane_rows = lane_rows.sort_values(['Description', 'Rows', 'Lane'], ascending=[True, False, True])
+        methods = lane_rows.drop_duplicates('Description').set_index('Description')[['Lane']]
+        if 'Category' in df.columns:
+            methods['Category'] = df.groupby(names, observed=True)['Category'].first()
+        else:
+            methods['Category'] = [self._extract_category(name) for name in methods.index]
+        if 'MemoryMB' in df.columns:
+            memory = df.groupby(names, observed=True)['MemoryMB']
+            methods['AvgMemoryMB'] = memory.mean()
+            methods['MaxMemoryMB'] = memory.max()
+        else:
+            methods['AvgMemoryMB'] = 0
+            methods['MaxMemoryMB'] = 0
+        return {'group_by_col': group_by_col, 'durations': durations, 'frames': frames, 'methods': methods}
+
+    def method_statistics(self, spike_multiplier=2.0, aggregates=None):
+        """メソッド別統計情報を生成（event_aggregates の集計のみを使う）"""
         print("\n📊 メソッド別統計情報を生成中...")
+        if aggregates is None:
+            aggregates = self.event_aggregates()
+        durations, methods = aggregates['durations'], aggregates['methods']
         
-        method_stats = []
+        # 1回あたりの値は重み（Count）付き: サンプリング間隔が時間で変わっても偏らない
+        value = durations['Duration(ms)'].to_numpy(dtype=np.float64)
+        weight = durations['Weight'].to_numpy(dtype=np.float64)
+        by_method = durations['Description']
+        per_method = pd.DataFrame({
+            'Weight': weight, 'Total': value * weight, 'Rows': durations['Rows'],
+            'Excess': durations['Excess'], 'ExcessSq': durations['Excess'] * np.square(value),
+        }).groupby(by_method, observed=True).sum()
+        avg_duration = per_method['Total'] / per_method['Weight']
+        deviation = np.square(value - by_method.map(avg_duration).to_numpy(dtype=np.float64)) * weight
+        std_duration = (pd.Series(deviation).groupby(by_method.to_numpy()).sum() / per_method['Weight']) ** 0.5
+        spike_threshold = avg_duration * spike_multiplier
+        spike = value > by_method.map(spike_threshold).to_numpy(dtype=np.float64)
+        spike_count = pd.Series(np.where(spike, weight, 0.0)).groupby(by_method.to_numpy()).sum()
+        values = pd.Series(value).groupby(by_method.to_numpy())
         
-        for method_name, method_data in self.df.groupby('Description'):
-            durations = method_data['Duration(ms)']
-            
-            # フレーム別データの処理（フォーマットに応じて）
-            if 'FrameCount' in self.df.columns:
-                frame_totals = method_data.groupby('FrameCount')['TotalDurationPerFrame'].sum()
-                frame_calls = method_data.groupby('FrameCount')['Count'].sum()
-            else:
-                # 新MPSCフォーマットでは時間軸でグループ化
-                method_data['TimeGroup'] = method_data['DateTime'].dt.floor('1S')  # 1秒単位
-                frame_totals = method_data.groupby('TimeGroup')['TotalDurationPerFrame'].sum()
-                frame_calls = method_data.groupby('TimeGroup')['Count'].sum()
-            
-            avg_duration = durations.mean()
-            spike_threshold = avg_duration * spike_multiplier
-            spike_records = method_data[method_data['Duration(ms)'] > spike_threshold]
-            
-            # Category列がない場合は推定
-            if 'Category' not in method_data.columns:
-                category = self._extract_category(method_name)
-            else:
-                category = method_data['Category'].iloc[0]
-            
-            stats = {
-                'MethodName': method_name,
-                'Category': category,
-                'TotalCalls': method_data['Count'].sum() if 'Count' in method_data.columns else len(method_data),
-                'AvgDurationMs': avg_duration,
-                'MaxDurationMs': durations.max(),
-                'MinDurationMs': durations.min(),
-                'StdDevMs': durations.std(),
-                'FramesActive': len(frame_totals),
-                'AvgTotalPerFrameMs': frame_totals.mean(),
-                'MaxTotalPerFrameMs': frame_totals.max(),
-                'SpikeCount': len(spike_records),
-                'SpikeThreshold': spike_threshold,
-                'AvgCallsPerFrame': frame_calls.mean(),
-                'MaxCallsPerFrame': frame_calls.max(),
-                'MinCallsPerFrame': frame_calls.min(),
-                'AvgMemoryMB': method_data['MemoryMB'].mean() if 'MemoryMB' in method_data.columns else 0,
-                'MaxMemoryMB': method_data['MemoryMB'].max() if 'MemoryMB' in method_data.columns else 0,
-                # パフォーマンス指標
-                'TotalImpactMs': frame_totals.sum(),
-                'ImpactPercentage': 0,  # 後で計算
-                'PerformanceScore': avg_duration * (method_data['Count'].sum() if 'Count' in method_data.columns else len(method_data))  # 影響度スコア
-            }
-            method_stats.append(stats)
+        # フレーム別（レーンをまとめる）
+        frames = aggregates['frames'].groupby(['Description', 'Frame'], observed=True)[['TotalMs', 'Calls']].sum()
+        frame_totals = frames['TotalMs'].groupby(level='Description', observed=True)
+        frame_calls = frames['Calls'].groupby(level='Description', observed=True)
         
-        # DataFrameに変換
-        stats_df = pd.DataFrame(method_stats)
+        stats_df = pd.DataFrame({
+            'MethodName': per_method.index.astype(str),
+            'Category': methods['Category'].reindex(per_method.index).to_numpy(),
+            'Lane': methods['Lane'].reindex(per_method.index).to_numpy(),
+            'TotalCalls': per_method['Weight'].to_numpy(),
+            # 95%信頼区間の半幅（全数記録なら0）
+            'TotalCallsCI95': reservoir.CONFIDENCE_Z * np.sqrt(per_method['Excess'].to_numpy()),
+            'AvgDurationMs': avg_duration.to_numpy(),
+            'MaxDurationMs': values.max().reindex(per_method.index).to_numpy(),
+            'MinDurationMs': values.min().reindex(per_method.index).to_numpy(),
+            'StdDevMs': np.where(per_method['Rows'] > 1, std_duration.reindex(per_method.index), np.nan),
+            'FramesActive': frame_totals.size().reindex(per_method.index).to_numpy(),
+            'AvgTotalPerFrameMs': frame_totals.mean().reindex(per_method.index).to_numpy(),
+            'MaxTotalPerFrameMs': frame_totals.max().reindex(per_method.index).to_numpy(),
+            'SpikeCount': spike_count.reindex(per_method.index).to_numpy(),
+            'SpikeThreshold': spike_threshold.to_numpy(),
+            'AvgCallsPerFrame': frame_calls.mean().reindex(per_method.index).to_numpy(),
+            'MaxCallsPerFrame': frame_calls.max().reindex(per_method.index).to_numpy(),
+            'MinCallsPerFrame': frame_calls.min().reindex(per_method.index).to_numpy(),
+            'AvgMemoryMB': methods['AvgMemoryMB'].reindex(per_method.index).to_numpy(),
+            'MaxMemoryMB': methods['MaxMemoryMB'].reindex(per_method.index).to_numpy(),
+            # パフォーマンス指標
+            'TotalImpactMs': frame_totals.sum().reindex(per_method.index).to_numpy(),
+            'TotalImpactCI95Ms': reservoir.CONFIDENCE_Z * np.sqrt(per_method['ExcessSq'].to_numpy()),
+            'ImpactPercentage': 0.0,  # 後で計算
+            'PerformanceScore': per_method['Total'].to_numpy(),  # 影響度スコア（平均 × 呼び出し数）
+        })
         
-        # 影響度パーセンテージを計算
-        total_impact = stats_df['TotalImpactMs'].sum()
+        # 影響度パーセンテージを計算（スレッドレーンは並行動作のためレーン内で算出）
+        total_impact = stats_df.groupby('Lane')['TotalImpactMs'].transform('sum')
         stats_df['ImpactPercentage'] = (stats_df['TotalImpactMs'] / total_impact * 100)
         
         # パフォーマンススコア順でソート
@@ -176,39 +495,362 @@ class CS1ProfilerAnalyzer:
         """フレーム別統計情報を生成（FPS計算を含む）"""
         print("\n📈 フレーム別統計情報を生成中...")
         
-        frame_stats = []
+        # フレーム時間はメイン（Render）スレッドのみで集計（シミュレーションスレッドは並行動作）
+        frame_df = self.df
+        if 'Lane' in self.df.columns and (self.df['Lane'] == mpsc_trace.LANE_RENDER).any():
+            frame_df = self.df[self.df['Lane'] == mpsc_trace.LANE_RENDER]
         
-        # フォーマットに応じたグループ化
+        # フォーマットに応じたグループ化（self.df には列を追加しない）
         if 'FrameCount' in self.df.columns:
             group_by_col = 'FrameCount'
-            group_label = 'フレーム'
+            group_keys = frame_df['FrameCount']
         else:
             # 新MPSCフォーマットでは時間軸でグループ化
-            self.df['TimeGroup'] = self.df['DateTime'].dt.floor('1S')  # 1秒単位
             group_by_col = 'TimeGroup'
-            group_label = '時間'
+            group_keys = frame_df['DateTime'].dt.floor('1S')  # 1秒単位
         
-        for group_value, group_data in self.df.groupby(group_by_col):
-            total_duration = group_data['TotalDurationPerFrame'].sum()
-            top_methods = group_data.nlargest(5, 'TotalDurationPerFrame')[['Description', 'TotalDurationPerFrame']]
-            
+        # フレームごとの集計は groupby で一括（フレーム数が多くても Python のループにしない）
+        grouped = frame_df.groupby(group_keys)
+        totals = grouped['TotalDurationPerFrame'].sum()
+        frame_stats = pd.DataFrame({
+            'FrameNumber': totals.index.to_numpy(),
+            'FrameTime': grouped['DateTime'].first().to_numpy() if 'DateTime' in frame_df.columns else None,
+            'TotalFrameMs': totals.to_numpy(),
             # FPS計算（推定）: 1000ms / フレーム総処理時間
-            estimated_fps = 1000.0 / total_duration if total_duration > 0 else 60.0  # デフォルト60FPS
-            
-            stats = {
-                'FrameNumber': group_value,
-                'FrameTime': group_data['DateTime'].iloc[0] if 'DateTime' in group_data.columns else None,
-                'TotalFrameMs': total_duration,
-                'EstimatedFPS': estimated_fps,
-                'TotalCalls': group_data['Count'].sum() if 'Count' in group_data.columns else len(group_data),
-                'UniqueMethodCount': len(group_data),
-                'TotalMemoryMB': group_data['MemoryMB'].sum() if 'MemoryMB' in group_data.columns else 0,
-                'TopMethod': top_methods.iloc[0]['Description'] if len(top_methods) > 0 else '',
-                'TopMethodMs': top_methods.iloc[0]['TotalDurationPerFrame'] if len(top_methods) > 0 else 0
-            }
-            frame_stats.append(stats)
+            'EstimatedFPS': np.where(totals > 0, 1000.0 / totals.where(totals > 0, 1.0), 60.0),  # デフォルト60FPS
+            'TotalCalls': (grouped['Count'].sum() if 'Count' in frame_df.columns else grouped.size()).to_numpy(),
+            'UniqueMethodCount': grouped.size().to_numpy(),
+            'TotalMemoryMB': grouped['MemoryMB'].sum().to_numpy() if 'MemoryMB' in frame_df.columns else 0,
+        })
+        
+        # フレーム内で合計時間が最大のメソッド
+        method_totals = frame_df.groupby([group_keys, frame_df['Description']], observed=True)['TotalDurationPerFrame'].sum()
+        top = method_totals.loc[method_totals.groupby(level=0).idxmax()]
+        frame_stats['TopMethod'] = top.index.get_level_values(1).to_numpy()
+        frame_stats['TopMethodMs'] = top.to_numpy()
+        # Ring Bufferオーバーランの影響（>0 の区間は過小評価の可能性）
+        frame_stats['LossRate'] = grouped['LossRate'].max().to_numpy() if 'LossRate' in frame_df.columns else 0.0
+        
+        # #FRAME行があれば実測フレーム間隔からFPSを算出
+        if group_by_col == 'FrameCount' and self.meta is not None and len(self.meta['FRAME']) > 1:
+            markers = self.meta['FRAME'].sort_values('TimeMs', kind='stable')
+            interval = pd.Series(markers['TimeMs'].diff().shift(-1).to_numpy(),
+                                 index=markers['FrameCount'].astype(np.int64).to_numpy())
+            interval = interval[~interval.index.duplicated()]
+            frame_stats['MeasuredFrameMs'] = frame_stats['FrameNumber'].map(interval)
+            frame_stats['MeasuredFPS'] = 1000.0 / frame_stats['MeasuredFrameMs']
         
-        return pd.DataFrame(frame_stats)
+        # #MEM行があればフレームごとのGC回数・推定GC停止時間・ヒープサイズ
+        if group_by_col == 'FrameCount' and self.gc_frames is not None:
+            gc_frames = self.gc_frames.set_index('FrameCount')
+            for column in ('GcCollections', 'GcPauseMs', 'HeapMB'):
+                frame_stats[column] = frame_stats['FrameNumber'].map(gc_frames[column])
+            frame_stats['GcCollections'] = frame_stats['GcCollections'].fillna(0).astype(np.int64)
+            frame_stats['GcPauseMs'] = frame_stats['GcPauseMs'].fillna(0.0)
+        
+        return frame_stats
+
+    def simulation_statistics(self):
+        """
+        シミュレーションスレッドのティック処理量を集計（レンダーFPSとは独立に算出）
+        戻り値: (サマリー辞書, Manager別DataFrame)。シミュレーションイベントがない場合は (None, 空DataFrame)
+        """
+        print("\n⚙️ シミュレーションスレッド統計を生成中...")
+        
+        if 'Lane' not in self.df.columns:
+            return None, pd.DataFrame()
+        
+        sim = self.df[self.df['Lane'] == mpsc_trace.LANE_SIMULATION]
+        steps = sim[sim['Description'].str.endswith(mpsc_trace.SIM_STEP_SUFFIX)]
+        if len(steps) == 0:
+            return None, pd.DataFrame()
+        
+        span_s = (steps['EndTime'].max() - steps['StartTime'].min()) / 1000.0
+        tick_count = steps['Count'].sum()
+        busy_ms = steps['TotalDurationPerFrame'].sum()
+        # 1/Nサンプリングの行は Count 回分のティックを表すため、平均・分位点は Count で重み付け
+        avg_step_ms = busy_ms / tick_count if tick_count > 0 else np.nan
+        ticks_per_second = steps.groupby(steps['DateTime'].dt.floor('1S'))['Count'].sum()
+        if len(ticks_per_second) > 2:
+            ticks_per_second = ticks_per_second.iloc[1:-1]  # 先頭・末尾の端数秒は除外
+        max_ticks_per_second = 1000.0 / avg_step_ms if avg_step_ms > 0 else np.inf
+        
+        summary = {
+            'SimTicks': tick_count,
+            'DurationSec': span_s,
+            'TicksPerSecond': tick_count / span_s if span_s > 0 else 0,
+            'MinTicksPerSecond': ticks_per_second.min(),
+            'AvgStepMs': avg_step_ms,
+            'P95StepMs': reservoir.weighted_quantile(steps['Duration(ms)'].to_numpy(dtype=np.float64),
+                                                     steps['Count'].to_numpy(dtype=np.float64), [0.95])[0],
+            'MaxStepMs': steps['Duration(ms)'].max(),
+            'SimThreadBusyPercent': busy_ms / (span_s * 1000.0) * 100 if span_s > 0 else 0,
+            # シミュレーションスレッドが休みなく回った場合の上限
+            'MaxSustainableTicksPerSecond': max_ticks_per_second,
+            'MaxSustainableSpeed': max_ticks_per_second / self.sim_base_rate,
+        }
+        
+        managers = sim[sim['Description'].str.endswith(mpsc_trace.SIM_MANAGER_STEP_SUFFIX)]
+        manager_stats = []
+        for method_name, manager_data in managers.groupby('Description'):
+            total_ms = manager_data['TotalDurationPerFrame'].sum()
+            calls = manager_data['Count'].sum()
+            manager_stats.append({
+                'Manager': method_name.rsplit('.', 2)[-2],
+                'MethodName': method_name,
+                'TotalMs': total_ms,
+                'Calls': calls,
+                'MsPerSimStep': total_ms / tick_count,
+                'CallsPerSimStep': calls / tick_count,
+                'AvgCallMs': total_ms / calls if calls > 0 else np.nan,
+                'MaxCallMs': manager_data['Duration(ms)'].max(),
+                'ShareOfStepPercent': total_ms / busy_ms * 100 if busy_ms > 0 else 0,
+            })
+        manager_stats = pd.DataFrame(manager_stats)
+        if len(manager_stats) > 0:
+            manager_stats = manager_stats.sort_values('MsPerSimStep', ascending=False)
+        
+        return summary, manager_stats
+
+    def changepoint_statistics(self, frame_stats, method_stats, aggregates=None, top_methods=20, methods_per_breakpoint=5):
+        """
+        フレーム時間とメソッド別コストの時系列から性能の段差（変化点）を検出
+        戻り値: (区間一覧, 変化点ごとのメソッド別コスト変化, メソッド単位の変化点)
+        """
+        print("\n📐 性能変化点を検出中...")
+        
+        # メソッド別の変化量と突き合わせられるよう、実測間隔ではなく計測済み処理時間の合計で検出
+        frame_stats = frame_stats.sort_values('FrameNumber')
+        frame_ms = frame_stats['TotalFrameMs'].to_numpy(dtype=np.float64)
+        frame_numbers = frame_stats['FrameNumber'].to_numpy()
+        frame_times = frame_stats['FrameTime'].to_numpy()
+        n_frames = len(frame_ms)
+        
+        breakpoints = changepoint.binary_segmentation(frame_ms, self.cp_penalty, self.cp_min_size)
+        means = changepoint.segment_means(frame_ms, breakpoints)
+        starts = np.concatenate([[0], breakpoints])
+        ends = np.concatenate([breakpoints, [n_frames]])
+        regimes = pd.DataFrame({
+            'Segment': np.arange(len(starts)),
+            'StartFrame': frame_numbers[starts],
+            'EndFrame': frame_numbers[ends - 1],
+            'StartTime': frame_times[starts],
+            'Frames': ends - starts,
+            'MeanFrameMs': means,
+            'MeanFPS': 1000.0 / means,
+            'DeltaMs': np.concatenate([[0.0], np.diff(means)]),
+        })
+        
+        # メソッド×フレームの集計 → フレーム位置（フレーム統計と同じグループ化キー）
+        if aggregates is None:
+            aggregates = self.event_aggregates()
+        frames = aggregates['frames']
+        position = pd.Index(frame_numbers).get_indexer(frames['Frame'])
+        valid = position >= 0
+        position = position[valid]
+        weights = frames['TotalMs'].to_numpy(dtype=np.float64)[valid]
+        codes, methods = pd.factorize(frames['Description'].astype(str).to_numpy()[valid])
+        # 変化点ごとの寄与はフレーム時間（frame_statistics）と同じく Render レーンのみで集計
+        # （シミュレーション・ワーカースレッドは並行動作のためフレーム時間の段差には含まれない）
+        lanes = frames['Lane'].astype(str).to_numpy()[valid]
+        render_only = bool((lanes == mpsc_trace.LANE_RENDER).any())
+        in_frame = lanes == mpsc_trace.LANE_RENDER if render_only else np.ones(len(codes), dtype=bool)
+        
+        # 変化点前後の区間でメソッドごとの平均ms/frameを一括集計（メソッド×区間）
+        segment_of_frame = np.zeros(n_frames, dtype=np.int64)
+        segment_of_frame[breakpoints] = 1
+        segment_of_frame = np.cumsum(segment_of_frame)
+        n_segments = len(starts)
+        segment_totals = np.bincount(codes[in_frame] * n_segments + segment_of_frame[position[in_frame]],
+                                     weights=weights[in_frame],
+                                     minlength=len(methods) * n_segments).reshape(len(methods), n_segments)
+        segment_per_frame = segment_totals / (ends - starts)[None, :]
+        
+        lane_of_method = method_stats.set_index('MethodName')['Lane']
+        attribution = []
+        candidates = np.flatnonzero(segment_totals.any(axis=1))  # フレーム時間に寄与するメソッド
+        for i, frame_index in enumerate(breakpoints):
+            delta = segment_per_frame[:, i + 1] - segment_per_frame[:, i]
+            for m in candidates[np.argsort(-np.abs(delta[candidates]), kind='stable')][:methods_per_breakpoint]:
+                attribution.append({
+                    'Breakpoint': i + 1,
+                    'FrameNumber': frame_numbers[frame_index],
+                    'FrameTime': frame_times[frame_index],
+                    'Method': methods[m],
+                    'Lane': mpsc_trace.LANE_RENDER if render_only else lane_of_method.get(methods[m], ''),
+                    'BeforeMsPerFrame': segment_per_frame[m, i],
+                    'AfterMsPerFrame': segment_per_frame[m, i + 1],
+                    'DeltaMs': delta[m],
+                    'ShareOfShiftPercent': delta[m] / regimes['DeltaMs'].iloc[i + 1] * 100 if regimes['DeltaMs'].iloc[i + 1] != 0 else 0.0,
+                })
+        
+        # 影響度上位メソッドは個別の時系列でも変化点を検出
+        method_changepoints = []
+        top = method_stats.nlargest(top_methods, 'TotalImpactMs')['MethodName']
+        top_codes = pd.Index(methods).get_indexer(top)
+        top_codes = top_codes[top_codes >= 0]
+        row_of_code = np.full(len(methods), -1, dtype=np.int64)
+        row_of_code[top_codes] = np.arange(len(top_codes))
+        rows = row_of_code[codes]
+        selected = rows >= 0
+        series = np.bincount(rows[selected] * n_frames + position[selected], weights=weights[selected],
+                             minlength=len(top_codes) * n_frames).reshape(len(top_codes), n_frames)
+        for code, method_series in zip(top_codes, series):
+            method_breakpoints = changepoint.binary_segmentation(method_series, self.cp_penalty, self.cp_min_size)
+            method_means = changepoint.segment_means(method_series, method_breakpoints)
+            for i, frame_index in enumerate(method_breakpoints):
+                method_changepoints.append({
+                    'Method': methods[code],
+                    'FrameNumber': frame_numbers[frame_index],
+                    'FrameTime': frame_times[frame_index],
+                    'BeforeMsPerFrame': method_means[i],
+                    'AfterMsPerFrame': method_means[i + 1],
+                    'DeltaMs': method_means[i + 1] - method_means[i],
+                })
+        
+        method_changepoints = pd.DataFrame(method_changepoints,
+                                           columns=['Method', 'FrameNumber', 'FrameTime', 'BeforeMsPerFrame', 'AfterMsPerFrame', 'DeltaMs'])
+        return regimes, pd.DataFrame(attribution), method_changepoints.sort_values('FrameNumber', kind='stable')
+    
+    def event_adjustments(self):
+        """
+        トレースをブロック単位で読み直すステージ（リザーバー）が df と同じ値を再現するための小さな表
+        読み込み範囲・ロス補正の区間・GC帰属で短くしたイベント・GC擬似イベント
+        MPSCトレース以外（旧フォーマット、小さい）は必要な列だけをそのまま渡す
+        """
+        adjustments = {'range': self.event_range, 'loss_windows': None, 'gc_moved': None, 'gc_rows': None, 'events': None}
+        if not mpsc_trace.is_event_header(mpsc_trace.read_header(self.csv_file)):
+            columns = ['Description', 'Duration(ms)'] + (['Count'] if 'Count' in self.df.columns else [])
+            adjustments['events'] = self.df[columns]
+            return adjustments
+        if self.reweight_loss and len(self.loss_windows) > 0 and self.loss_windows['Dropped'].sum() > 0:
+            adjustments['loss_windows'] = self.loss_windows
+        if 'GcAttributedMs' in self.df.columns:
+            keys = [column for column in GC_EVENT_KEYS if column in self.df.columns]
+            moved = self.df.loc[self.df['GcAttributedMs'] > 0, keys + ['GcAttributedMs']]
+            adjustments['gc_moved'] = moved.astype({key: np.float64 for key in keys if key != 'MethodName'})
+            adjustments['gc_rows'] = self.df.loc[self.df['MethodName'] == GC_METHOD_NAME, ['Duration(ms)', 'Count']]
+        return adjustments
+
+    def method_reservoirs(self, adjustments=None):
+        """
+        メソッド別の処理時間リザーバー（正確な呼び出し数・合計と固定数のサンプル）
+        MPSCトレースはインデックスのブロック単位で読み直すため、メモリはトレース長によらず
+        メソッド数 × reservoir_size 件（+ 64MBの解析単位）に収まる。重みと処理時間には df と同じ補正を適用する
+        戻り値: (メソッド名リスト, MethodReservoir)
+        """
+        print(f"\n🎲 処理時間リザーバーを作成中（メソッドあたり {self.reservoir_size} サンプル）...")
+        if adjustments is None:
+            adjustments = self.event_adjustments()
+        sampler = reservoir.MethodReservoir(self.reservoir_size)
+        
+        if adjustments['events'] is not None:
+            events = adjustments['events']
+            codes, methods = pd.factorize(events['Description'])
+            durations = events['Duration(ms)'].to_numpy(dtype=np.float64)
+            weights = events['Count'].to_numpy(dtype=np.float64) if 'Count' in events.columns else None
+            for begin in range(0, len(codes), RESERVOIR_CHUNK_ROWS):
+                end = begin + RESERVOIR_CHUNK_ROWS
+                sampler.add(codes[begin:end], durations[begin:end], None if weights is None else weights[begin:end])
+            return list(methods), sampler
+        
+        method_ids = {}
+        loss_windows = adjustments['loss_windows']
+        moved = adjustments['gc_moved']
+        keys = []
+        if moved is not None and len(moved) > 0:
+            keys = [column for column in GC_EVENT_KEYS if column in moved.columns]
+            moved = moved.drop_duplicates(keys).set_index(keys)['GcAttributedMs']
+        
+        index = mpsc_trace.load_index(self.csv_file)
+        for events, _ in mpsc_trace.iter_time_range(self.csv_file, index, *adjustments['range']):
+            names = events['MethodName']
+            for name in names.unique():
+                method_ids.setdefault(name, len(method_ids))
+            codes = names.map(method_ids).to_numpy(dtype=np.int64)
+            durations = events['Duration(ms)'].to_numpy(dtype=np.float64)
+            if keys:
+                lookup = pd.MultiIndex.from_frame(events[keys].astype({key: np.float64 for key in keys if key != 'MethodName'}))
+                durations = durations - moved.reindex(lookup).fillna(0.0).to_numpy()
+            # Count列（ロス補正後を含む）をサンプリングの重みにする
+            weights = events['Count'].to_numpy(dtype=np.float64) if 'Count' in events.columns else np.ones(len(events))
+            if loss_windows is not None:
+                window_idx = mpsc_trace.assign_windows(events['EndTime'], loss_windows)
+                loss_rate = loss_windows['LossRate'].to_numpy(dtype=np.float64)
+                rate = np.where(window_idx >= 0, loss_rate[np.clip(window_idx, 0, None)], 0.0)
+                weights = weights / (1.0 - np.clip(rate, None, 0.99))
+            sampler.add(codes, durations, weights)
+        
+        gc_rows = adjustments['gc_rows']
+        if gc_rows is not None and len(gc_rows) > 0:
+            gc_id = method_ids.setdefault(GC_METHOD_NAME, len(method_ids))
+            sampler.add(np.full(len(gc_rows), gc_id), gc_rows['Duration(ms)'].to_numpy(dtype=np.float64),
+                        gc_rows['Count'].to_numpy(dtype=np.float64))
+        return list(method_ids), sampler
+
+    def method_time_heatmap(self):
+        """
+        メソッド × 時間バケットのヒートマップ（配列サイズはメソッド数 × バケット数で、レコード数に依存しない）
+        時刻は StartTime（無い旧フォーマットは DateTime）、値は TotalDurationPerFrame の合計
+        """
+        print(f"\n🔥 メソッド × 時間ヒートマップを作成中（{method_heatmap.DEFAULT_WIDTH} バケット）...")
+        if 'StartTime' in self.df.columns:
+            start_ms = self.df['StartTime'].to_numpy(dtype=np.float64)
+        elif 'DateTime' in self.df.columns:
+            start_ms = self.df['DateTime'].astype('int64').to_numpy() / 1e6
+        else:
+            return None
+        heatmap = method_heatmap.MethodTimeHeatmap(np.nanmin(start_ms), np.nanmax(start_ms))
+        names = self.df['Description'].to_numpy()
+        weights = self.df['TotalDurationPerFrame'].to_numpy(dtype=np.float64)
+        for begin in range(0, len(names), RESERVOIR_CHUNK_ROWS):
+            end = begin + RESERVOIR_CHUNK_ROWS
+            heatmap.add(names[begin:end], start_ms[begin:end], weights[begin:end])
+        return heatmap
+
+    def duration_distributions(self, reservoirs):
+        """
+        リザーバーからメソッド別の処理時間分布を作成
+        戻り値: (分位点サマリー, 推定ヒストグラム（縦持ち）, 保持サンプル（縦持ち）)
+        """
+        methods, sampler = reservoirs
+        edges = html_report.HISTOGRAM_EDGES_MS
+        summary, histograms, samples = [], [], []
+        for method_id, method in enumerate(methods):
+            values = sampler.samples(method_id)
+            p50, p90, p95, p99 = sampler.quantiles(method_id, [0.5, 0.9, 0.95, 0.99])
+            (p50_low, p50_high), (p95_low, p95_high), (p99_low, p99_high) = sampler.quantile_intervals(method_id, [0.5, 0.95, 0.99])
+            summary.append({
+                'MethodName': method,
+                'Calls': sampler.weight[method_id],
+                'Events': sampler.events[method_id],
+                'TotalMs': sampler.total[method_id],
+                'AvgDurationMs': sampler.total[method_id] / sampler.weight[method_id] if sampler.weight[method_id] > 0 else np.nan,
+                'MaxDurationMs': sampler.max[method_id],
+                'SampleSize': len(values),
+                'EffectiveSampleSize': sampler.effective_size(method_id),
+                'P50Ms': p50,
+                'P90Ms': p90,
+                'P95Ms': p95,
+                'P99Ms': p99,
+                # 分位点の95%信頼区間（順序統計量の二項近似）
+                'P50LowMs': p50_low,
+                'P50HighMs': p50_high,
+                'P95LowMs': p95_low,
+                'P95HighMs': p95_high,
+                'P99LowMs': p99_low,
+                'P99HighMs': p99_high,
+            })
+            counts = sampler.histogram(method_id, edges)
+            nonzero = np.flatnonzero(counts)
+            histograms.append(pd.DataFrame({'MethodName': method, 'BinLowMs': edges[nonzero],
+                                            'BinHighMs': edges[nonzero + 1], 'EstimatedCalls': counts[nonzero]}))
+            samples.append(pd.DataFrame({'MethodName': method, 'DurationMs': values}))
+        
+        summary = pd.DataFrame(summary).sort_values('TotalMs', ascending=False)
+        histograms = pd.concat(histograms, ignore_index=True) if histograms else pd.DataFrame()
+        samples = pd.concat(samples, ignore_index=True) if samples else pd.DataFrame()
+        return summary, histograms, samples
 
     def category_statistics(self):
         """カテゴリ別統計情報を生成"""
@@ -216,12 +858,18 @@ class CS1ProfilerAnalyzer:
         
         category_stats = []
         
-        # Category列がない場合はDescription（メソッド名）から推定
-        if 'Category' not in self.df.columns:
-            self.df['Category'] = self.df['Description'].apply(self._extract_category)
+        # Category列がない場合はDescription（メソッド名）から推定（self.df には列を追加しない）
+        if 'Category' in self.df.columns:
+            categories = self.df['Category']
+        else:
+            categories = self.df['Description'].apply(self._extract_category)
         
-        for category, category_data in self.df.groupby('Category'):
+        for category, category_data in self.df.groupby(categories):
             durations = category_data['Duration(ms)']
+            # 1回あたりの値は method_statistics と同じく重み（Count）付き
+            weights = category_data['Count'] if 'Count' in category_data.columns else pd.Series(1.0, index=category_data.index)
+            avg_duration = np.average(durations, weights=weights)
+            std_duration = np.sqrt(np.average(np.square(durations - avg_duration), weights=weights)) if len(durations) > 1 else np.nan
             
             # フォーマットに応じたグループ化
             if 'FrameCount' in self.df.columns:
@@ -233,10 +881,10 @@ class CS1ProfilerAnalyzer:
             stats = {
                 'Category': category,
                 'MethodCount': len(category_data['Description'].unique()),
-                'TotalCalls': category_data['Count'].sum() if 'Count' in category_data.columns else len(category_data),
-                'AvgDurationMs': durations.mean(),
+                'TotalCalls': weights.sum(),
+                'AvgDurationMs': avg_duration,
                 'MaxDurationMs': durations.max(),
-                'StdDevMs': durations.std(),
+                'StdDevMs': std_duration,
                 'TotalImpactMs': frame_totals.sum(),
                 'AvgImpactPerFrameMs': frame_totals.mean(),
                 'AvgMemoryMB': category_data['MemoryMB'].mean() if 'MemoryMB' in category_data.columns else 0
@@ -269,7 +917,7 @@ class CS1ProfilerAnalyzer:
             issues.append({
                 'Type': 'スパイク多発',
                 'Method': method['MethodName'],
-                'Issue': f"{method['SpikeCount']} 回のスパイク発生",
+                'Issue': f"{method['SpikeCount']:.0f} 回のスパイク発生",
                 'Value': f"最大 {method['MaxDurationMs']:.2f}ms",
                 'Severity': 'HIGH' if method['SpikeCount'] > 50 else 'MEDIUM'
             })
@@ -290,13 +938,92 @@ class CS1ProfilerAnalyzer:
         
         return pd.DataFrame(issues)
 
-    def generate_visualizations(self, method_stats, frame_stats, output_dir='analysis_output'):
+    def generate_visualizations(self, method_stats, frame_stats, output_dir='analysis_output', changepoints=None,
+                                category_stats=None, reservoirs=None):
         """可視化グラフを生成"""
         print(f"\n📊 可視化グラフを生成中... ({output_dir}/)")
         
         os.makedirs(output_dir, exist_ok=True)
         
-        # 1. トップ15メソッドの影響度
+        if category_stats is None:
+            category_stats = self.category_statistics()
+        self.plot_top_methods(method_stats, f'{output_dir}/top15_methods.png')
+        self.plot_category_impact(category_stats, f'{output_dir}/category_impact.png')
+        self.plot_frame_timeline(frame_stats, f'{output_dir}/frame_timeline_fps.png', changepoints)
+        self.plot_spike_analysis(method_stats, f'{output_dir}/spike_analysis.png')
+        if reservoirs is None:
+            reservoirs = self.method_reservoirs()
+        self.plot_duration_violins(method_stats, f'{output_dir}/duration_violins.png', reservoirs)
+        self.plot_duration_histograms(method_stats, f'{output_dir}/duration_histograms.png', reservoirs)
+        self.plot_memory_timeline(self.memory_statistics(), f'{output_dir}/memory_timeline.png')
+        self.plot_method_heatmap(self.method_time_heatmap(), f'{output_dir}/method_time_heatmap.png')
+
+    def _distribution_methods(self, method_stats, reservoirs):
+        """分布グラフの対象（総影響度上位でサンプルのあるメソッド）"""
+        methods, sampler = reservoirs
+        method_ids = {method: method_id for method_id, method in enumerate(methods)}
+        selected = []
+        for method in method_stats.sort_values('TotalImpactMs', ascending=False)['MethodName']:
+            method_id = method_ids.get(method)
+            if method_id is not None and len(sampler.samples(method_id)) > 0:
+                selected.append((method, sampler.samples(method_id)))
+            if len(selected) == DISTRIBUTION_PLOT_METHODS:
+                break
+        return selected
+
+    def plot_duration_violins(self, method_stats, output, reservoirs):
+        """上位メソッドの処理時間分布（バイオリン図、対数軸）"""
+        selected = self._distribution_methods(method_stats, reservoirs)
+        if not selected:
+            return False
+        plt.figure(figsize=(14, 8))
+        log_samples = [np.log10(np.maximum(values, 1e-4)) for _, values in selected]
+        plt.violinplot(log_samples, vert=False, showmedians=True, showextrema=True)
+        plt.yticks(range(1, len(selected) + 1), [name[:40] + '...' if len(name) > 40 else name for name, _ in selected])
+        ticks = np.arange(np.floor(min(v.min() for v in log_samples)), np.ceil(max(v.max() for v in log_samples)) + 1)
+        plt.xticks(ticks, [f'{10 ** t:g}' for t in ticks])
+        plt.xlabel('1回あたりの処理時間 (ms, 対数軸)')
+        plt.title(f'処理時間の分布 (総影響度Top{len(selected)}, メソッドあたり最大{self.reservoir_size}サンプル)')
+        plt.gca().invert_yaxis()
+        plt.grid(True, axis='x', alpha=0.3)
+        plt.tight_layout()
+        plt.savefig(output, format='png', dpi=300, bbox_inches='tight')
+        plt.close()
+        return True
+
+    def plot_duration_histograms(self, method_stats, output, reservoirs):
+        """上位メソッドの処理時間ヒストグラム（推定呼び出し回数、対数ビン）"""
+        selected = self._distribution_methods(method_stats, reservoirs)
+        if not selected:
+            return False
+        methods, sampler = reservoirs
+        method_ids = {method: method_id for method_id, method in enumerate(methods)}
+        edges = html_report.HISTOGRAM_EDGES_MS
+        columns = 4
+        rows = -(-len(selected) // columns)
+        fig, axes = plt.subplots(rows, columns, figsize=(16, 3.2 * rows), squeeze=False)
+        for ax, (method, values) in zip(axes.flat, selected):
+            counts = sampler.histogram(method_ids[method], edges)
+            used = np.flatnonzero(counts)
+            if len(used) == 0:
+                ax.axis('off')  # 重みが全て0のメソッド
+                continue
+            lo, hi = max(used[0] - 1, 0), min(used[-1] + 2, len(edges) - 1)
+            ax.stairs(counts[lo:hi], edges[lo:hi + 1], fill=True, alpha=0.7)
+            ax.set_xscale('log')
+            ax.set_title('...' + method[-37:] if len(method) > 40 else method, fontsize=9)
+            ax.set_xlabel('ms', fontsize=8)
+            ax.tick_params(labelsize=7)
+        for ax in list(axes.flat)[len(selected):]:
+            ax.axis('off')
+        fig.suptitle('メソッド別 処理時間ヒストグラム（リザーバーから推定した呼び出し回数）')
+        plt.tight_layout()
+        plt.savefig(output, format='png', dpi=300, bbox_inches='tight')
+        plt.close()
+        return True
+
+    def plot_top_methods(self, method_stats, output):
+        """トップ15メソッドの影響度"""
         plt.figure(figsize=(14, 8))
         top15 = method_stats.head(15)
         bars = plt.barh(range(len(top15)), top15['AvgTotalPerFrameMs'])
@@ -312,18 +1039,19 @@ class CS1ProfilerAnalyzer:
                     f'{width:.2f}ms', ha='left', va='center')
         
         plt.tight_layout()
-        plt.savefig(f'{output_dir}/top15_methods.png', dpi=300, bbox_inches='tight')
+        plt.savefig(output, format='png', dpi=300, bbox_inches='tight')
         plt.close()
-        
-        # 2. カテゴリ別影響度（円グラフ）
-        category_stats = self.category_statistics()
+
+    def plot_category_impact(self, category_stats, output):
+        """カテゴリ別影響度（円グラフ）"""
         plt.figure(figsize=(10, 8))
         plt.pie(category_stats['TotalImpactMs'], labels=category_stats['Category'], autopct='%1.1f%%')
         plt.title('カテゴリ別パフォーマンス影響度')
-        plt.savefig(f'{output_dir}/category_impact.png', dpi=300, bbox_inches='tight')
+        plt.savefig(output, format='png', dpi=300, bbox_inches='tight')
         plt.close()
-        
-        # 3. フレーム別負荷推移とFPS
+
+    def plot_frame_timeline(self, frame_stats, output, changepoints=None):
+        """フレーム別負荷推移とFPS"""
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 10))
         
         # 上段: フレーム処理時間
@@ -341,6 +1069,11 @@ class CS1ProfilerAnalyzer:
                        color='red', s=50, alpha=0.8, label=f'スパイク({len(spikes)}回)')
             ax1.legend()
         
+        # 変化点（区間の開始フレーム）
+        if changepoints is not None:
+            for _, regime in changepoints[0].iloc[1:].iterrows():
+                ax1.axvline(x=regime['StartFrame'], color='purple', linestyle=':', alpha=0.8)
+        
         # 下段: 推定FPS
         ax2.plot(frame_stats['FrameNumber'], frame_stats['EstimatedFPS'], alpha=0.7, color='green', label='推定FPS')
         ax2.set_xlabel('フレーム番号')
@@ -352,33 +1085,105 @@ class CS1ProfilerAnalyzer:
         ax2.legend()
         
         plt.tight_layout()
-        plt.savefig(f'{output_dir}/frame_timeline_fps.png', dpi=300, bbox_inches='tight')
+        plt.savefig(output, format='png', dpi=300, bbox_inches='tight')
         plt.close()
-        
-        # 4. スパイク分析（ヒストグラム）
+
+    def plot_spike_analysis(self, method_stats, output):
+        """スパイク分析（スパイクのあるメソッドがない場合は出力しない）"""
         spike_methods = method_stats[method_stats['SpikeCount'] > 0].head(10)
-        if len(spike_methods) > 0:
-            plt.figure(figsize=(12, 6))
-            plt.bar(range(len(spike_methods)), spike_methods['SpikeCount'])
-            plt.xticks(range(len(spike_methods)), 
-                      [name[:20] + '...' if len(name) > 20 else name for name in spike_methods['MethodName']], 
-                      rotation=45, ha='right')
-            plt.ylabel('スパイク回数')
-            plt.title('メソッド別スパイク発生回数 (Top10)')
-            plt.tight_layout()
-            plt.savefig(f'{output_dir}/spike_analysis.png', dpi=300, bbox_inches='tight')
-            plt.close()
-
-    def export_results(self, method_stats, frame_stats, issues, output_dir='analysis_output'):
+        if len(spike_methods) == 0:
+            return False
+        plt.figure(figsize=(12, 6))
+        plt.bar(range(len(spike_methods)), spike_methods['SpikeCount'])
+        plt.xticks(range(len(spike_methods)), 
+                  [name[:20] + '...' if len(name) > 20 else name for name in spike_methods['MethodName']], 
+                  rotation=45, ha='right')
+        plt.ylabel('スパイク回数')
+        plt.title('メソッド別スパイク発生回数 (Top10)')
+        plt.tight_layout()
+        plt.savefig(output, format='png', dpi=300, bbox_inches='tight')
+        plt.close()
+        return True
+
+    def plot_memory_timeline(self, memory, output):
+        """ヒープサイズ・GC発生・割り当て速度の推移（#MEM行がない場合は出力しない）"""
+        gc_frames, allocation = memory
+        if gc_frames is None or len(allocation) == 0:
+            return False
+        fig, (heap_ax, alloc_ax) = plt.subplots(2, 1, figsize=(15, 9), sharex=True)
+        start_ms = allocation['WindowStartMs'].iloc[0]
+        
+        heap_ax.plot((gc_frames['StartMs'] - start_ms) / 1000.0, gc_frames['HeapMB'], color='tab:blue', label='ヒープ (MB)')
+        gc = gc_frames[gc_frames['GcCollections'] > 0]
+        heap_ax.set_ylabel('ヒープ (MB)')
+        heap_ax.set_title(f'ヒープサイズとGC ({int(gc["GcCollections"].sum())} 回, 推定停止時間 合計 {gc["GcPauseMs"].sum():.0f}ms)')
+        heap_ax.grid(True, alpha=0.3)
+        pause_ax = heap_ax.twinx()
+        pause_ax.bar((gc['StartMs'] - start_ms) / 1000.0, gc['GcPauseMs'], width=0.3, color='tab:red', alpha=0.7, label='GC停止 (ms)')
+        pause_ax.set_ylabel('推定GC停止時間 (ms)')
+        heap_ax.legend(loc='upper left')
+        pause_ax.legend(loc='upper right')
+        
+        alloc_ax.plot((allocation['WindowStartMs'] - start_ms) / 1000.0, allocation['AllocMBPerSec'], color='tab:green')
+        alloc_ax.set_xlabel('経過時間 (秒)')
+        alloc_ax.set_ylabel('割り当て速度 (MB/秒)')
+        alloc_ax.set_ylim(bottom=0)
+        alloc_ax.set_title(f'割り当て速度（{ALLOCATION_WINDOW_MS / 1000:.0f}秒区間、GCをまたぐサンプル間隔を除く）')
+        alloc_ax.grid(True, alpha=0.3)
+        
+        plt.tight_layout()
+        plt.savefig(output, format='png', dpi=300, bbox_inches='tight')
+        plt.close()
+        return True
+
+    def plot_method_heatmap(self, heatmap, output):
+        """メソッド × 時間ヒートマップ（総時間上位、行は --heatmap-order の順）"""
+        if heatmap is None:
+            return False
+        return method_heatmap.plot_heatmap(heatmap, output, order=self.heatmap_order)
+
+    def build_html_report(self, frame_stats, method_stats, changepoints=None, aggregates=None):
+        """事前集計データを埋め込んだ単一ファイルの対話型HTMLレポート（ファイルサイズはトレース長に依存しない）"""
+        print("\n🌐 対話型HTMLレポートを生成中...")
+        if aggregates is None:
+            aggregates = self.event_aggregates()
+        data = html_report.build_report_data(aggregates, frame_stats, method_stats, changepoints,
+                                             title=f'CS1Profiler: {os.path.basename(self.csv_file)}')
+        return html_report.render_html(data)
+
+    def export_results(self, method_stats, frame_stats, issues, output_dir='analysis_output', simulation=None, changepoints=None,
+                       info=None, distributions=None, memory=None):
         """解析結果をエクスポート"""
         print(f"\n💾 解析結果をエクスポート中... ({output_dir}/)")
         
         os.makedirs(output_dir, exist_ok=True)
+        if info is None:
+            info = self.trace_info()
+        loss_windows = info['LossWindows']
         
         # 統計結果のエクスポート
         method_stats.to_csv(f'{output_dir}/method_statistics.csv', index=False, encoding='utf-8-sig')
         frame_stats.to_csv(f'{output_dir}/frame_statistics.csv', index=False, encoding='utf-8-sig')
         issues.to_csv(f'{output_dir}/performance_issues.csv', index=False, encoding='utf-8-sig')
+        if len(loss_windows) > 0:
+            loss_windows.to_csv(f'{output_dir}/loss_windows.csv', index=False, encoding='utf-8-sig')
+        sim_summary, sim_managers = simulation if simulation is not None else (None, pd.DataFrame())
+        if len(sim_managers) > 0:
+            sim_managers.to_csv(f'{output_dir}/simulation_managers.csv', index=False, encoding='utf-8-sig')
+        if changepoints is not None:
+            regimes, cp_methods, method_changepoints = changepoints
+            regimes.to_csv(f'{output_dir}/changepoints.csv', index=False, encoding='utf-8-sig')
+            cp_methods.to_csv(f'{output_dir}/changepoint_methods.csv', index=False, encoding='utf-8-sig')
+            method_changepoints.to_csv(f'{output_dir}/method_changepoints.csv', index=False, encoding='utf-8-sig')
+        if distributions is not None:
+            dist_summary, dist_histograms, dist_samples = distributions
+            dist_summary.to_csv(f'{output_dir}/method_duration_distribution.csv', index=False, encoding='utf-8-sig')
+            dist_histograms.to_csv(f'{output_dir}/method_duration_histograms.csv', index=False, encoding='utf-8-sig')
+            dist_samples.to_csv(f'{output_dir}/method_duration_samples.csv', index=False, encoding='utf-8-sig')
+        gc_frames, allocation = memory if memory is not None else (None, pd.DataFrame())
+        if gc_frames is not None:
+            gc_frames[gc_frames['GcCollections'] > 0].to_csv(f'{output_dir}/gc_frames.csv', index=False, encoding='utf-8-sig')
+            allocation.to_csv(f'{output_dir}/allocation_rate.csv', index=False, encoding='utf-8-sig')
         
         # サマリーレポートの生成
         with open(f'{output_dir}/analysis_report.txt', 'w', encoding='utf-8') as f:
@@ -386,12 +1191,15 @@ class CS1ProfilerAnalyzer:
             f.write("=" * 50 + "\n")
             f.write(f"解析日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             f.write(f"データファイル: {self.csv_file}\n")
-            f.write(f"総レコード数: {len(self.df)}\n")
-            if 'FrameCount' in self.df.columns:
-                f.write(f"解析フレーム数: {self.df['FrameCount'].nunique()}\n")
+            f.write(f"総レコード数: {info['Records']}\n")
+            if info['Frames'] is not None:
+                f.write(f"解析フレーム数: {info['Frames']}\n")
             else:
-                f.write(f"解析時間範囲: {self.df['DateTime'].min()} ～ {self.df['DateTime'].max()}\n")
-            f.write(f"総メソッド数: {self.df['Description'].nunique()}\n\n")
+                f.write(f"解析時間範囲: {info['TimeRange'][0]} ～ {info['TimeRange'][1]}\n")
+            f.write(f"総メソッド数: {info['Methods']}\n")
+            if info['MalformedLines']:
+                f.write(f"スキップした不正行: {info['MalformedLines']}\n")
+            f.write("\n")
             
             # FPS統計
             f.write("📊 FPS統計\n")
@@ -407,6 +1215,96 @@ class CS1ProfilerAnalyzer:
             f.write(f"FPS標準偏差: {fps_std:.1f}\n")
             f.write(f"30FPS未満フレーム数: {low_fps_frames} / {len(frame_stats)} ({low_fps_frames/len(frame_stats)*100:.1f}%)\n\n")
             
+            # イベントロス統計
+            if len(loss_windows) > 0:
+                f.write("📉 イベントロス（Ring Bufferオーバーラン）\n")
+                f.write("-" * 30 + "\n")
+                dropped = loss_windows['Dropped'].sum()
+                attempted = dropped + loss_windows['Enqueued'].sum()
+                lossy = loss_windows[loss_windows['Dropped'] > 0]
+                f.write(f"Dropイベント数: {dropped:.0f} / {attempted:.0f} ({dropped / attempted * 100 if attempted > 0 else 0:.2f}%)\n")
+                f.write(f"ロス発生区間: {len(lossy)} / {len(loss_windows)}\n")
+                if len(lossy) > 0:
+                    f.write(f"最大ロス率: {lossy['LossRate'].max() * 100:.1f}%\n")
+                    if self.reweight_loss:
+                        f.write("補正: 1/(1-LossRate) で重み付け済み\n")
+                    else:
+                        f.write("補正: なし（--reweight-loss で補正）\n")
+                        f.write("※ ロス区間の TotalCalls / TotalImpactMs は過小評価の可能性があります（frame_statistics.csv の LossRate 列を参照）\n")
+                f.write("\n")
+            
+            # 重み付き推定（Count > 1 の行: 1/Nサンプリング・ロス補正）
+            if (method_stats['TotalImpactCI95Ms'] > 0).any():
+                f.write("🎯 重み付き推定（1/Nサンプリング・ロス補正）\n")
+                f.write("-" * 30 + "\n")
+                for lane, lane_stats in method_stats.groupby('Lane'):
+                    ci = np.sqrt(np.square(lane_stats['TotalImpactCI95Ms']).sum())
+                    f.write(f"{lane or '全体'}: 合計 {lane_stats['TotalImpactMs'].sum():.1f} ± {ci:.1f}ms "
+                            f"({lane_stats['TotalCalls'].sum():.0f} 回)\n")
+                f.write("※ TotalCalls / TotalImpactMs は Count列の重みで拡大した不偏推定、± は95%信頼区間"
+                        "（method_statistics.csv の TotalImpactCI95Ms 列）\n\n")
+            
+            if 'MeasuredFPS' in frame_stats.columns:
+                f.write(f"実測FPS（#FRAME間隔）: 平均 {frame_stats['MeasuredFPS'].mean():.1f}, "
+                        f"最低 {frame_stats['MeasuredFPS'].min():.1f}\n\n")
+            
+            # GC・メモリ（#MEM行）
+            if gc_frames is not None:
+                gc = gc_frames[gc_frames['GcCollections'] > 0]
+                f.write("🗑️ GC・メモリ\n")
+                f.write("-" * 30 + "\n")
+                f.write(f"GC回数: {int(gc['GcCollections'].sum())} ({len(gc)} フレーム)\n")
+                f.write(f"推定GC停止時間: 合計 {gc['GcPauseMs'].sum():.1f}ms, "
+                        f"平均 {gc['GcPauseMs'].mean() if len(gc) > 0 else 0:.1f}ms, 最大 {gc['GcPauseMs'].max() if len(gc) > 0 else 0:.1f}ms\n")
+                if 'MeasuredFrameMs' in frame_stats.columns:
+                    hitches = frame_stats[frame_stats['MeasuredFrameMs'] > frame_stats['MeasuredFrameMs'].median() * 2]
+                    if len(hitches) > 0:
+                        f.write(f"ヒッチ（実測フレーム時間が中央値の2倍超）のうちGCフレーム: "
+                                f"{(hitches['GcCollections'] > 0).sum()} / {len(hitches)}\n")
+                f.write(f"ヒープ: 最小 {gc_frames['HeapMB'].min():.0f}MB, 最大 {gc_frames['HeapMB'].max():.0f}MB\n")
+                if len(allocation) > 0:
+                    f.write(f"割り当て速度: 中央値 {allocation['AllocMBPerSec'].median():.1f}MB/秒, "
+                            f"最大 {allocation['AllocMBPerSec'].max():.1f}MB/秒\n")
+                f.write(f"※ GCフレームでメソッドが通常より長かった分は {GC_METHOD_NAME} に移しています\n\n")
+            
+            # シミュレーションスレッド（レンダーFPSとは独立）
+            if sim_summary is not None:
+                f.write("⚙️ シミュレーションスレッド\n")
+                f.write("-" * 30 + "\n")
+                f.write(f"シミュレーションティック数: {sim_summary['SimTicks']:.0f} ({sim_summary['DurationSec']:.1f}秒)\n")
+                f.write(f"ティック/秒: 平均 {sim_summary['TicksPerSecond']:.1f}, 最低 {sim_summary['MinTicksPerSecond']:.0f}\n")
+                f.write(f"1ティック処理時間: 平均 {sim_summary['AvgStepMs']:.2f}ms, P95 {sim_summary['P95StepMs']:.2f}ms, 最大 {sim_summary['MaxStepMs']:.2f}ms\n")
+                f.write(f"シミュレーションスレッド稼働率: {sim_summary['SimThreadBusyPercent']:.1f}%\n")
+                f.write(f"維持可能な最大ティック/秒: {sim_summary['MaxSustainableTicksPerSecond']:.1f} "
+                        f"(等速 {self.sim_base_rate:.0f} ティック/秒 換算で {sim_summary['MaxSustainableSpeed']:.2f}x)\n")
+                for _, manager in sim_managers.head(10).iterrows():
+                    f.write(f"  {manager['Manager']}: {manager['MsPerSimStep']:.3f}ms/step ({manager['ShareOfStepPercent']:.1f}%)\n")
+                f.write("\n")
+            
+            # 性能変化点
+            if changepoints is not None and len(regimes) > 1:
+                f.write("📐 性能変化点（フレーム時間の段差）\n")
+                f.write("-" * 30 + "\n")
+                for _, regime in regimes.iloc[1:].iterrows():
+                    f.write(f"フレーム {regime['StartFrame']} ({regime['StartTime']}): "
+                            f"{regime['MeanFrameMs'] - regime['DeltaMs']:.2f}ms → {regime['MeanFrameMs']:.2f}ms ({regime['DeltaMs']:+.2f}ms)\n")
+                    for _, method in cp_methods[cp_methods['Breakpoint'] == regime['Segment']].iterrows():
+                        f.write(f"  {method['Method']}: {method['BeforeMsPerFrame']:.3f} → {method['AfterMsPerFrame']:.3f}ms/frame "
+                                f"({method['DeltaMs']:+.3f}ms)\n")
+                f.write("\n")
+            
+            # 処理時間分布（リザーバー）
+            if distributions is not None:
+                f.write("🎲 処理時間分布 Top10（1回あたり、リザーバーサンプルからの推定）\n")
+                f.write("-" * 30 + "\n")
+                for _, method in dist_summary.head(10).iterrows():
+                    f.write(f"{method['MethodName']}\n")
+                    f.write(f"    P50 {method['P50Ms']:.3f} / P95 {method['P95Ms']:.3f} / P99 {method['P99Ms']:.3f}ms, "
+                            f"最大 {method['MaxDurationMs']:.3f}ms ({method['SampleSize']} / {method['Calls']:.0f} 回をサンプル)\n")
+                    f.write(f"    95%信頼区間: P95 {method['P95LowMs']:.3f}～{method['P95HighMs']:.3f} / "
+                            f"P99 {method['P99LowMs']:.3f}～{method['P99HighMs']:.3f}ms\n")
+                f.write("\n")
+            
             # トップ問題
             f.write("🚨 主要パフォーマンス問題\n")
             f.write("-" * 30 + "\n")
@@ -420,22 +1318,125 @@ class CS1ProfilerAnalyzer:
             for i, (_, method) in enumerate(method_stats.head(10).iterrows(), 1):
                 f.write(f"{i:2d}. {method['MethodName']}\n")
                 f.write(f"    影響度: {method['AvgTotalPerFrameMs']:.2f}ms/frame ({method['ImpactPercentage']:.1f}%)\n")
-                f.write(f"    呼び出し: {method['TotalCalls']} 回, スパイク: {method['SpikeCount']} 回\n\n")
+                if method['TotalImpactCI95Ms'] > 0:
+                    # 重み付き推定（± は95%信頼区間）
+                    f.write(f"    合計: {method['TotalImpactMs']:.1f} ± {method['TotalImpactCI95Ms']:.1f}ms\n")
+                    f.write(f"    呼び出し: {method['TotalCalls']:.0f} ± {method['TotalCallsCI95']:.0f} 回, スパイク: {method['SpikeCount']:.0f} 回\n\n")
+                else:
+                    f.write(f"    呼び出し: {method['TotalCalls']:.0f} 回, スパイク: {method['SpikeCount']:.0f} 回\n\n")
+
+    # 図ごとのステージ: (ステージ名, 出力ファイル名)
+    FIGURE_STAGES = [
+        ('plot_top_methods', 'top15_methods.png'),
+        ('plot_category_impact', 'category_impact.png'),
+        ('plot_frame_timeline', 'frame_timeline_fps.png'),
+        ('plot_spike_analysis', 'spike_analysis.png'),
+        ('plot_duration_violins', 'duration_violins.png'),
+        ('plot_duration_histograms', 'duration_histograms.png'),
+        ('plot_memory_timeline', 'memory_timeline.png'),
+        ('plot_method_heatmap', 'method_time_heatmap.png'),
+    ]
 
-    def run_full_analysis(self, output_dir='analysis_output'):
-        """完全解析を実行"""
+    def build_stage_graph(self, spike_multiplier=2.0, cache_dir=None):
+        """
+        解析パイプラインをステージグラフとして構築
+        各ステージは依存ステージと、結果に影響するパラメータのみをキーに持つ
+        （例: --spike-multiplier の変更は method_stats とその下流だけを無効化し、集計済みの aggregates から再計算）
+        """
+        fingerprint = ''
+        if cache_dir:
+            module_dir = os.path.dirname(os.path.abspath(__file__))
+            fingerprint = stage_cache.file_fingerprint(self.csv_file) + stage_cache.source_fingerprint(
+                *(os.path.join(module_dir, name) for name in
+                  ('cs1_profiler_analyzer.py', 'mpsc_trace.py', 'changepoint.py', 'html_report.py', 'reservoir.py',
+                   'method_heatmap.py')))
+        graph = stage_cache.StageGraph(cache_dir, fingerprint)
+        
+        def with_data(func):
+            def run(data, *inputs):
+                self.use_data_state(data)
+                return func(*inputs)
+            return run
+        
+        def render(plot, stats, *extra):
+            buffer = io.BytesIO()
+            if plot(stats, buffer, *extra) is False:
+                return None
+            return buffer.getvalue()
+        
+        # イベント行そのものは保存しない（トレースの十数倍のサイズになるため）
+        # キーは入力ファイルの指紋とパラメータから決まるので、下流のステージはキャッシュがあれば data を読み込まずに再利用し、
+        # 未キャッシュのステージが必要とした時だけ CSV から読み直す
+        graph.add('data', lambda: self.data_state(),
+                  params={'reweight_loss': self.reweight_loss, 'time_range': self.time_range, 'frame_range': self.frame_range},
+                  cache=False)
+        # 閾値を持つステージはイベント行ではなく小さなメソッド別集計だけに依存（閾値変更時に data を読み込まない）
+        graph.add('aggregates', with_data(self.event_aggregates), ['data'])
+        graph.add('method_stats', lambda aggregates: self.method_statistics(spike_multiplier, aggregates), ['aggregates'],
+                  params={'spike_multiplier': spike_multiplier})
+        graph.add('frame_stats', with_data(self.frame_statistics), ['data'])
+        graph.add('simulation', with_data(self.simulation_statistics), ['data'], params={'sim_base_rate': self.sim_base_rate})
+        graph.add('category_stats', with_data(self.category_statistics), ['data'])
+        graph.add('changepoints', self.changepoint_statistics, ['frame_stats', 'method_stats', 'aggregates'],
+                  params={'cp_penalty': self.cp_penalty, 'cp_min_size': self.cp_min_size})
+        graph.add('issues', self.detect_performance_issues, ['method_stats'])
+        graph.add('trace_info', with_data(self.trace_info), ['data'])
+        graph.add('event_adjustments', with_data(self.event_adjustments), ['data'])
+        graph.add('reservoirs', self.method_reservoirs, ['event_adjustments'], params={'reservoir_size': self.reservoir_size})
+        graph.add('distributions', self.duration_distributions, ['reservoirs'])
+        graph.add('memory', with_data(self.memory_statistics), ['data'])
+        graph.add('heatmap', with_data(self.method_time_heatmap), ['data'])
+        
+        graph.add('plot_top_methods', lambda stats: render(self.plot_top_methods, stats), ['method_stats'])
+        graph.add('plot_category_impact', lambda stats: render(self.plot_category_impact, stats), ['category_stats'])
+        graph.add('plot_frame_timeline', lambda stats, cps: render(self.plot_frame_timeline, stats, cps),
+                  ['frame_stats', 'changepoints'])
+        graph.add('plot_spike_analysis', lambda stats: render(self.plot_spike_analysis, stats), ['method_stats'])
+        graph.add('plot_duration_violins', lambda stats, res: render(self.plot_duration_violins, stats, res),
+                  ['method_stats', 'reservoirs'])
+        graph.add('plot_duration_histograms', lambda stats, res: render(self.plot_duration_histograms, stats, res),
+                  ['method_stats', 'reservoirs'])
+        graph.add('plot_memory_timeline', lambda memory: render(self.plot_memory_timeline, memory), ['memory'])
+        graph.add('plot_method_heatmap', lambda heatmap: render(self.plot_method_heatmap, heatmap), ['heatmap'],
+                  params={'heatmap_order': self.heatmap_order})
+        graph.add('html_report', self.build_html_report, ['frame_stats', 'method_stats', 'changepoints', 'aggregates'])
+        return graph
+
+    def run_full_analysis(self, output_dir='analysis_output', spike_multiplier=2.0, cache_dir=None):
+        """
+        完全解析を実行
+        cache_dir を指定すると各ステージの結果を保存し、入力ファイル・パラメータが同じステージは再計算しない
+        """
         print("🚀 CS1Profiler 完全解析を開始...")
         
+        graph = self.build_stage_graph(spike_multiplier, cache_dir)
+        
         # 統計生成
-        method_stats = self.method_statistics()
-        frame_stats = self.frame_statistics()
-        issues = self.detect_performance_issues(method_stats)
+        method_stats = graph.get('method_stats')
+        frame_stats = graph.get('frame_stats')
+        simulation = graph.get('simulation')
+        changepoints = graph.get('changepoints')
+        issues = graph.get('issues')
+        info = graph.get('trace_info')
         
-        # 可視化
-        self.generate_visualizations(method_stats, frame_stats, output_dir)
+        # 可視化（画像はステージの値として保持し、出力先へ書き出す）
+        print(f"\n📊 可視化グラフを生成中... ({output_dir}/)")
+        os.makedirs(output_dir, exist_ok=True)
+        for stage_name, file_name in self.FIGURE_STAGES:
+            image = graph.get(stage_name)
+            if image is not None:
+                with open(f'{output_dir}/{file_name}', 'wb') as f:
+                    f.write(image)
         
         # エクスポート
-        self.export_results(method_stats, frame_stats, issues, output_dir)
+        memory = graph.get('memory')
+        self.export_results(method_stats, frame_stats, issues, output_dir, simulation, changepoints, info,
+                            graph.get('distributions'), memory)
+        with open(f'{output_dir}/analysis_report.html', 'w', encoding='utf-8') as f:
+            f.write(graph.get('html_report'))
+        
+        if cache_dir:
+            print(f"\n{graph.summary()}")
         
         # コンソール出力
         print("\n" + "="*60)
@@ -447,6 +1448,22 @@ class CS1ProfilerAnalyzer:
             print(f"{i}. {method['MethodName'][:50]}")
             print(f"   {method['AvgTotalPerFrameMs']:.2f}ms/frame ({method['ImpactPercentage']:.1f}%)")
         
+        sim_summary, _ = simulation
+        if sim_summary is not None:
+            print(f"\n⚙️ シミュレーション: {sim_summary['TicksPerSecond']:.1f} ティック/秒, "
+                  f"平均 {sim_summary['AvgStepMs']:.2f}ms/step, 最大 {sim_summary['MaxSustainableSpeed']:.2f}x まで維持可能（推定）")
+        
+        regimes = changepoints[0]
+        if len(regimes) > 1:
+            print(f"\n📐 性能変化点: {len(regimes) - 1} 箇所")
+            for _, regime in regimes.iloc[1:].head(3).iterrows():
+                print(f"   - フレーム {regime['StartFrame']}: {regime['DeltaMs']:+.2f}ms/frame")
+        
+        gc_frames = memory[0]
+        if gc_frames is not None:
+            print(f"\n🗑️ GC: {int(gc_frames['GcCollections'].sum())} 回, "
+                  f"推定停止時間 合計 {gc_frames['GcPauseMs'].sum():.1f}ms（{GC_METHOD_NAME} として集計）")
+        
         print(f"\n🚨 検出された問題: {len(issues)} 件")
         high_issues = issues[issues['Severity'] == 'HIGH']
         if len(high_issues) > 0:
@@ -458,7 +1475,17 @@ class CS1ProfilerAnalyzer:
         print("   - method_statistics.csv: メソッド別統計")
         print("   - frame_statistics.csv: フレーム別統計") 
         print("   - performance_issues.csv: 検出された問題")
+        if len(info['LossWindows']) > 0:
+            print("   - loss_windows.csv: 区間別イベントロス率")
+        if sim_summary is not None:
+            print("   - simulation_managers.csv: Manager別シミュレーションステップ時間")
+        print("   - changepoints.csv / changepoint_methods.csv / method_changepoints.csv: 性能変化点")
+        print("   - method_duration_distribution.csv / method_duration_histograms.csv / method_duration_samples.csv: 処理時間分布（リザーバー）")
+        if gc_frames is not None:
+            print("   - gc_frames.csv / allocation_rate.csv / memory_timeline.png: GCフレーム・割り当て速度")
+        print("   - method_time_heatmap.png: メソッド × 時間ヒートマップ")
         print("   - analysis_report.txt: 解析レポート")
+        print("   - analysis_report.html: 対話型レポート（ブラウザで開く、オフライン可）")
         print("   - *.png: 可視化グラフ")
 
 def main():
@@ -469,6 +1496,21 @@ def main():
     parser.add_argument('csv_file', help='CS1ProfilerのCSVファイルパス')
     parser.add_argument('-o', '--output', default=default_output, help=f'出力ディレクトリ (デフォルト: {default_output})')
     parser.add_argument('-s', '--spike-multiplier', type=float, default=2.0, help='スパイク検出の閾値倍率 (デフォルト: 2.0)')
+    parser.add_argument('--reweight-loss', action='store_true', help='Ring Bufferオーバーラン区間のイベントをロス率で重み付け補正')
+    parser.add_argument('--from', dest='time_from', help='解析開始時刻（トレース先頭からの秒数 または "2025-08-25 14:30:10"）')
+    parser.add_argument('--to', dest='time_to', help='解析終了時刻（--from と同じ形式）')
+    parser.add_argument('--frames', help='解析するフレーム範囲 "開始:終了"（#FRAME行が必要）')
+    parser.add_argument('--sim-base-rate', type=float, default=60.0, help='等速時のシミュレーションティック/秒（維持可能速度の換算用、デフォルト: 60）')
+    parser.add_argument('--cp-penalty', type=float, default=changepoint.DEFAULT_PENALTY,
+                        help=f'変化点検出のペナルティ倍率（大きいほど検出が減る、デフォルト: {changepoint.DEFAULT_PENALTY}）')
+    parser.add_argument('--cp-min-size', type=int, default=changepoint.DEFAULT_MIN_SIZE,
+                        help=f'変化点間の最小フレーム数 (デフォルト: {changepoint.DEFAULT_MIN_SIZE})')
+    parser.add_argument('--reservoir-size', type=int, default=reservoir.DEFAULT_RESERVOIR_SIZE,
+                        help=f'メソッドあたりの処理時間サンプル数（分布グラフ・分位点用、デフォルト: {reservoir.DEFAULT_RESERVOIR_SIZE}）')
+    parser.add_argument('--heatmap-order', choices=method_heatmap.ROW_ORDERS, default=method_heatmap.DEFAULT_ROW_ORDER,
+                        help=f'メソッド × 時間ヒートマップの行の並び順 (デフォルト: {method_heatmap.DEFAULT_ROW_ORDER})')
+    parser.add_argument('--cache-dir', help='ステージ結果のキャッシュ先 (デフォルト: <CSVファイル>.cache)')
+    parser.add_argument('--no-cache', action='store_true', help='ステージ結果のキャッシュを使用・保存しない')
     
     args = parser.parse_args()
     
@@ -477,8 +1519,16 @@ def main():
         return
     
     try:
-        analyzer = CS1ProfilerAnalyzer(args.csv_file)
-        analyzer.run_full_analysis(args.output)
+        time_range = (args.time_from, args.time_to) if args.time_from or args.time_to else None
+        frame_range = tuple(int(v) for v in args.frames.split(':')) if args.frames else None
+        analyzer = CS1ProfilerAnalyzer(args.csv_file, reweight_loss=args.reweight_loss,
+                                       time_range=time_range, frame_range=frame_range,
+                                       sim_base_rate=args.sim_base_rate,
+                                       cp_penalty=args.cp_penalty, cp_min_size=args.cp_min_size,
+                                       reservoir_size=args.reservoir_size, heatmap_order=args.heatmap_order,
+                                       defer_load=True)
+        cache_dir = None if args.no_cache else (args.cache_dir or f'{args.csv_file}.cache')
+        analyzer.run_full_analysis(args.output, args.spike_multiplier, cache_dir)
         print(f"\n✅ 解析完了! 結果: {args.output}/")
     except Exception as e:
         print(f"❌ 解析エラー: {e}")
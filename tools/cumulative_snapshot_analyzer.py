@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+CS1Profiler 累積スナップショット差分解析ツール
+PerformanceProfiler.GetAllDataCSV の定期出力（CS1Profiler_All_*.csv、Rank,Method,AvgMs,MaxMs,TotalMs,Calls）は
+前回リセット以降の累積値のため、フォルダ内のスナップショットを メソッド×スナップショット の行列に揃え、
+連続するスナップショットの差分から区間ごとの呼び出しレート・ms/秒 を算出する
+（生トレースなしで安価に時系列を得る）
+
+カウンターリセット（Clear Stats等）:
+    多くのメソッドのカウンターが同時に減少したスナップショットは全体リセットとして扱い、
+    個別に減少したメソッドはそのメソッドのみリセットとして扱う
+    いずれもリセット後の累積値をその区間の増分とみなす（リセット直前の分は失われる）
+"""
+
+import argparse
+import glob
+import io
+import os
+import re
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+import mpsc_trace
+
+plt.rcParams['font.family'] = ['DejaVu Sans', 'Yu Gothic', 'Hiragino Sans', 'Noto Sans CJK JP']
+
+SNAPSHOT_PATTERN = 'CS1Profiler_All_*.csv'
+SNAPSHOT_COLUMNS = ['Rank', 'Method', 'AvgMs', 'MaxMs', 'TotalMs', 'Calls']
+SNAPSHOT_TIME = re.compile(r'(\d{8})_(\d{6})')
+# 同時に減少したメソッドの割合がこれを超えたら全体リセットとみなす
+GLOBAL_RESET_FRACTION = 0.5
+
+
+def snapshot_time(path):
+    """ファイル名の yyyyMMdd_HHmmss から出力時刻を取得（無ければ更新時刻）"""
+    match = SNAPSHOT_TIME.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(''.join(match.groups()), '%Y%m%d%H%M%S')
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def find_snapshots(folder, pattern=SNAPSHOT_PATTERN):
+    """フォルダ内のスナップショットを時刻順に返す"""
+    paths = glob.glob(os.path.join(folder, pattern))
+    return sorted(paths, key=lambda path: (snapshot_time(path), path))
+
+
+def read_snapshots(paths):
+    """
+    スナップショット群を1回の一括パースで読み込み（メソッド名にカンマが含まれても数値列は右から分割）
+    ファイル単位のパース呼び出しを避けるため、全ファイルの本体を連結してから分割する
+    ERROR行・不正行は除外する
+    """
+    bodies, line_counts = [], []
+    for path in paths:
+        with open(path, 'rb') as f:
+            f.readline()  # ヘッダー
+            body = f.read()
+        if body and not body.endswith(b'\n'):
+            body += b'\n'
+        bodies.append(body)
+        line_counts.append(body.count(b'\n'))
+
+    left, right, kept = mpsc_trace.split_fields_from_right(b''.join(bodies), len(SNAPSHOT_COLUMNS) - 2)
+    frame = pd.read_csv(io.BytesIO(right), header=None, names=SNAPSHOT_COLUMNS[2:])
+    frame = frame.apply(lambda column: pd.to_numeric(column, errors='coerce'))
+    frame['Method'] = [rank_and_name.partition(',')[2] for rank_and_name in left]
+    frame['Snapshot'] = np.searchsorted(np.cumsum(line_counts), kept, side='right')
+    return frame[frame['Method'] != 'ERROR'].dropna()
+
+
+def load_snapshot_matrix(paths):
+    """
+    スナップショット群をメソッド×スナップショットの行列に整列
+    スナップショットに現れないメソッドは累積0（GetAllDataCSVは呼び出し0件を出力しない）
+    """
+    data = read_snapshots(paths)
+    codes, methods = pd.factorize(data['Method'])
+    columns = data['Snapshot'].to_numpy()
+
+    shape = (len(methods), len(paths))
+    matrices = {}
+    for name in ('TotalMs', 'Calls', 'MaxMs'):
+        matrix = np.zeros(shape)
+        matrix[codes, columns] = data[name].to_numpy(dtype=np.float64)
+        matrices[name] = matrix
+
+    times = pd.to_datetime([snapshot_time(path) for path in paths])
+    return np.asarray(methods, dtype=object), times, matrices
+
+
+def interval_deltas(times, matrices):
+    """
+    連続するスナップショットの差分から区間ごとの増分を計算（全メソッド・全区間を一括処理）
+    戻り値: 区間ごとの行列（メソッド×区間）と区間情報
+    """
+    calls, total, max_ms = matrices['Calls'], matrices['TotalMs'], matrices['MaxMs']
+    delta_calls = np.diff(calls, axis=1)
+    delta_total = np.diff(total, axis=1)
+
+    # 個別リセット: そのメソッドのカウンターが減少
+    method_reset = (delta_calls < 0) | (delta_total < -1e-6)
+    # 全体リセット: 前回呼び出しのあったメソッドの多くが同時に減少、または総呼び出し数が減少
+    active = calls[:, :-1] > 0
+    reset_fraction = method_reset.sum(axis=0) / np.maximum(active.sum(axis=0), 1)
+    global_reset = (reset_fraction > GLOBAL_RESET_FRACTION) | (np.diff(calls.sum(axis=0)) < 0)
+    reset = method_reset | global_reset[None, :]
+
+    delta_calls = np.where(reset, calls[:, 1:], delta_calls)
+    delta_total = np.where(reset, total[:, 1:], delta_total)
+
+    # 累積最大値が更新された区間のみ、その区間内の最大値が確定する
+    new_max = np.where(reset | (max_ms[:, 1:] > max_ms[:, :-1]), max_ms[:, 1:], np.nan)
+    new_max[delta_calls == 0] = np.nan
+
+    seconds = np.diff(times.to_numpy()).astype('timedelta64[ms]').astype(np.float64) / 1000.0
+    seconds = np.where(seconds > 0, seconds, np.nan)
+
+    intervals = pd.DataFrame({
+        'IntervalStart': times[:-1],
+        'IntervalEnd': times[1:],
+        'DurationSec': seconds,
+        'GlobalReset': global_reset,
+        'ResetMethods': method_reset.sum(axis=0),
+        'TotalMsPerSec': delta_total.sum(axis=0) / seconds,
+        'CallsPerSec': delta_calls.sum(axis=0) / seconds,
+    })
+    deltas = {
+        'Calls': delta_calls,
+        'TotalMs': delta_total,
+        'CallsPerSec': delta_calls / seconds[None, :],
+        'MsPerSec': delta_total / seconds[None, :],
+        'NewMaxMs': new_max,
+        'Reset': reset,
+    }
+    return deltas, intervals
+
+
+def long_form(methods, intervals, deltas):
+    """区間×メソッドの縦持ちテーブル（呼び出しのあったセルのみ）"""
+    rows, columns = np.nonzero(deltas['Calls'] > 0)
+    calls = deltas['Calls'][rows, columns]
+    total = deltas['TotalMs'][rows, columns]
+    return pd.DataFrame({
+        'IntervalEnd': intervals['IntervalEnd'].to_numpy()[columns],
+        'Method': methods[rows],
+        'Calls': calls,
+        'TotalMs': total,
+        'AvgMs': total / calls,
+        'CallsPerSec': deltas['CallsPerSec'][rows, columns],
+        'MsPerSec': deltas['MsPerSec'][rows, columns],
+        'NewMaxMs': deltas['NewMaxMs'][rows, columns],
+        'Reset': deltas['Reset'][rows, columns],
+    }).sort_values(['IntervalEnd', 'MsPerSec'], ascending=[True, False], kind='stable')
+
+
+def method_summary(methods, intervals, deltas):
+    """メソッド別の区間平均・最大 ms/秒 と前半→後半の変化"""
+    ms_per_sec = deltas['MsPerSec']
+    half = ms_per_sec.shape[1] // 2
+    first = np.nanmean(ms_per_sec[:, :half], axis=1) if half > 0 else np.full(len(methods), np.nan)
+    last = np.nanmean(ms_per_sec[:, half:], axis=1)
+    seconds = intervals['DurationSec'].to_numpy()
+    return pd.DataFrame({
+        'Method': methods,
+        'TotalCalls': deltas['Calls'].sum(axis=1),
+        'TotalMs': deltas['TotalMs'].sum(axis=1),
+        'AvgMsPerSec': deltas['TotalMs'].sum(axis=1) / np.nansum(seconds),
+        'PeakMsPerSec': np.nanmax(ms_per_sec, axis=1),
+        'FirstHalfMsPerSec': first,
+        'SecondHalfMsPerSec': last,
+        'ChangeMsPerSec': last - first,
+        'ResetCount': deltas['Reset'].sum(axis=1),
+    }).sort_values('AvgMsPerSec', ascending=False)
+
+
+def plot_top_methods(summary, intervals, deltas, methods, output_dir, top=10):
+    index = {name: i for i, name in enumerate(methods)}
+    plt.figure(figsize=(15, 8))
+    for name in summary['Method'].head(top):
+        plt.plot(intervals['IntervalEnd'], deltas['MsPerSec'][index[name]], label=name[:50], alpha=0.8)
+    for end in intervals.loc[intervals['GlobalReset'], 'IntervalEnd']:
+        plt.axvline(x=end, color='red', linestyle=':', alpha=0.6)
+    plt.xlabel('時刻')
+    plt.ylabel('ms/秒')
+    plt.title(f'累積スナップショット差分: 上位{top}メソッドの処理時間推移')
+    plt.legend(fontsize=8)
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/snapshot_ms_per_sec.png', dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def main():
+    default_output = f"snapshot_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    parser = argparse.ArgumentParser(description='CS1Profiler Cumulative Snapshot Delta Analyzer')
+    parser.add_argument('folder', help='CS1Profiler_All_*.csv のあるフォルダ')
+    parser.add_argument('-o', '--output', default=default_output, help=f'出力ディレクトリ (デフォルト: {default_output})')
+    parser.add_argument('--pattern', default=SNAPSHOT_PATTERN, help=f'スナップショットのファイル名パターン (デフォルト: {SNAPSHOT_PATTERN})')
+    parser.add_argument('--top', type=int, default=10, help='グラフ・レポートに表示するメソッド数')
+    parser.add_argument('--long', action='store_true', help='区間×メソッドの縦持ちテーブル（snapshot_method_intervals.csv）も出力')
+    args = parser.parse_args()
+
+    paths = find_snapshots(args.folder, args.pattern)
+    if len(paths) < 2:
+        print(f"❌ スナップショットが2件以上必要です: {len(paths)} 件 ({os.path.join(args.folder, args.pattern)})")
+        return
+
+    print(f"📂 スナップショット読み込み中: {len(paths)} 件")
+    methods, times, matrices = load_snapshot_matrix(paths)
+    deltas, intervals = interval_deltas(times, matrices)
+    summary = method_summary(methods, intervals, deltas)
+
+    os.makedirs(args.output, exist_ok=True)
+    intervals.to_csv(f'{args.output}/snapshot_intervals.csv', index=False, encoding='utf-8-sig')
+    summary.to_csv(f'{args.output}/snapshot_method_summary.csv', index=False, encoding='utf-8-sig')
+    if args.long:
+        long_form(methods, intervals, deltas).to_csv(f'{args.output}/snapshot_method_intervals.csv',
+                                                     index=False, encoding='utf-8-sig')
+    pd.DataFrame(deltas['MsPerSec'], index=methods, columns=intervals['IntervalEnd']).to_csv(
+        f'{args.output}/snapshot_ms_per_sec_matrix.csv', encoding='utf-8-sig')
+    plot_top_methods(summary, intervals, deltas, methods, args.output, args.top)
+
+    resets = intervals[intervals['GlobalReset']]
+    with open(f'{args.output}/snapshot_report.txt', 'w', encoding='utf-8') as f:
+        f.write("累積スナップショット差分レポート\n")
+        f.write("=" * 50 + "\n")
+        f.write(f"解析日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"スナップショット: {len(paths)} 件 ({times[0]} ～ {times[-1]})\n")
+        f.write(f"メソッド数: {len(methods)}\n")
+        f.write(f"全体リセット検出: {len(resets)} 回\n")
+        for _, interval in resets.iterrows():
+            f.write(f"  {interval['IntervalStart']} ～ {interval['IntervalEnd']}\n")
+        f.write("\n")
+
+        f.write(f"📊 平均処理時間 上位{args.top}メソッド（ms/秒）\n")
+        f.write("-" * 30 + "\n")
+        for _, method in summary.head(args.top).iterrows():
+            f.write(f"{method['Method']}: 平均 {method['AvgMsPerSec']:.2f}, ピーク {method['PeakMsPerSec']:.2f}, "
+                    f"前半 {method['FirstHalfMsPerSec']:.2f} → 後半 {method['SecondHalfMsPerSec']:.2f}\n")
+        f.write("\n")
+
+        f.write(f"📈 前半→後半で増加したメソッド 上位{args.top}\n")
+        f.write("-" * 30 + "\n")
+        for _, method in summary.nlargest(args.top, 'ChangeMsPerSec').iterrows():
+            f.write(f"{method['Method']}: {method['ChangeMsPerSec']:+.2f} ms/秒\n")
+
+    print(f"\n🎯 {len(intervals)} 区間 × {len(methods)} メソッド, 全体リセット {len(resets)} 回")
+    for _, method in summary.head(5).iterrows():
+        print(f"   {method['Method'][:50]}: 平均 {method['AvgMsPerSec']:.2f} ms/秒")
+    print(f"\n✅ 解析完了! 結果: {args.output}/")
+
+
+if __name__ == '__main__':
+    main()
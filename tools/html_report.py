@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+CS1Profiler 対話型HTMLレポート
+生のイベント行ではなく、事前集計したデータだけを1つのHTMLに埋め込む
+- フレーム時間: min/max/mean の多解像度ピラミッド（最細レベルは MAX_FRAME_BINS 個まで）
+- 上位メソッド: フレーム別合計時間のピラミッド（MAX_METHOD_BINS 個まで）
+- メソッド別: 対数間隔の処理時間ヒストグラム
+埋め込みサイズはトレースのイベント数ではなく上記の上限だけで決まる（数MB程度）
+外部ライブラリ・サーバー不要（オフラインでブラウザから直接開ける）
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+# フレーム時間ピラミッドの最細レベルのビン数上限
+MAX_FRAME_BINS = 16384
+# メソッド別時系列の最細レベルのビン数上限
+MAX_METHOD_BINS = 1024
+# ピラミッドの最粗レベルのビン数
+MIN_LEVEL_BINS = 256
+# 時系列を埋め込むメソッド数 / ヒストグラムを埋め込むメソッド数 / 表の最大行数
+TOP_SERIES_METHODS = 40
+TOP_HISTOGRAM_METHODS = 300
+MAX_TABLE_ROWS = 2000
+# 処理時間ヒストグラムのビン境界（ms、1µs～10s を1桁8分割）
+HISTOGRAM_EDGES_MS = np.logspace(-3, 4, 57)
+
+TABLE_COLUMNS = ['MethodName', 'Category', 'Lane', 'TotalCalls', 'AvgDurationMs', 'MaxDurationMs',
+                 'AvgTotalPerFrameMs', 'MaxTotalPerFrameMs', 'TotalImpactMs', 'ImpactPercentage', 'SpikeCount']
+
+
+def _compact(values, decimals=3):
+    """JSON用に丸めた数値リスト（NaN/inf は null）"""
+    values = np.round(np.asarray(values, dtype=np.float64), decimals)
+    return [None if not math.isfinite(v) else v for v in values.tolist()]
+
+
+def _bin_level(values, width):
+    """width 要素ずつまとめた最細レベル（min/max/mean と有効要素数）"""
+    n_bins = -(-len(values) // width)
+    padded = np.full(n_bins * width, np.nan)
+    padded[:len(values)] = values
+    block = padded.reshape(n_bins, width)
+    valid = ~np.isnan(block)
+    count = valid.sum(axis=1)
+    total = np.where(valid, block, 0.0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    return {
+        'min': np.where(valid, block, np.inf).min(axis=1),
+        'max': np.where(valid, block, -np.inf).max(axis=1),
+        'mean': mean,
+        'count': count,
+    }
+
+
+def _merge_level(level):
+    """隣接2ビンを統合して1段粗いレベルを作る（mean は要素数で重み付け）"""
+    n = len(level['mean'])
+    if n % 2:
+        level = {
+            'min': np.append(level['min'], np.inf),
+            'max': np.append(level['max'], -np.inf),
+            'mean': np.append(level['mean'], 0.0),
+            'count': np.append(level['count'], 0),
+        }
+    count = level['count'].reshape(-1, 2)
+    total = np.nan_to_num(level['mean']).reshape(-1, 2) * count
+    merged_count = count.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total.sum(axis=1) / merged_count
+    return {
+        'min': level['min'].reshape(-1, 2).min(axis=1),
+        'max': level['max'].reshape(-1, 2).max(axis=1),
+        'mean': mean,
+        'count': merged_count,
+    }
+
+
+def build_pyramid(values, max_bins, min_bins=MIN_LEVEL_BINS):
+    """
+    min/max/mean ピラミッドを構築
+    戻り値: [{'w': 1ビンあたりのフレーム数, 'min': [...], 'max': [...], 'mean': [...]}, ...]（細→粗）
+    """
+    values = np.asarray(values, dtype=np.float64)
+    width = max(1, -(-len(values) // max_bins))
+    level = _bin_level(values, width)
+    levels = []
+    while True:
+        levels.append({'w': width, 'min': _compact(level['min']), 'max': _compact(level['max']),
+                       'mean': _compact(level['mean'])})
+        if len(level['mean']) <= min_bins:
+            return levels
+        level = _merge_level(level)
+        width *= 2
+
+
+def method_frame_totals(frames, frame_numbers, methods):
+    """
+    指定メソッドのフレーム別合計時間（メソッド × フレーム）を1メソッドずつ bincount で算出
+    frames はメソッド×レーン×フレームの集計表（Description, Frame, TotalMs）。メソッドコード順に一度だけ並べ替える
+    """
+    position = pd.Index(frame_numbers).get_indexer(frames['Frame'])
+    rank = pd.Index(methods).get_indexer(frames['Description'].astype(str))
+    keep = (position >= 0) & (rank >= 0)
+    position, rank = position[keep], rank[keep]
+    weights = frames['TotalMs'].to_numpy(dtype=np.float64)[keep]
+    order = np.argsort(rank, kind='stable')
+    bounds = np.searchsorted(rank[order], np.arange(len(methods) + 1))
+    for i in range(len(methods)):
+        selected = order[bounds[i]:bounds[i + 1]]
+        yield np.bincount(position[selected], weights=weights[selected], minlength=len(frame_numbers))
+
+
+def duration_histograms(durations, methods):
+    """メソッド別の処理時間ヒストグラム（durations は (メソッド, 処理時間) ごとの呼び出し回数 Weight の集計表）"""
+    n_bins = len(HISTOGRAM_EDGES_MS) - 1
+    rank = pd.Index(methods).get_indexer(durations['Description'].astype(str))
+    keep = rank >= 0
+    values = durations['Duration(ms)'].to_numpy(dtype=np.float64)[keep]
+    bins = np.clip(np.searchsorted(HISTOGRAM_EDGES_MS, values, side='right') - 1, 0, n_bins - 1)
+    weights = durations['Weight'].to_numpy(dtype=np.float64)[keep]
+    counts = np.bincount(rank[keep] * n_bins + bins, weights=weights, minlength=len(methods) * n_bins)
+    return counts.reshape(len(methods), n_bins)
+
+
+def build_report_data(aggregates, frame_stats, method_stats, changepoints=None, title='CS1Profiler'):
+    """HTMLに埋め込む集計データ一式（aggregates はイベント行ではなくメソッド別集計）"""
+    frame_stats = frame_stats.sort_values('FrameNumber')
+    frame_numbers = frame_stats['FrameNumber'].to_numpy()
+
+    frame_series = {'TotalFrameMs': build_pyramid(frame_stats['TotalFrameMs'], MAX_FRAME_BINS)}
+    if 'MeasuredFrameMs' in frame_stats.columns:
+        frame_series['MeasuredFrameMs'] = build_pyramid(frame_stats['MeasuredFrameMs'], MAX_FRAME_BINS)
+    label_width = frame_series['TotalFrameMs'][0]['w']
+    labels = frame_numbers[::label_width]
+    labels = labels.tolist() if np.issubdtype(labels.dtype, np.number) else [str(label) for label in labels]
+
+    ranked = method_stats.sort_values('TotalImpactMs', ascending=False)
+    series_methods = ranked['MethodName'].head(TOP_SERIES_METHODS).tolist()
+    histogram_methods = ranked['MethodName'].head(TOP_HISTOGRAM_METHODS).tolist()
+    method_series = [build_pyramid(totals, MAX_METHOD_BINS)
+                     for totals in method_frame_totals(aggregates['frames'], frame_numbers, series_methods)]
+    histograms = duration_histograms(aggregates['durations'], histogram_methods)
+
+    table = ranked.head(MAX_TABLE_ROWS)
+    columns = [column for column in TABLE_COLUMNS if column in table.columns]
+    rows = []
+    for record in table[columns].itertuples(index=False):
+        rows.append([_compact([value])[0] if isinstance(value, (int, float, np.number)) else str(value)
+                     for value in record])
+
+    regimes = []
+    if changepoints is not None:
+        starts = pd.Index(frame_numbers).get_indexer(changepoints[0]['StartFrame'])
+        for start, (_, regime) in zip(starts, changepoints[0].iterrows()):
+            if regime['Segment'] > 0 and start >= 0:
+                regimes.append({'x': int(start), 'delta': round(float(regime['DeltaMs']), 3),
+                                'mean': round(float(regime['MeanFrameMs']), 3)})
+
+    return {
+        'title': title,
+        'frames': len(frame_numbers),
+        'labelWidth': label_width,
+        'labels': labels,
+        'frameSeries': frame_series,
+        'changepoints': regimes,
+        'columns': columns,
+        'rows': rows,
+        'seriesMethods': series_methods,
+        'methodSeries': method_series,
+        'histogramMethods': histogram_methods,
+        'histogramEdges': _compact(HISTOGRAM_EDGES_MS, 6),
+        'histograms': histograms.round(1).tolist(),
+    }
+
+
+def render_html(data):
+    """集計データを埋め込んだ単一HTMLを返す"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    return HTML_TEMPLATE.replace('__TITLE__', data['title']).replace('__DATA__', payload)
+
+
+HTML_TEMPLATE = r'''<!DOCTYPE html>
+<html lang="ja">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+body { font-family: "Segoe UI", "Yu Gothic", "Hiragino Sans", sans-serif; margin: 16px; color: #222; }
+h1 { font-size: 20px; margin: 0 0 8px; }
+h2 { font-size: 16px; margin: 20px 0 6px; }
+.chart { width: 100%; height: 260px; border: 1px solid #ccc; cursor: crosshair; display: block; }
+.hint { color: #777; font-size: 12px; }
+#tooltip { position: fixed; pointer-events: none; background: rgba(0,0,0,0.8); color: #fff; font-size: 12px;
+           padding: 4px 6px; border-radius: 3px; display: none; white-space: pre; }
+table { border-collapse: collapse; font-size: 12px; width: 100%; }
+th, td { border-bottom: 1px solid #eee; padding: 3px 6px; text-align: right; white-space: nowrap; }
+th { background: #f4f4f4; cursor: pointer; position: sticky; top: 0; }
+td:first-child, th:first-child { text-align: left; max-width: 520px; overflow: hidden; text-overflow: ellipsis; }
+tr.selected { background: #fff3c4; }
+tbody tr:hover { background: #f0f6ff; cursor: pointer; }
+#tableBox { max-height: 420px; overflow: auto; border: 1px solid #ccc; }
+#detail { display: flex; gap: 16px; flex-wrap: wrap; }
+#detail > div { flex: 1 1 480px; }
+</style>
+</head>
+<body>
+<h1>__TITLE__</h1>
+<div class="hint" id="summary"></div>
+
+<h2>フレーム時間</h2>
+<div>系列: <select id="seriesSelect"></select>
+<span class="hint">ホイール: 拡大/縮小, ドラッグ: 移動, ダブルクリック: 全体表示（帯 = 区間内の最小～最大、線 = 平均）</span></div>
+<canvas id="frameChart" class="chart"></canvas>
+
+<h2>メソッド一覧</h2>
+<div>絞り込み: <input id="filter" size="40"> <span class="hint">列見出しで並べ替え、行をクリックで詳細表示</span></div>
+<div id="tableBox"><table><thead id="tableHead"></thead><tbody id="tableBody"></tbody></table></div>
+
+<h2 id="detailTitle">メソッド詳細</h2>
+<div id="detail">
+  <div><div class="hint">処理時間の分布（1回あたり、対数ビン）</div><canvas id="histChart" class="chart"></canvas></div>
+  <div><div class="hint">フレーム別合計時間（上のフレーム時間と連動）</div><canvas id="methodChart" class="chart"></canvas></div>
+</div>
+<div id="tooltip"></div>
+
+<script id="data" type="application/json">__DATA__</script>
+<script>
+"use strict";
+const D = JSON.parse(document.getElementById('data').textContent);
+const tooltip = document.getElementById('tooltip');
+const view = { x0: 0, x1: D.frames };
+const charts = [];
+
+function fmt(v, digits) {
+  if (v === null || v === undefined) return '';
+  if (typeof v !== 'number') return v;
+  if (Number.isInteger(v) && Math.abs(v) >= 1000) return v.toLocaleString();
+  return v.toFixed(digits === undefined ? 3 : digits);
+}
+
+function frameLabel(x) {
+  const i = Math.min(D.labels.length - 1, Math.max(0, Math.floor(x / D.labelWidth)));
+  return D.labels[i];
+}
+
+function setupCanvas(canvas) {
+  const ratio = window.devicePixelRatio || 1;
+  const rect = canvas.getBoundingClientRect();
+  canvas.width = Math.max(1, Math.round(rect.width * ratio));
+  canvas.height = Math.max(1, Math.round(rect.height * ratio));
+  const ctx = canvas.getContext('2d');
+  ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+  return { ctx: ctx, w: rect.width, h: rect.height };
+}
+
+// ピラミッドから表示幅に合う最も細かいレベルを選ぶ（表示ビン数 ≦ 画素数）
+function pickLevel(pyramid, pixels) {
+  const span = view.x1 - view.x0;
+  for (const level of pyramid) {
+    if (span / level.w <= pixels) return level;
+  }
+  return pyramid[pyramid.length - 1];
+}
+
+function TimelineChart(canvas, getPyramid, unit) {
+  this.canvas = canvas;
+  this.getPyramid = getPyramid;
+  this.unit = unit;
+  this.pad = { l: 56, r: 10, t: 10, b: 24 };
+  charts.push(this);
+  const self = this;
+  let drag = null;
+  canvas.addEventListener('wheel', function (e) {
+    e.preventDefault();
+    const x = self.toX(e.offsetX);
+    const factor = e.deltaY < 0 ? 0.8 : 1.25;
+    let x0 = x - (x - view.x0) * factor, x1 = x + (view.x1 - x) * factor;
+    if (x1 - x0 < 10) return;
+    view.x0 = Math.max(0, x0); view.x1 = Math.min(D.frames, x1);
+    redrawCharts();
+  }, { passive: false });
+  canvas.addEventListener('mousedown', function (e) { drag = { x: e.offsetX, x0: view.x0, x1: view.x1 }; });
+  window.addEventListener('mouseup', function () { drag = null; });
+  canvas.addEventListener('mousemove', function (e) {
+    if (drag) {
+      const scale = (drag.x1 - drag.x0) / (self.plotWidth || 1);
+      let shift = (drag.x - e.offsetX) * scale;
+      shift = Math.max(-drag.x0, Math.min(D.frames - drag.x1, shift));
+      view.x0 = drag.x0 + shift; view.x1 = drag.x1 + shift;
+      redrawCharts();
+    }
+    self.hover(e);
+  });
+  canvas.addEventListener('mouseleave', function () { tooltip.style.display = 'none'; });
+  canvas.addEventListener('dblclick', function () { view.x0 = 0; view.x1 = D.frames; redrawCharts(); });
+}
+
+TimelineChart.prototype.toX = function (px) {
+  return view.x0 + (px - this.pad.l) / (this.plotWidth || 1) * (view.x1 - view.x0);
+};
+
+TimelineChart.prototype.draw = function () {
+  const s = setupCanvas(this.canvas), ctx = s.ctx, pad = this.pad;
+  const pw = this.plotWidth = s.w - pad.l - pad.r, ph = s.h - pad.t - pad.b;
+  ctx.clearRect(0, 0, s.w, s.h);
+  const pyramid = this.getPyramid();
+  if (!pyramid) {
+    ctx.fillStyle = '#999';
+    ctx.fillText('時系列データなし（上位メソッドのみ埋め込み）', pad.l + 8, pad.t + 16);
+    this.level = null;
+    return;
+  }
+  const level = this.level = pickLevel(pyramid, pw);
+  const b0 = Math.max(0, Math.floor(view.x0 / level.w)), b1 = Math.min(level.mean.length, Math.ceil(view.x1 / level.w));
+  let ymax = 0;
+  for (let i = b0; i < b1; i++) if (level.max[i] !== null && level.max[i] > ymax) ymax = level.max[i];
+  ymax = ymax > 0 ? ymax * 1.05 : 1;
+  this.ymax = ymax;
+  const px = x => pad.l + (x - view.x0) / (view.x1 - view.x0) * pw;
+  const py = y => pad.t + ph - y / ymax * ph;
+
+  ctx.strokeStyle = '#ddd'; ctx.fillStyle = '#555'; ctx.font = '11px sans-serif'; ctx.lineWidth = 1;
+  for (let k = 0; k <= 4; k++) {
+    const y = ymax * k / 4;
+    ctx.beginPath(); ctx.moveTo(pad.l, py(y)); ctx.lineTo(pad.l + pw, py(y)); ctx.stroke();
+    ctx.fillText(fmt(y, 1) + this.unit, 2, py(y) + 4);
+  }
+  for (let k = 0; k <= 4; k++) {
+    const x = view.x0 + (view.x1 - view.x0) * k / 4;
+    ctx.fillText(String(frameLabel(x)), Math.min(px(x), pad.l + pw - 80), s.h - 6);
+  }
+
+  // 区間内の最小～最大の帯
+  ctx.fillStyle = 'rgba(70,130,180,0.25)';
+  for (let i = b0; i < b1; i++) {
+    if (level.max[i] === null) continue;
+    const xa = px(i * level.w), xb = px((i + 1) * level.w);
+    ctx.fillRect(xa, py(level.max[i]), Math.max(1, xb - xa), Math.max(1, py(level.min[i]) - py(level.max[i])));
+  }
+  // 平均
+  ctx.strokeStyle = 'steelblue'; ctx.lineWidth = 1.2; ctx.beginPath();
+  let started = false;
+  for (let i = b0; i < b1; i++) {
+    if (level.mean[i] === null) { started = false; continue; }
+    const x = px((i + 0.5) * level.w), y = py(level.mean[i]);
+    if (started) ctx.lineTo(x, y); else { ctx.moveTo(x, y); started = true; }
+  }
+  ctx.stroke();
+  // 変化点
+  ctx.strokeStyle = 'purple'; ctx.setLineDash([3, 3]);
+  for (const cp of D.changepoints) {
+    if (cp.x < view.x0 || cp.x > view.x1) continue;
+    ctx.beginPath(); ctx.moveTo(px(cp.x), pad.t); ctx.lineTo(px(cp.x), pad.t + ph); ctx.stroke();
+  }
+  ctx.setLineDash([]);
+};
+
+TimelineChart.prototype.hover = function (e) {
+  if (!this.level) return;
+  const x = this.toX(e.offsetX), i = Math.floor(x / this.level.w);
+  if (i < 0 || i >= this.level.mean.length || this.level.mean[i] === null) { tooltip.style.display = 'none'; return; }
+  const first = frameLabel(i * this.level.w), last = frameLabel(Math.min(D.frames - 1, (i + 1) * this.level.w - 1));
+  let text = 'フレーム ' + first + (this.level.w > 1 ? ' ～ ' + last : '') +
+             '\n平均 ' + fmt(this.level.mean[i]) + this.unit + '\n最小 ' + fmt(this.level.min[i]) + this.unit +
+             '\n最大 ' + fmt(this.level.max[i]) + this.unit;
+  for (const cp of D.changepoints) {
+    if (Math.floor(cp.x / this.level.w) === i) text += '\n変化点 ' + (cp.delta > 0 ? '+' : '') + fmt(cp.delta) + 'ms/frame';
+  }
+  tooltip.textContent = text;
+  tooltip.style.left = (e.clientX + 12) + 'px'; tooltip.style.top = (e.clientY + 12) + 'px';
+  tooltip.style.display = 'block';
+};
+
+function redrawCharts() { for (const chart of charts) chart.draw(); }
+
+// フレーム時間
+const seriesSelect = document.getElementById('seriesSelect');
+for (const name of Object.keys(D.frameSeries)) {
+  const option = document.createElement('option'); option.value = option.textContent = name; seriesSelect.appendChild(option);
+}
+seriesSelect.addEventListener('change', redrawCharts);
+new TimelineChart(document.getElementById('frameChart'), () => D.frameSeries[seriesSelect.value], 'ms');
+
+// メソッド詳細
+let selected = null;
+new TimelineChart(document.getElementById('methodChart'), function () {
+  const i = selected === null ? -1 : D.seriesMethods.indexOf(selected);
+  return i >= 0 ? D.methodSeries[i] : null;
+}, 'ms');
+
+function drawHistogram() {
+  const canvas = document.getElementById('histChart');
+  const s = setupCanvas(canvas), ctx = s.ctx, pad = { l: 56, r: 10, t: 10, b: 24 };
+  const pw = s.w - pad.l - pad.r, ph = s.h - pad.t - pad.b;
+  ctx.clearRect(0, 0, s.w, s.h);
+  const i = selected === null ? -1 : D.histogramMethods.indexOf(selected);
+  ctx.font = '11px sans-serif'; ctx.fillStyle = '#999';
+  if (i < 0) { ctx.fillText(selected === null ? 'メソッドを選択してください' : 'ヒストグラムなし（上位メソッドのみ埋め込み）', pad.l + 8, pad.t + 16); return; }
+  const counts = D.histograms[i];
+  let lo = counts.findIndex(c => c > 0), hi = counts.length - 1;
+  while (hi > lo && counts[hi] <= 0) hi--;
+  lo = Math.max(0, lo - 1); hi = Math.min(counts.length - 1, hi + 1);
+  const cmax = Math.max.apply(null, counts.slice(lo, hi + 1)) || 1;
+  const bw = pw / (hi - lo + 1);
+  ctx.fillStyle = 'steelblue';
+  for (let k = lo; k <= hi; k++) {
+    const h = counts[k] / cmax * ph;
+    ctx.fillRect(pad.l + (k - lo) * bw, pad.t + ph - h, Math.max(1, bw - 1), h);
+  }
+  ctx.fillStyle = '#555';
+  ctx.fillText(fmt(cmax, 0) + '回', 2, pad.t + 10);
+  for (let k = lo; k <= hi + 1; k += Math.max(1, Math.round((hi - lo) / 6))) {
+    const edge = D.histogramEdges[k];
+    const label = edge >= 1 ? fmt(edge, 1) + 'ms' : fmt(edge * 1000, 0) + 'µs';
+    ctx.fillText(label, pad.l + (k - lo) * bw - 10, s.h - 6);
+  }
+  canvas.onmousemove = function (e) {
+    const k = lo + Math.floor((e.offsetX - pad.l) / bw);
+    if (k < lo || k > hi) { tooltip.style.display = 'none'; return; }
+    tooltip.textContent = fmt(D.histogramEdges[k], 4) + ' ～ ' + fmt(D.histogramEdges[k + 1], 4) + 'ms\n' + fmt(counts[k], 0) + ' 回';
+    tooltip.style.left = (e.clientX + 12) + 'px'; tooltip.style.top = (e.clientY + 12) + 'px';
+    tooltip.style.display = 'block';
+  };
+  canvas.onmouseleave = function () { tooltip.style.display = 'none'; };
+}
+
+// メソッド一覧（並べ替え・絞り込み）
+let sortColumn = D.columns.indexOf('TotalImpactMs'), sortDescending = true;
+const head = document.getElementById('tableHead'), body = document.getElementById('tableBody');
+const filter = document.getElementById('filter');
+
+function renderTable() {
+  head.innerHTML = '';
+  const tr = document.createElement('tr');
+  D.columns.forEach(function (name, c) {
+    const th = document.createElement('th');
+    th.textContent = name + (c === sortColumn ? (sortDescending ? ' ▼' : ' ▲') : '');
+    th.onclick = function () {
+      if (sortColumn === c) sortDescending = !sortDescending; else { sortColumn = c; sortDescending = typeof D.rows[0][c] === 'number'; }
+      renderTable();
+    };
+    tr.appendChild(th);
+  });
+  head.appendChild(tr);
+
+  const needle = filter.value.toLowerCase();
+  const rows = D.rows.filter(row => !needle || String(row[0]).toLowerCase().includes(needle));
+  rows.sort(function (a, b) {
+    const x = a[sortColumn], y = b[sortColumn];
+    const order = (typeof x === 'number' && typeof y === 'number') ? x - y : String(x).localeCompare(String(y));
+    return sortDescending ? -order : order;
+  });
+  const fragment = document.createDocumentFragment();
+  for (const row of rows) {
+    const line = document.createElement('tr');
+    if (row[0] === selected) line.className = 'selected';
+    for (const value of row) {
+      const td = document.createElement('td'); td.textContent = fmt(value); line.appendChild(td);
+    }
+    line.title = row[0];
+    line.onclick = function () { selectMethod(row[0]); };
+    fragment.appendChild(line);
+  }
+  body.innerHTML = '';
+  body.appendChild(fragment);
+}
+filter.addEventListener('input', renderTable);
+
+function selectMethod(name) {
+  selected = name;
+  document.getElementById('detailTitle').textContent = 'メソッド詳細: ' + name;
+  renderTable();
+  drawHistogram();
+  redrawCharts();
+}
+
+document.getElementById('summary').textContent =
+  D.frames.toLocaleString() + ' フレーム / ' + D.rows.length.toLocaleString() + ' メソッド（表示上限）/ 変化点 ' + D.changepoints.length + ' 箇所';
+window.addEventListener('resize', function () { redrawCharts(); drawHistogram(); });
+renderTable();
+if (D.rows.length > 0) selectMethod(D.rows[0][0]); else redrawCharts();
+</script>
+</body>
+</html>
+'''
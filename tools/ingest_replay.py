@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+CS1Profiler 取り込みサーバー用リプレイクライアント
+既存のMPSCトレース（CS1Profiler_*.csv）をゲームの代わりに ingest_server.py へ送信する
+スナップショットの取得（--query）にも使用する
+"""
+
+import argparse
+import json
+import socket
+import time
+
+import numpy as np
+import pandas as pd
+
+import mpsc_trace
+from ingest_server import (DEFAULT_HOST, DEFAULT_PORT, EVENT_DTYPE, FRAME_DTYPE, HEADER, HELLO, MSG_EVENTS,
+                           MSG_FRAMES, MSG_HELLO, MSG_METHOD, MSG_RESULT, MSG_SEQ, MSG_SNAPSHOT, PROTOCOL_VERSION,
+                           SEQ, encode_message)
+
+REPLAY_FREQUENCY = 10_000_000  # Windows上のStopwatch.Frequencyと同じ（100ns tick）
+# UDPデータグラムに収まるイベント数（24バイト × 2048 = 48KB）
+DEFAULT_BATCH_EVENTS = 2048
+MAX_DATAGRAM = 65507
+
+
+def load_trace(csv_file):
+    """トレースを送信用の構造化配列に変換"""
+    df, malformed = mpsc_trace.read_events(csv_file)
+    if malformed:
+        print(f"⚠️ 不正な行を {malformed} 行スキップしました")
+    if 'Count' in df.columns and (df['Count'] > 1).any():
+        # ストリームプロトコルのイベントには重みがない（Mod側もストリーム送信中は全数記録）
+        print("⚠️ 1/Nサンプリングのトレースです: 重み（Count列）は送信されないため、呼び出し数・合計は過小になります")
+    codes, names = pd.factorize(df['MethodName'])
+    events = np.empty(len(df), dtype=EVENT_DTYPE)
+    events['method'] = codes
+    events['thread'] = df['ThreadId'].to_numpy() if 'ThreadId' in df.columns else 0
+    events['start'] = np.round(df['StartTime'].to_numpy() * (REPLAY_FREQUENCY / 1000.0))
+    events['end'] = np.round(df['EndTime'].to_numpy() * (REPLAY_FREQUENCY / 1000.0))
+    events = events[np.argsort(events['start'], kind='stable')]
+
+    meta = mpsc_trace.read_meta_rows(csv_file)
+    markers = meta['FRAME'].sort_values('TimeMs', kind='stable')
+    frames = np.empty(len(markers), dtype=FRAME_DTYPE)
+    frames['frame'] = markers['FrameCount'].to_numpy()
+    frames['thread'] = markers['ThreadId'].fillna(0).to_numpy()
+    frames['tick'] = np.round(markers['TimeMs'].to_numpy() * (REPLAY_FREQUENCY / 1000.0))
+
+    seq = meta['SEQ'].sort_values('TimeMs', kind='stable')
+    return events, list(names), frames, seq
+
+
+class Sender:
+    """TCP/UDPの送信先（UDPは1データグラム = 1メッセージ）"""
+
+    def __init__(self, host, port, udp=False):
+        self.udp = udp
+        self.address = (host, port)
+        if udp:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self.sock = socket.create_connection(self.address)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, kind, body=b''):
+        message = encode_message(kind, body)
+        if self.udp:
+            self.sock.sendto(message, self.address)
+        else:
+            self.sock.sendall(message)
+
+    def query(self, params=None, timeout=10.0):
+        """スナップショットを要求して応答JSONを返す"""
+        self.sock.settimeout(timeout)
+        self.send(MSG_SNAPSHOT, json.dumps(params or {}).encode('utf-8'))
+        if self.udp:
+            data, _ = self.sock.recvfrom(MAX_DATAGRAM)
+        else:
+            data = self._recv_exact(HEADER.size)
+            length, _kind = HEADER.unpack(data)
+            data = data + self._recv_exact(length - 1)
+        length, kind = HEADER.unpack_from(data)
+        if kind != MSG_RESULT:
+            raise ValueError(f'unexpected response type {kind}')
+        return json.loads(data[HEADER.size:4 + length].decode('utf-8'))
+
+    def _recv_exact(self, size):
+        chunks = []
+        while size > 0:
+            chunk = self.sock.recv(size)
+            if not chunk:
+                raise ConnectionError('connection closed')
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def close(self):
+        self.sock.close()
+
+
+def replay(sender, events, names, frames, seq, batch_events=DEFAULT_BATCH_EVENTS, speed=0.0, repeat=1):
+    """
+    トレースを送信（speed=0 は最大速度、1.0 で記録時と同じ速度）
+    フレームマーカーとSEQ行は、そのtick以前のイベントより先に送る
+    """
+    sender.send(MSG_HELLO, HELLO.pack(REPLAY_FREQUENCY, PROTOCOL_VERSION))
+    for method_id, name in enumerate(names):
+        sender.send(MSG_METHOD, np.int32(method_id).tobytes() + str(name).encode('utf-8'))
+
+    seq_ticks = np.round(seq['TimeMs'].to_numpy() * (REPLAY_FREQUENCY / 1000.0)).astype(np.int64)
+    seq_values = seq[['Enqueued', 'Dropped', 'Written']].to_numpy(dtype=np.int64)
+    frames_per_message = MAX_DATAGRAM // FRAME_DTYPE.itemsize // 2
+
+    span = (events['end'].max() - events['start'].min() + REPLAY_FREQUENCY) if len(events) else 0
+    sent = 0
+    started = time.perf_counter()
+    for lap in range(repeat):
+        # 繰り返し送信時はtickをずらして単調増加を保つ
+        shift = lap * span
+        lap_events = events.copy()
+        lap_events['start'] += shift
+        lap_events['end'] += shift
+        lap_frames = frames.copy()
+        lap_frames['tick'] += shift
+
+        frame_pos = seq_pos = 0
+        for begin in range(0, len(lap_events), batch_events):
+            chunk = lap_events[begin:begin + batch_events]
+            last_tick = chunk['start'][-1]
+
+            frame_end = np.searchsorted(lap_frames['tick'], last_tick, side='right')
+            while frame_pos < frame_end:
+                stop = min(frame_end, frame_pos + frames_per_message)
+                sender.send(MSG_FRAMES, lap_frames[frame_pos:stop].tobytes())
+                frame_pos = stop
+            while seq_pos < len(seq_ticks) and seq_ticks[seq_pos] + shift <= last_tick:
+                sender.send(MSG_SEQ, SEQ.pack(seq_ticks[seq_pos] + shift, *seq_values[seq_pos]))
+                seq_pos += 1
+
+            if speed > 0:
+                target = started + (chunk['start'][0] - events['start'][0]) / REPLAY_FREQUENCY / speed
+                delay = target - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            sender.send(MSG_EVENTS, chunk.tobytes())
+            sent += len(chunk)
+
+        if frame_pos < len(lap_frames):
+            sender.send(MSG_FRAMES, lap_frames[frame_pos:].tobytes())
+
+    elapsed = time.perf_counter() - started
+    return sent, elapsed
+
+
+def print_snapshot(snapshot, top=10):
+    print(f"\n📥 受信イベント: {snapshot['Events']:,} ({snapshot['EventsPerSecond']:,.0f}/秒), "
+          f"フレーム: {snapshot['Frames']:,}, 不正メッセージ: {snapshot['Malformed']}")
+    if snapshot['Sender'] is not None:
+        print(f"📉 送信側Drop: {snapshot['Sender']['Dropped']:,} / {snapshot['Sender']['Enqueued']:,}")
+    print("\n📊 メソッド別（合計時間順）")
+    for row in snapshot['Methods'][:top]:
+        print(f"   {row['Method'][:50]}: {row['TotalMs']:.1f}ms, {row['Calls']:,} 回, "
+              f"P50 {row['P50Ms']:.3f} / P95 {row['P95Ms']:.3f} / P99 {row['P99Ms']:.3f}ms")
+    frames = snapshot['RecentFrames']
+    if frames:
+        frame_ms = np.array([f['FrameMs'] for f in frames])
+        print(f"\n🎞️ 直近{len(frames)}フレーム: 平均 {frame_ms.mean():.2f}ms, 最大 {frame_ms.max():.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CS1Profiler Ingest Replay Client')
+    parser.add_argument('csv_file', nargs='?', help='送信するMPSCトレース（--query のみの場合は不要）')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'送信先アドレス (デフォルト: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'送信先ポート (デフォルト: {DEFAULT_PORT})')
+    parser.add_argument('--udp', action='store_true', help='TCPではなくUDPで送信')
+    parser.add_argument('--speed', type=float, default=0.0, help='再生速度（1.0 = 記録時と同じ、0 = 最大速度）')
+    parser.add_argument('--repeat', type=int, default=1, help='繰り返し送信回数（負荷試験用）')
+    parser.add_argument('--batch', type=int, default=DEFAULT_BATCH_EVENTS, help='1メッセージあたりのイベント数')
+    parser.add_argument('--query', action='store_true', help='送信後（またはcsv_file省略時は即座に）スナップショットを表示')
+    parser.add_argument('--json', action='store_true', help='スナップショットをJSONのまま出力')
+    parser.add_argument('--samples', type=int, default=0, help='スナップショットに含めるメソッドあたりの処理時間サンプル数（--json と併用）')
+    args = parser.parse_args()
+
+    sender = Sender(args.host, args.port, args.udp)
+    try:
+        if args.csv_file:
+            events, names, frames, seq = load_trace(args.csv_file)
+            print(f"📂 {len(events):,} イベント, {len(names)} メソッド, {len(frames):,} フレーム")
+            sent, elapsed = replay(sender, events, names, frames, seq, args.batch, args.speed, args.repeat)
+            print(f"📤 送信完了: {sent:,} イベント / {elapsed:.2f}秒 ({sent / max(elapsed, 1e-9):,.0f}/秒)")
+        if args.query or not args.csv_file:
+            snapshot = sender.query({'samples': args.samples} if args.samples > 0 else None)
+            if args.json:
+                print(json.dumps(snapshot, ensure_ascii=False, indent=2))
+            else:
+                print_snapshot(snapshot)
+    finally:
+        sender.close()
+
+
+if __name__ == '__main__':
+    main()
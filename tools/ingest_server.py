@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+CS1Profiler ライブ取り込みサーバー
+MPSCLoggerのストリーム送信（MPSCLogger.StreamEndpoint）や ingest_replay.py から
+長さ付きバイナリバッチをローカルのTCP/UDPで受信し、メソッド別・フレーム別の集計をメモリ上に保持する
+
+プロトコル（リトルエンディアン）:
+    メッセージ = uint32 長さ（種別バイト以降のバイト数） + uint8 種別 + 本体
+    HELLO    (0): int64 Stopwatch.Frequency, int32 プロトコルバージョン
+    METHOD   (1): int32 メソッドID（0 ≤ ID < MAX_METHOD_ID）, UTF-8 メソッド名（残り全部）
+    EVENTS   (2): N × (int32 メソッドID, int32 スレッドID, int64 開始tick, int64 終了tick)
+    FRAMES   (3): N × (int32 フレーム番号, int32 スレッドID, int64 tick)
+    SEQ      (4): int64 tick, int64 Enqueued, int64 Dropped, int64 Written
+    SNAPSHOT (5): 要求（本体は任意のJSON: {"top": 20, "frames": 120, "samples": 0}、他のキーは無視）
+    RESULT   (6): SNAPSHOTへの応答（UTF-8 JSON）
+UDPでは1データグラムに1つ以上のメッセージを詰めて送る
+不正なメッセージ（長さ・範囲外のメソッドID・周波数0・壊れたJSON）は破棄して不正件数に数える
+
+集計はバッチ単位でNumPyにより一括処理する（1コアで毎秒100万イベント以上）:
+    メソッド別: 呼び出し回数・合計/最大ms・対数バケットの分位点スケッチ・直近60秒のリングバッファ
+              分布サンプルのリザーバー（集計ごとに一様抽出した最大 RESERVOIR_SAMPLE_EVENTS 件から）
+    フレーム別: 直近のフレームを固定長リングバッファに保持（フレーム時間・メインスレッド処理時間）
+"""
+
+import argparse
+import asyncio
+import json
+import struct
+import time
+
+import numpy as np
+
+from reservoir import DEFAULT_RESERVOIR_SIZE, MethodReservoir
+
+PROTOCOL_VERSION = 1
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9400
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+# メソッドIDの上限（送信側は0から連番で振る。メソッド別の配列・スケッチ・リザーバーのメモリ上限を兼ねる）
+MAX_METHOD_ID = 1 << 14
+# SNAPSHOT要求で受け付けるパラメータと上限
+SNAPSHOT_PARAMS = {'top': 1000, 'frames': 8192, 'samples': 100_000}
+
+MSG_HELLO = 0
+MSG_METHOD = 1
+MSG_EVENTS = 2
+MSG_FRAMES = 3
+MSG_SEQ = 4
+MSG_SNAPSHOT = 5
+MSG_RESULT = 6
+
+HEADER = struct.Struct('<IB')
+HELLO = struct.Struct('<qi')
+SEQ = struct.Struct('<qqqq')
+EVENT_DTYPE = np.dtype([('method', '<i4'), ('thread', '<i4'), ('start', '<i8'), ('end', '<i8')])
+FRAME_DTYPE = np.dtype([('frame', '<i4'), ('thread', '<i4'), ('tick', '<i8')])
+
+# 集計の一括処理単位（これ未満はタイマーまたはスナップショット要求時に処理）
+FLUSH_EVENTS = 1 << 16
+FLUSH_INTERVAL_SEC = 0.1
+# 1回の集計でリザーバーへ渡すイベント数の上限（一様に抽出し、重み = バッチ件数 / 抽出件数）
+# リザーバーの統合はメソッド数 × サイズの処理になるため、バッチ全体を渡すと集計時間の大半を占める
+RESERVOIR_SAMPLE_EVENTS = 2048
+
+
+def encode_message(kind, body=b''):
+    """メッセージ1件をエンコード（ingest_replay.py と共通）"""
+    return HEADER.pack(len(body) + 1, kind) + body
+
+
+def iter_messages(buffer):
+    """バイト列から (種別, 本体) を順に取り出す（UDPデータグラム用）"""
+    view = memoryview(buffer)
+    pos = 0
+    while pos + HEADER.size <= len(view):
+        length, kind = HEADER.unpack_from(view, pos)
+        if length < 1 or pos + 4 + length > len(view):
+            raise ValueError('truncated message')
+        yield kind, view[pos + HEADER.size:pos + 4 + length]
+        pos += 4 + length
+
+
+class QuantileSketch:
+    """
+    メソッド別の対数バケットヒストグラム（相対誤差 ±relative_accuracy の分位点）
+    メソッド×バケットの行列に一括加算するため、追加コストはイベント数に比例する
+    """
+
+    def __init__(self, relative_accuracy=0.02, min_ms=1e-4, max_ms=1e5, capacity=1024):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.min_ms = min_ms
+        self.bins = int(np.ceil(np.log(max_ms / min_ms) / self.log_gamma)) + 2
+        self.counts = np.zeros((capacity, self.bins), dtype=np.int64)
+
+    def ensure_capacity(self, methods):
+        if methods > len(self.counts):
+            grown = np.zeros((max(methods, len(self.counts) * 2), self.bins), dtype=np.int64)
+            grown[:len(self.counts)] = self.counts
+            self.counts = grown
+
+    def add(self, method_ids, durations_ms):
+        bins = np.ceil(np.log(np.maximum(durations_ms, self.min_ms) / self.min_ms) / self.log_gamma).astype(np.int64)
+        np.clip(bins, 0, self.bins - 1, out=bins)
+        keys = method_ids.astype(np.int64) * self.bins + bins
+        self.counts.reshape(-1)[:] += np.bincount(keys, minlength=self.counts.size)
+
+    def quantiles(self, method_id, qs):
+        counts = self.counts[method_id]
+        total = counts.sum()
+        if total == 0:
+            return [float('nan')] * len(qs)
+        cumulative = np.cumsum(counts)
+        bins = np.searchsorted(cumulative, np.asarray(qs) * total, side='left')
+        # バケット代表値（上下端の幾何平均）
+        return [float(self.min_ms * self.gamma ** (b - 0.5)) if b > 0 else self.min_ms for b in bins]
+
+
+class IngestState:
+    """受信データの集計状態（イベントループのスレッドからのみ操作する）"""
+
+    def __init__(self, frame_capacity=8192, window_seconds=60, method_capacity=1024,
+                 reservoir_size=DEFAULT_RESERVOIR_SIZE):
+        self.frequency = 10_000_000
+        self.method_names = {}
+        self.method_capacity = method_capacity
+        self.calls = np.zeros(method_capacity, dtype=np.int64)
+        self.total_ms = np.zeros(method_capacity)
+        self.max_ms = np.zeros(method_capacity)
+        self.sketch = QuantileSketch(capacity=method_capacity)
+        # 分布の形（バイオリン図・ヒストグラム）用の固定数サンプル（メモリ上限 = メソッド数 × サイズ）
+        # 集計ごとに RESERVOIR_SAMPLE_EVENTS 件だけ抽出して追加する（呼び出し数・合計・分位点は全イベントから）
+        self.reservoir = MethodReservoir(reservoir_size, capacity=method_capacity)
+        self.sample_rng = np.random.default_rng(0)
+
+        # 直近 window_seconds 秒のメソッド別合計（1秒バケットのリング）
+        self.window_seconds = window_seconds
+        self.window_second = np.full(window_seconds, -1, dtype=np.int64)
+        self.window_ms = np.zeros((window_seconds, method_capacity))
+
+        # フレームリング
+        self.frame_capacity = frame_capacity
+        self.frames_seen = 0
+        self.frame_number = np.zeros(frame_capacity, dtype=np.int64)
+        self.frame_tick = np.zeros(frame_capacity, dtype=np.int64)
+        self.frame_main_ms = np.zeros(frame_capacity)
+        self.frame_all_ms = np.zeros(frame_capacity)
+        self.frame_events = np.zeros(frame_capacity, dtype=np.int64)
+        self.main_thread = None
+
+        self.pending = []
+        self.pending_count = 0
+        # 最新フレームの次のマーカーが届くまでフレーム割り当てを保留するイベント
+        self.open_frame_events = np.zeros(0, dtype=EVENT_DTYPE)
+
+        self.events = 0
+        self.messages = 0
+        self.malformed = 0
+        self.seq = None
+        self.started = time.perf_counter()
+        self.rate_mark = (self.started, 0)
+        self.events_per_second = 0.0
+
+    # ---- 受信 ----
+
+    def handle(self, kind, body):
+        """
+        メッセージ1件を処理（SNAPSHOT要求のときは応答JSONのbytesを返す）
+        不正なメッセージは不正件数に数えて捨てる（1つのクライアントの不正データで取り込みを止めない）
+        """
+        self.messages += 1
+        try:
+            return self._handle(kind, body)
+        except Exception as e:
+            self.malformed += 1
+            print(f"⚠️ 不正なメッセージを破棄しました（種別 {kind}）: {e}")
+            return None
+
+    def _handle(self, kind, body):
+        if kind == MSG_EVENTS:
+            if len(body) % EVENT_DTYPE.itemsize:
+                self.malformed += 1
+                return None
+            events = np.frombuffer(body, dtype=EVENT_DTYPE)
+            invalid = (events['method'] < 0) | (events['method'] >= MAX_METHOD_ID)
+            if invalid.any():
+                # 範囲外のメソッドIDを含むバッチは範囲内のイベントだけを集計
+                self.malformed += 1
+                events = events[~invalid]
+            self.pending.append(events)
+            self.pending_count += len(events)
+            if self.pending_count >= FLUSH_EVENTS:
+                self.flush()
+        elif kind == MSG_FRAMES:
+            if len(body) % FRAME_DTYPE.itemsize:
+                self.malformed += 1
+                return None
+            self.add_frames(np.frombuffer(body, dtype=FRAME_DTYPE))
+        elif kind == MSG_METHOD:
+            if len(body) < 4:
+                self.malformed += 1
+                return None
+            method_id = struct.unpack_from('<i', body)[0]
+            if not 0 <= method_id < MAX_METHOD_ID:
+                self.malformed += 1
+                return None
+            self.method_names[method_id] = bytes(body[4:]).decode('utf-8', errors='replace')
+            self._ensure_methods(method_id + 1)
+        elif kind == MSG_HELLO:
+            if len(body) < HELLO.size:
+                self.malformed += 1
+                return None
+            frequency, _version = HELLO.unpack_from(body)
+            if frequency <= 0:
+                self.malformed += 1
+                return None
+            self.frequency = frequency
+        elif kind == MSG_SEQ:
+            if len(body) < SEQ.size:
+                self.malformed += 1
+                return None
+            self.seq = SEQ.unpack_from(body)
+        elif kind == MSG_SNAPSHOT:
+            params = json.loads(bytes(body).decode('utf-8')) if len(body) else {}
+            if not isinstance(params, dict):
+                self.malformed += 1
+                return None
+            # 既知のパラメータだけを整数として受け付け、上限で切り詰める
+            params = {name: min(max(int(params[name]), 0), limit)
+                      for name, limit in SNAPSHOT_PARAMS.items() if name in params}
+            return json.dumps(self.snapshot(**params), ensure_ascii=False).encode('utf-8')
+        else:
+            self.malformed += 1
+        return None
+
+    def _ensure_methods(self, methods):
+        if methods <= self.method_capacity:
+            return
+        capacity = min(max(methods, self.method_capacity * 2), MAX_METHOD_ID)
+        for name in ('calls', 'total_ms', 'max_ms'):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+        window = np.zeros((self.window_seconds, capacity))
+        window[:, :self.method_capacity] = self.window_ms
+        self.window_ms = window
+        self.sketch.ensure_capacity(capacity)
+        self.reservoir.ensure_capacity(capacity)
+        self.method_capacity = capacity
+
+    # ---- 集計 ----
+
+    def add_frames(self, frames):
+        if self.main_thread is None and len(frames) > 0:
+            self.main_thread = int(frames['thread'][0])
+        for frame in frames:
+            slot = self.frames_seen % self.frame_capacity
+            self.frame_number[slot] = frame['frame']
+            self.frame_tick[slot] = frame['tick']
+            self.frame_main_ms[slot] = 0.0
+            self.frame_all_ms[slot] = 0.0
+            self.frame_events[slot] = 0
+            self.frames_seen += 1
+
+    def flush(self):
+        """保留中のイベントをまとめて集計"""
+        if self.pending_count == 0 and len(self.open_frame_events) == 0:
+            return
+        events = np.concatenate(self.pending) if self.pending else np.zeros(0, dtype=EVENT_DTYPE)
+        self.pending = []
+        self.pending_count = 0
+        self.events += len(events)
+
+        methods = events['method']
+        if len(methods) > 0:
+            self._ensure_methods(int(methods.max()) + 1)
+            duration_ms = (events['end'] - events['start']) * (1000.0 / self.frequency)
+            self.calls += np.bincount(methods, minlength=self.method_capacity)
+            self.total_ms += np.bincount(methods, weights=duration_ms, minlength=self.method_capacity)
+            np.maximum.at(self.max_ms, methods, duration_ms)
+            self.sketch.add(methods, duration_ms)
+            self._add_samples(methods, duration_ms)
+            self._add_window(events, duration_ms)
+
+        self._assign_frames(np.concatenate([self.open_frame_events, events]))
+
+        now = time.perf_counter()
+        mark_time, mark_events = self.rate_mark
+        if now - mark_time >= 1.0:
+            self.events_per_second = (self.events - mark_events) / (now - mark_time)
+            self.rate_mark = (now, self.events)
+
+    def _add_samples(self, methods, duration_ms):
+        if len(methods) <= RESERVOIR_SAMPLE_EVENTS:
+            self.reservoir.add(methods, duration_ms)
+            return
+        picked = self.sample_rng.choice(len(methods), RESERVOIR_SAMPLE_EVENTS, replace=False)
+        weights = np.full(RESERVOIR_SAMPLE_EVENTS, len(methods) / RESERVOIR_SAMPLE_EVENTS)
+        self.reservoir.add(methods[picked], duration_ms[picked], weights)
+
+    def _add_window(self, events, duration_ms):
+        seconds = events['start'] // self.frequency
+        for second in np.unique(seconds):
+            slot = second % self.window_seconds
+            if second < self.window_second[slot]:
+                continue  # リングから外れた古いデータ
+            if second > self.window_second[slot]:
+                self.window_second[slot] = second
+                self.window_ms[slot] = 0.0
+            mask = seconds == second
+            self.window_ms[slot] += np.bincount(events['method'][mask], weights=duration_ms[mask],
+                                                minlength=self.method_capacity)
+
+    def _assign_frames(self, events):
+        known = min(self.frames_seen, self.frame_capacity)
+        if known == 0 or len(events) == 0:
+            self.open_frame_events = events[-FLUSH_EVENTS * 16:]
+            return
+
+        order = np.arange(self.frames_seen - known, self.frames_seen) % self.frame_capacity
+        ticks = self.frame_tick[order]
+        # 最新フレームの開始以降は次のマーカーが届くまで保留
+        still_open = events['start'] >= ticks[-1]
+        self.open_frame_events = events[still_open][-FLUSH_EVENTS * 16:]
+        events = events[~still_open]
+
+        position = np.searchsorted(ticks, events['start'], side='right') - 1
+        valid = position >= 0
+        slots = order[position[valid]]
+        events = events[valid]
+        duration_ms = (events['end'] - events['start']) * (1000.0 / self.frequency)
+        self.frame_all_ms += np.bincount(slots, weights=duration_ms, minlength=self.frame_capacity)
+        self.frame_events += np.bincount(slots, minlength=self.frame_capacity)
+        main = events['thread'] == self.main_thread
+        self.frame_main_ms += np.bincount(slots[main], weights=duration_ms[main], minlength=self.frame_capacity)
+
+    # ---- スナップショット ----
+
+    def snapshot(self, top=20, frames=120, samples=0):
+        """
+        現在の集計状態をJSON化可能なdictで返す
+        samples > 0 の場合は各メソッドのリザーバーサンプルを最大 samples 件含める
+        """
+        self.flush()
+        active = np.flatnonzero(self.calls)
+        ranked = active[np.argsort(-self.total_ms[active])][:top]
+
+        newest_second = self.window_second.max()
+        recent = (self.window_second >= 0) & (self.window_second > newest_second - self.window_seconds)
+        recent_seconds = max(int(recent.sum()), 1)
+        recent_ms = self.window_ms[recent].sum(axis=0) / recent_seconds
+
+        method_rows = []
+        for method_id in ranked:
+            p50, p95, p99 = self.sketch.quantiles(method_id, [0.5, 0.95, 0.99])
+            method_rows.append({
+                'Method': self.method_names.get(int(method_id), f'#{method_id}'),
+                'Calls': int(self.calls[method_id]),
+                'TotalMs': float(self.total_ms[method_id]),
+                'AvgMs': float(self.total_ms[method_id] / self.calls[method_id]),
+                'P50Ms': p50,
+                'P95Ms': p95,
+                'P99Ms': p99,
+                'MaxMs': float(self.max_ms[method_id]),
+                'RecentMsPerSec': float(recent_ms[method_id]),
+            })
+            if samples > 0:
+                method_rows[-1]['Samples'] = self.reservoir.samples(method_id)[:samples].round(4).tolist()
+
+        # 完了済みフレーム（次のマーカーが届いたもの）のみ返す
+        known = min(self.frames_seen, self.frame_capacity)
+        order = np.arange(self.frames_seen - known, self.frames_seen) % self.frame_capacity
+        frame_ms = np.diff(self.frame_tick[order]) * (1000.0 / self.frequency)
+        closed = order[:-1][-frames:] if frames > 0 else order[:0]
+        frame_rows = [{
+            'Frame': int(self.frame_number[slot]),
+            'FrameMs': float(ms),
+            'MainThreadMs': float(self.frame_main_ms[slot]),
+            'AllThreadsMs': float(self.frame_all_ms[slot]),
+            'Events': int(self.frame_events[slot]),
+        } for slot, ms in zip(closed, frame_ms[-frames:])]
+
+        seq = None
+        if self.seq is not None:
+            _tick, enqueued, dropped, written = self.seq
+            seq = {'Enqueued': enqueued, 'Dropped': dropped, 'Written': written}
+
+        return {
+            'Events': int(self.events),
+            'Messages': int(self.messages),
+            'Malformed': int(self.malformed),
+            'EventsPerSecond': self.events_per_second,
+            'UptimeSec': time.perf_counter() - self.started,
+            'Frames': int(self.frames_seen),
+            'Sender': seq,
+            'Methods': method_rows,
+            'RecentFrames': frame_rows,
+        }
+
+
+class StreamHandler:
+    """TCP接続1本分の受信処理"""
+
+    def __init__(self, state):
+        self.state = state
+
+    async def __call__(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        print(f"🔌 接続: {peer}")
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                length, kind = HEADER.unpack(header)
+                if length < 1 or length > MAX_MESSAGE_BYTES:
+                    self.state.malformed += 1
+                    break
+                body = await reader.readexactly(length - 1)
+                response = self.state.handle(kind, body)
+                if response is not None:
+                    writer.write(encode_message(MSG_RESULT, response))
+                    await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            self.state.flush()
+            writer.close()
+            print(f"🔌 切断: {peer}")
+
+
+class DatagramHandler(asyncio.DatagramProtocol):
+    """UDPデータグラムの受信処理"""
+
+    def __init__(self, state):
+        self.state = state
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            for kind, body in iter_messages(data):
+                response = self.state.handle(kind, body)
+                if response is not None:
+                    self.transport.sendto(encode_message(MSG_RESULT, response), addr)
+        except ValueError:
+            self.state.malformed += 1
+
+
+async def periodic_flush(state, report_interval):
+    last_report = time.perf_counter()
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_SEC)
+        try:
+            state.flush()
+        except Exception as e:
+            # 保留分は flush の先頭で取り出し済みのため、次回以降の集計は継続する
+            state.malformed += 1
+            print(f"⚠️ 集計中にエラーが発生しました（保留イベントを破棄）: {e}")
+        if report_interval > 0 and time.perf_counter() - last_report >= report_interval:
+            last_report = time.perf_counter()
+            print(f"📥 {state.events:,} イベント ({state.events_per_second:,.0f}/秒), "
+                  f"フレーム {state.frames_seen:,}, 不正 {state.malformed}")
+
+
+async def serve(host, port, udp=False, report_interval=5.0, state=None):
+    state = state or IngestState()
+    if udp:
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: DatagramHandler(state), local_addr=(host, port))
+        print(f"🚀 UDP取り込みサーバー起動: {host}:{port}")
+        try:
+            await periodic_flush(state, report_interval)
+        finally:
+            transport.close()
+    else:
+        server = await asyncio.start_server(StreamHandler(state), host, port)
+        print(f"🚀 TCP取り込みサーバー起動: {host}:{port}")
+        async with server:
+            await periodic_flush(state, report_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CS1Profiler Live Ingest Server')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'待ち受けアドレス (デフォルト: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'待ち受けポート (デフォルト: {DEFAULT_PORT})')
+    parser.add_argument('--udp', action='store_true', help='TCPではなくUDPで待ち受け')
+    parser.add_argument('--report-interval', type=float, default=5.0, help='受信状況の表示間隔（秒、0で無効）')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.udp, args.report_interval))
+    except KeyboardInterrupt:
+        print("\n✅ 取り込みサーバー停止")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+メソッド × 時間のヒートマップ
+(メソッドコード, 時間バケット) の組を np.bincount で固定サイズの2次元配列に加算する
+イベントはチャンク単位で加算するため、トレース全体をメモリに載せる必要はない
+メモリと描画時間は メソッド数 × 時間バケット数（出力解像度）だけで決まり、イベント数には依存しない
+
+各セルは時間バケット内でそのメソッドが費やした時間の合計（Duration × Count）。イベントは開始時刻のバケットに入れる
+（バケット幅はイベントの処理時間より十分長い前提）
+
+行の並び順:
+    total   : 総時間の降順
+    peak    : 最も重い時間バケットの順（どのメソッドがいつ重くなるかを上から順に追える）
+    cluster : 時間方向のプロファイルが似たメソッドを隣接させる（相関距離の平均連結法による階層クラスタリング）
+"""
+
+import argparse
+import os
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+
+import mpsc_trace
+
+plt.rcParams['font.family'] = ['DejaVu Sans', 'Yu Gothic', 'Hiragino Sans', 'Noto Sans CJK JP']
+
+DEFAULT_WIDTH = 1200
+DEFAULT_ROWS = 150
+ROW_ORDERS = ('total', 'peak', 'cluster')
+DEFAULT_ROW_ORDER = 'cluster'
+# ラベルを全行に付ける最大行数（超える場合は間引く）
+MAX_LABELED_ROWS = 80
+
+
+class MethodTimeHeatmap:
+    """メソッド × 時間バケットの累積時間（ms）"""
+
+    def __init__(self, from_ms, to_ms, width=DEFAULT_WIDTH):
+        if not np.isfinite(from_ms) or not np.isfinite(to_ms) or to_ms <= from_ms:
+            to_ms = from_ms + 1.0
+        self.from_ms = float(from_ms)
+        self.width = width
+        self.bucket_ms = (float(to_ms) - self.from_ms) / width
+        self.names = []
+        self._codes = {}
+        self.grid = np.zeros((0, width))
+
+    @property
+    def edges_ms(self):
+        return self.from_ms + np.arange(self.width + 1) * self.bucket_ms
+
+    def _method_codes(self, names):
+        """チャンク内のメソッド名を全体のメソッドコードに変換（名前の辞書引きはユニーク名だけ）"""
+        local, uniques = pd.factorize(pd.Series(names))
+        lookup = np.empty(len(uniques), dtype=np.int64)
+        for i, name in enumerate(uniques):
+            code = self._codes.get(name)
+            if code is None:
+                code = self._codes[name] = len(self.names)
+                self.names.append(name)
+            lookup[i] = code
+        return lookup[local] if len(uniques) > 0 else np.zeros(0, dtype=np.int64)
+
+    def add(self, names, start_ms, weights_ms):
+        """イベントのチャンクを加算（names / start_ms / weights_ms は同じ長さ、範囲外の時刻は無視）"""
+        codes = self._method_codes(names)
+        if len(codes) == 0:
+            return
+        if len(self.names) > len(self.grid):
+            grown = np.zeros((max(len(self.names), len(self.grid) * 2), self.width))
+            grown[:len(self.grid)] = self.grid
+            self.grid = grown
+
+        bucket = np.floor((np.asarray(start_ms, dtype=np.float64) - self.from_ms) / self.bucket_ms)
+        # 終端ちょうどのイベントは最後のバケットに含める
+        bucket[bucket == self.width] = self.width - 1
+        valid = (bucket >= 0) & (bucket < self.width)
+        cells = codes[valid] * self.width + bucket[valid].astype(np.int64)
+        rows = int(codes[valid].max()) + 1 if valid.any() else 0
+        self.grid[:rows] += np.bincount(cells, weights=np.asarray(weights_ms, dtype=np.float64)[valid],
+                                        minlength=rows * self.width).reshape(rows, self.width)
+
+    def matrix(self):
+        return self.grid[:len(self.names)]
+
+    def ordered_rows(self, rows=DEFAULT_ROWS, order=DEFAULT_ROW_ORDER):
+        """総時間上位 rows 件を選んで order の順に並べた行インデックス"""
+        matrix = self.matrix()
+        totals = matrix.sum(axis=1)
+        selected = np.argsort(-totals, kind='stable')[:rows]
+        selected = selected[totals[selected] > 0]
+        if order == 'peak':
+            return selected[np.argsort(matrix[selected].argmax(axis=1), kind='stable')]
+        if order == 'cluster':
+            return selected[average_linkage_order(matrix[selected])]
+        return selected
+
+
+def average_linkage_order(profiles):
+    """
+    行プロファイルの相関距離による平均連結法の階層クラスタリングで、葉の順（デンドログラムの並び）を返す
+    各行を標準化して相関を取るため、絶対量ではなく「いつ重いか」が似た行が隣接する
+    行数は表示行数で上限があるため、距離行列を直接更新する O(行数³) で十分
+    """
+    n = len(profiles)
+    if n <= 2:
+        return np.arange(n)
+    centered = profiles - profiles.mean(axis=1, keepdims=True)
+    norm = np.linalg.norm(centered, axis=1, keepdims=True)
+    standardized = np.divide(centered, norm, out=np.zeros_like(centered), where=norm > 0)
+    distance = 1.0 - standardized @ standardized.T
+    np.fill_diagonal(distance, np.inf)
+
+    members = [[i] for i in range(n)]
+    for _ in range(n - 1):
+        i, j = np.unravel_index(np.argmin(distance), distance.shape)
+        if i > j:
+            i, j = j, i
+        # 平均連結: 統合後のクラスタとの距離はメンバー数で重み付けした平均
+        size_i, size_j = len(members[i]), len(members[j])
+        merged = (distance[i] * size_i + distance[j] * size_j) / (size_i + size_j)
+        distance[i], distance[:, i] = merged, merged
+        distance[i, i] = np.inf
+        distance[j], distance[:, j] = np.inf, np.inf
+        members[i] = members[i] + members[j]
+        members[j] = []
+    return np.asarray(members[0])
+
+
+def plot_heatmap(heatmap, output, rows=DEFAULT_ROWS, order=DEFAULT_ROW_ORDER, title=None, origin_ms=None):
+    """
+    ヒートマップを1枚の画像として描画（セルはバケット時間に対する割合 %）
+    画像サイズは表示行数と時間バケット数だけで決まる
+    """
+    selected = heatmap.ordered_rows(rows, order)
+    if len(selected) == 0:
+        return False
+    share = heatmap.matrix()[selected] / heatmap.bucket_ms * 100.0
+    positive = share[share > 0]
+    origin_ms = heatmap.from_ms if origin_ms is None else origin_ms
+    start_s = (heatmap.from_ms - origin_ms) / 1000.0
+    end_s = start_s + heatmap.bucket_ms * heatmap.width / 1000.0
+
+    fig, ax = plt.subplots(figsize=(16, min(4 + len(selected) * 0.13, 30)))
+    image = ax.imshow(np.where(share > 0, share, np.nan), aspect='auto', interpolation='nearest', cmap='inferno',
+                      norm=LogNorm(vmin=max(positive.min(), positive.max() * 1e-4), vmax=positive.max()),
+                      extent=(start_s, end_s, len(selected) - 0.5, -0.5))
+    ax.set_facecolor('black')
+    step = max(1, -(-len(selected) // MAX_LABELED_ROWS))
+    labels = [heatmap.names[i] for i in selected]
+    ax.set_yticks(range(0, len(selected), step))
+    ax.set_yticklabels(['...' + name[-47:] if len(name) > 50 else name for name in labels[::step]], fontsize=6)
+    ax.set_xlabel('経過時間 (秒)')
+    ax.set_title(title or f'メソッド × 時間 ヒートマップ（総時間上位{len(selected)}件, 並び順: {order}, '
+                          f'バケット {heatmap.bucket_ms:.0f}ms）')
+    colorbar = fig.colorbar(image, ax=ax, pad=0.01)
+    colorbar.set_label('バケット時間に占める割合 (%)')
+    plt.tight_layout()
+    plt.savefig(output, format='png', dpi=150, bbox_inches='tight')
+    plt.close()
+    return True
+
+
+def heatmap_from_trace(csv_file, width=DEFAULT_WIDTH, from_ms=-np.inf, to_ms=np.inf):
+    """
+    MPSCトレースをブロックインデックスの単位で読みながらヒートマップを作成（トレース全体は保持しない）
+    時間範囲はインデックスのStartTime最小・最大値（と from_ms/to_ms の指定）で決める
+    """
+    index = mpsc_trace.load_index(csv_file)
+    blocks = index['blocks']
+    blocks = blocks[(blocks['MaxStartMs'] >= from_ms) & (blocks['MinStartMs'] < to_ms) & (blocks['Rows'] > 0)]
+    if len(blocks) == 0:
+        return None
+    begin = max(from_ms, blocks['MinStartMs'].min())
+    end = min(to_ms, blocks['MaxStartMs'].max())
+    heatmap = MethodTimeHeatmap(begin, end, width)
+
+    # インデックスのブロックを解析単位（64MB）にまとめて読む
+    for events, _ in mpsc_trace.iter_time_range(csv_file, index, from_ms, to_ms):
+        weights = events['Duration(ms)'] * events['Count'] if 'Count' in events.columns else events['Duration(ms)']
+        heatmap.add(events['MethodName'].to_numpy(), events['StartTime'].to_numpy(), weights.to_numpy())
+    return heatmap
+
+
+def main():
+    default_output = f"method_heatmap_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    parser = argparse.ArgumentParser(description='CS1Profiler Method × Time Heatmap')
+    parser.add_argument('csv_file', help='CS1Profiler_*.csv（MPSCトレース）')
+    parser.add_argument('-o', '--output', default=default_output, help=f'出力ディレクトリ (デフォルト: {default_output})')
+    parser.add_argument('--width', type=int, default=DEFAULT_WIDTH, help=f'時間バケット数 (デフォルト: {DEFAULT_WIDTH})')
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help=f'表示するメソッド数 (デフォルト: {DEFAULT_ROWS})')
+    parser.add_argument('--order', choices=ROW_ORDERS, default=DEFAULT_ROW_ORDER, help=f'行の並び順 (デフォルト: {DEFAULT_ROW_ORDER})')
+    parser.add_argument('--from', dest='time_from', type=float, help='開始（トレース先頭からの秒数）')
+    parser.add_argument('--to', dest='time_to', type=float, help='終了（トレース先頭からの秒数）')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv_file):
+        print(f"❌ ファイルが見つかりません: {args.csv_file}")
+        return
+    if not mpsc_trace.is_event_header(mpsc_trace.read_header(args.csv_file)):
+        print("❌ MPSCトレース（MethodName,Duration(ms),StartTime,...）ではありません")
+        return
+
+    index = mpsc_trace.load_index(args.csv_file)
+    trace_start_ms = index['blocks']['MinStartMs'].min()
+    from_ms = trace_start_ms + args.time_from * 1000.0 if args.time_from is not None else -np.inf
+    to_ms = trace_start_ms + args.time_to * 1000.0 if args.time_to is not None else np.inf
+
+    print(f"🔥 ヒートマップ作成中: {args.csv_file} ({args.width} バケット)")
+    heatmap = heatmap_from_trace(args.csv_file, args.width, from_ms, to_ms)
+    if heatmap is None or len(heatmap.names) == 0:
+        print("❌ 指定範囲にイベントがありません")
+        return
+
+    os.makedirs(args.output, exist_ok=True)
+    output = f'{args.output}/method_time_heatmap.png'
+    plot_heatmap(heatmap, output, args.rows, args.order,
+                 title=f'{os.path.basename(args.csv_file)}: メソッド × 時間（並び順: {args.order}, バケット {heatmap.bucket_ms:.0f}ms）',
+                 origin_ms=trace_start_ms)
+
+    totals = heatmap.matrix().sum(axis=1)
+    rows = heatmap.ordered_rows(args.rows, args.order)
+    pd.DataFrame({
+        'MethodName': [heatmap.names[i] for i in rows],
+        'TotalMs': totals[rows],
+        'PeakBucketMs': heatmap.matrix()[rows].max(axis=1),
+        'PeakTimeSec': (heatmap.edges_ms[heatmap.matrix()[rows].argmax(axis=1)] - trace_start_ms) / 1000.0,
+    }).to_csv(f'{args.output}/method_time_heatmap_rows.csv', index=False, encoding='utf-8-sig')
+
+    print(f"🎯 {len(heatmap.names):,} メソッド, 表示 {len(rows)} 行, 配列 {heatmap.grid.nbytes / 1024 / 1024:.1f} MB")
+    print(f"\n✅ 解析完了! 結果: {args.output}/")
+
+
+if __name__ == '__main__':
+    main()
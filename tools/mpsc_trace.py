@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+"""
+MPSCトレース共通ユーティリティ
+CS1Profiler_*.csv（MPSCLogger出力）のメタ行を読み取るためのヘルパー
+
+メタ行は '#' で始まり、通常のイベント行とは別に解釈する:
+    #SEQ,TimeMs,Enqueued,Dropped,Written
+        TimeMs   : Stopwatch基準のミリ秒（StartTime/EndTime列と同じ時計）
+        Enqueued : Ring Bufferに受理された累積イベント数
+        Dropped  : オーバーランでDropされた累積イベント数
+        Written  : CSVに書き込まれた累積イベント数
+    #FRAME,TimeMs,FrameCount,ThreadId
+        メインスレッドのUpdate開始時刻（フレーム境界）とメインスレッドID
+        （旧バージョンのThreadId無し行はNaNで補完）
+    #MEM,TimeMs,HeapBytes,GcCount
+        フレーム境界と同じ時刻のヒープサイズ（GC.GetTotalMemory）と累積GC回数
+        GC回数が増えたフレームでは必ず、それ以外は約100msごとに出力される
+
+Timestamp列はWriter threadが行を書いた時刻であり、イベント発生時刻ではない。
+イベント時刻は StartTime（Stopwatchミリ秒）にファイルごとに推定した
+オフセットを足して壁時計時刻に変換する。
+
+MethodName は引用符なしで書かれ、ジェネリック型（Dictionary`2[K,V] 等）や一部のModの名前空間で
+カンマを含むことがあるため、イベント行は右から固定数のフィールドを切り出して解析する（read_events）。
+
+大きなトレースは疎なブロックインデックス（<csv>.idx.npz）を作成し、
+時間範囲・フレーム範囲に該当するブロックだけを読み込む。
+"""
+
+import io
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+META_PREFIX = '#'
+
+# メタ行の種類と列名
+META_COLUMNS = {
+    'SEQ': ['TimeMs', 'Enqueued', 'Dropped', 'Written'],
+    'FRAME': ['TimeMs', 'FrameCount', 'ThreadId'],
+    'MEM': ['TimeMs', 'HeapBytes', 'GcCount'],
+}
+
+INDEX_SUFFIX = '.idx.npz'
+INDEX_VERSION = 3
+DEFAULT_BLOCK_BYTES = 4 * 1024 * 1024
+# イベント行を一括解析する単位（作業配列はこのサイズに比例）
+DEFAULT_PARSE_BLOCK_BYTES = 64 * 1024 * 1024
+EVENT_NAME_COLUMN = 'MethodName'
+EVENT_TEXT_COLUMNS = ('Timestamp',)
+# 名前部分のカンマ・'#' を read_csv 中だけ置き換える制御文字（MethodNameには現れない）
+NAME_COMMA_PLACEHOLDER = 0x1F
+NAME_HASH_PLACEHOLDER = 0x1E
+CLOCK_SAMPLES_PER_BLOCK = 64
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+META_LINE_PATTERN = re.compile(rb'^#[^\n]*', re.MULTILINE)
+
+
+def parse_meta_line(line):
+    """
+    メタ行1行を (種類, 値リスト) に変換（不明・不正な行は None）
+    後から列が追加された種類は、古い短い行を NaN で補完する
+    """
+    fields = line.decode('utf-8', errors='ignore').strip().split(',')
+    kind = fields[0][1:]
+    columns = META_COLUMNS.get(kind)
+    if columns is None or not 2 <= len(fields) <= len(columns) + 1:
+        return None
+    try:
+        values = [float(v) for v in fields[1:]]
+    except ValueError:
+        return None
+    return kind, values + [np.nan] * (len(columns) - len(values))
+
+
+def read_meta_rows(csv_file):
+    """トレースからメタ行を種類別に抽出してDataFrameで返す"""
+    rows = {kind: [] for kind in META_COLUMNS}
+
+    with open(csv_file, 'rb') as f:
+        for line in f:
+            if not line.startswith(b'#'):
+                continue
+            parsed = parse_meta_line(line)
+            if parsed is not None:
+                rows[parsed[0]].append(parsed[1])
+
+    return {kind: pd.DataFrame(values, columns=META_COLUMNS[kind]) for kind, values in rows.items()}
+
+
+def sequence_windows(seq_df):
+    """
+    #SEQ行の累積カウンターを差分して区間ごとのロス率を計算
+    カウンターが減少した区間（Writer再起動など）はリセットとして扱い、
+    リセット後の値をそのまま区間の増分とみなす
+    """
+    columns = ['WindowStartMs', 'WindowEndMs', 'Enqueued', 'Dropped', 'Written', 'LossRate']
+    if seq_df is None or len(seq_df) < 2:
+        return pd.DataFrame(columns=columns)
+
+    seq_df = seq_df.sort_values('TimeMs', kind='stable').reset_index(drop=True)
+    counters = seq_df[['Enqueued', 'Dropped', 'Written']].to_numpy(dtype=np.float64)
+    deltas = np.diff(counters, axis=0)
+    resets = (deltas < 0).any(axis=1)
+    deltas[resets] = counters[1:][resets]
+
+    enqueued, dropped, written = deltas[:, 0], deltas[:, 1], deltas[:, 2]
+    attempted = enqueued + dropped
+    loss_rate = np.divide(dropped, attempted, out=np.zeros_like(dropped), where=attempted > 0)
+
+    time_ms = seq_df['TimeMs'].to_numpy()
+    return pd.DataFrame({
+        'WindowStartMs': time_ms[:-1],
+        'WindowEndMs': time_ms[1:],
+        'Enqueued': enqueued,
+        'Dropped': dropped,
+        'Written': written,
+        'LossRate': loss_rate,
+    })
+
+
+def assign_windows(event_ms, windows):
+    """各イベントが属するロス区間のインデックスを返す（区間外は -1）"""
+    event_ms = np.asarray(event_ms, dtype=np.float64)
+    if len(windows) == 0:
+        return np.full(len(event_ms), -1, dtype=np.int64)
+
+    starts = windows['WindowStartMs'].to_numpy()
+    ends = windows['WindowEndMs'].to_numpy()
+    idx = np.searchsorted(starts, event_ms, side='right') - 1
+    valid = (idx >= 0) & (event_ms <= ends[np.clip(idx, 0, len(ends) - 1)])
+    return np.where(valid, idx, -1)
+
+
+def fit_clock_offset(end_ms, timestamps):
+    """
+    Stopwatchミリ秒 → 壁時計ミリ秒（naive、エポック基準）のオフセットを推定
+    Writerは必ずイベント終了後に行を書くため、Timestamp - EndTime の
+    下側分位点がWriter遅延を除いたオフセットの推定値になる
+    """
+    end_ms = np.asarray(end_ms, dtype=np.float64)
+    wall_ms = pd.to_datetime(pd.Series(timestamps), format=TIMESTAMP_FORMAT, errors='coerce')
+    valid = wall_ms.notna().to_numpy() & np.isfinite(end_ms)
+    if not valid.any():
+        return None
+
+    wall_ms = wall_ms[valid].astype('int64').to_numpy() / 1e6
+    lag = wall_ms - end_ms[valid]
+    return float(np.quantile(lag, 0.01))
+
+
+def anchor_datetime(tick_ms, clock_offset_ms):
+    """StartTime等のStopwatchミリ秒を壁時計のdatetimeに変換"""
+    return pd.to_datetime(np.asarray(tick_ms, dtype=np.float64) + clock_offset_ms, unit='ms')
+
+
+def split_fields_from_right(data, right_fields):
+    """
+    CSV本体（ヘッダー無し）のバイト列を、各行の右から right_fields 個のフィールドとそれより左に分割
+    左側はカンマを含んでよい（メソッド名など）。行ごとのPythonループを使わずNumPyで一括処理する
+    戻り値: (左側の文字列リスト, 右側だけを連結したCSVバイト列, 採用した行の行番号)
+    カンマが足りない行は除外する（空行以外の除外数は 行数 - len(採用行) で求まる）
+    """
+    if not data:
+        return [], b'', np.zeros(0, dtype=np.int64)
+    if not data.endswith(b'\n'):
+        data += b'\n'
+    buf = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == ord('\n'))
+    commas = np.flatnonzero(buf == ord(','))
+    line_starts = np.concatenate([[0], newlines[:-1] + 1])
+
+    # 行末までのカンマ数 - 行頭までのカンマ数 = 行内のカンマ数
+    commas_to_end = np.searchsorted(commas, newlines)
+    commas_in_line = commas_to_end - np.searchsorted(commas, line_starts)
+    valid = commas_in_line >= right_fields
+    split = commas[commas_to_end[valid] - right_fields]
+
+    # 右側: 区切りカンマの次 ～ 改行（改行を含む）
+    marks = np.zeros(len(buf) + 1, dtype=np.int8)
+    marks[split + 1] += 1
+    marks[newlines[valid] + 1] -= 1
+    right = buf[np.cumsum(marks[:-1], dtype=np.int8) > 0].tobytes()
+
+    # 左側: 行頭 ～ 区切りカンマ（区切りカンマを改行に置き換えて行を分ける）
+    marks[:] = 0
+    marks[line_starts[valid]] += 1
+    marks[split + 1] -= 1
+    left_buf = buf.copy()
+    left_buf[split] = ord('\n')
+    left = left_buf[np.cumsum(marks[:-1], dtype=np.int8) > 0].tobytes().decode('utf-8', errors='replace').split('\n')[:-1]
+    return left, right, np.flatnonzero(valid)
+
+
+def read_header(csv_file):
+    """先頭行の列名リスト"""
+    with open(csv_file, 'rb') as f:
+        return f.readline().decode('utf-8-sig').strip().split(',')
+
+
+def is_event_header(header):
+    """MPSCLoggerのイベント行形式か（MethodName が先頭で、残りは右から切り出せる固定列）"""
+    return len(header) > 1 and header[0] == EVENT_NAME_COLUMN and 'StartTime' in header
+
+
+def parse_event_bytes(data, header):
+    """
+    MPSCイベント行のバイト列（メタ行・空行を含んでよい、ヘッダーは含まない）を一括解析
+    右から len(header)-1 個のフィールドを固定列とし、それより左をすべて MethodName とする
+    名前部分のカンマと '#' だけを一時的な制御文字に置き換えてから read_csv（Cエンジン）で1パスで読むため、
+    名前のカンマ・バッククォートで列がずれず、行ごとのPython処理も発生しない
+    フィールド不足・数値不正の行は解析全体を止めずに除外して数える
+    戻り値: (DataFrame, 不正行数)
+    """
+    right_fields = len(header) - 1
+    if not data:
+        return pd.DataFrame(columns=header), 0
+    if not data.endswith(b'\n'):
+        data += b'\n'
+    buf = np.frombuffer(data, dtype=np.uint8).copy()
+    newlines = np.flatnonzero(buf == ord('\n'))
+    line_starts = np.concatenate([[0], newlines[:-1] + 1])
+    line_lengths = newlines - line_starts
+    commas = np.flatnonzero(buf == ord(','))
+    commas_to_end = np.searchsorted(commas, newlines)
+    commas_in_line = commas_to_end - np.concatenate([[0], commas_to_end[:-1]])
+
+    # メタ行・空行（\r のみを含む）は read_csv がスキップするので不正行に数えない
+    is_meta = (line_lengths > 0) & (buf[np.minimum(line_starts, len(buf) - 1)] == ord(META_PREFIX))
+    is_blank = (line_lengths == 0) | ((line_lengths == 1) & (buf[line_starts] == ord('\r')))
+    bad_lines = ~is_meta & ~is_blank & (commas_in_line < right_fields)
+    valid = ~is_meta & ~is_blank & ~bad_lines
+
+    # 名前部分（右から right_fields 個目のカンマより左）のカンマ・'#' を退避
+    line_of_comma = np.repeat(np.arange(len(newlines)), commas_in_line)
+    split = np.full(len(newlines), -1, dtype=np.int64)
+    split[valid] = commas[commas_to_end[valid] - right_fields]
+    name_commas = commas[commas < split[line_of_comma]]
+    hashes = np.flatnonzero(buf == ord(META_PREFIX))
+    line_of_hash = np.searchsorted(newlines, hashes)
+    name_hashes = hashes[hashes < split[line_of_hash]]
+    buf[name_commas] = NAME_COMMA_PLACEHOLDER
+    buf[name_hashes] = NAME_HASH_PLACEHOLDER
+    # フィールド不足の行はコメント行にして読み飛ばす
+    buf[line_starts[bad_lines]] = ord(META_PREFIX)
+
+    text_columns = [column for column in header if column == EVENT_NAME_COLUMN or column in EVENT_TEXT_COLUMNS]
+    df = pd.read_csv(io.BytesIO(buf.tobytes()), header=None, names=header, comment=META_PREFIX,
+                     dtype={column: str for column in text_columns})
+    for column in header:
+        if column not in text_columns and df[column].dtype == object:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+
+    # 退避した文字を名前に戻す（該当行のみ）
+    escaped_lines = np.union1d(np.searchsorted(newlines, name_commas), line_of_hash[hashes < split[line_of_hash]])
+    if len(escaped_lines) > 0:
+        rows = np.searchsorted(np.flatnonzero(valid), escaped_lines)
+        names = df[EVENT_NAME_COLUMN].to_numpy()
+        names[rows] = [name.replace(chr(NAME_COMMA_PLACEHOLDER), ',').replace(chr(NAME_HASH_PLACEHOLDER), META_PREFIX)
+                       for name in names[rows]]
+        df[EVENT_NAME_COLUMN] = names
+
+    malformed = int(bad_lines.sum())
+    required = [column for column in ('Duration(ms)', 'StartTime', 'EndTime') if column in df.columns]
+    bad = df[required].isna().any(axis=1).to_numpy()
+    if bad.any():
+        malformed += int(bad.sum())
+        df = df[~bad].reset_index(drop=True)
+    return df, malformed
+
+
+def read_events(csv_file, block_bytes=DEFAULT_PARSE_BLOCK_BYTES):
+    """
+    MPSCトレース全体を行境界で区切ったブロック単位に parse_event_bytes で読み込む
+    戻り値: (DataFrame, 不正行数)
+    """
+    frames, malformed = [], 0
+    with open(csv_file, 'rb') as f:
+        header = f.readline().decode('utf-8-sig').strip().split(',')
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            if not block.endswith(b'\n'):
+                block += f.readline()
+            df, bad = parse_event_bytes(block, header)
+            frames.append(df)
+            malformed += bad
+    if not frames:
+        return pd.DataFrame(columns=header), malformed
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0], malformed
+
+
+def index_path(csv_file):
+    return csv_file + INDEX_SUFFIX
+
+
+def build_index(csv_file, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    トレースを1パス走査してブロックインデックスを作成
+    ブロックは行境界で区切り、各ブロックのStartTime最小・最大値とバイト範囲を記録する
+    メタ行（#SEQ/#FRAME）と時計オフセット推定用のサンプルも同じパスで収集する
+    """
+    print(f"🗂️ インデックス作成中: {csv_file}")
+
+    offsets, lengths, min_start, max_start, row_counts = [], [], [], [], []
+    meta_rows = {kind: [] for kind in META_COLUMNS}
+    clock_end, clock_ts = [], []
+    malformed = 0
+
+    with open(csv_file, 'rb') as f:
+        header_line = f.readline()
+        header = header_line.decode('utf-8-sig').strip().split(',')
+
+        offset = len(header_line)
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            if not block.endswith(b'\n'):
+                block += f.readline()
+
+            for match in META_LINE_PATTERN.finditer(block):
+                parsed = parse_meta_line(match.group())
+                if parsed is not None:
+                    meta_rows[parsed[0]].append(parsed[1])
+
+            events, bad = parse_event_bytes(block, header)
+            malformed += bad
+            starts = events['StartTime'].to_numpy(dtype=np.float64)
+            sample = events.head(CLOCK_SAMPLES_PER_BLOCK)
+            if 'Timestamp' in sample.columns:
+                sample = sample.dropna(subset=['Timestamp'])
+                clock_end.extend(sample['EndTime'].tolist())
+                clock_ts.extend(sample['Timestamp'].tolist())
+
+            offsets.append(offset)
+            lengths.append(len(block))
+            min_start.append(starts.min() if len(starts) else np.inf)
+            max_start.append(starts.max() if len(starts) else -np.inf)
+            row_counts.append(len(starts))
+            offset += len(block)
+
+    stat = os.stat(csv_file)
+    clock_offset = fit_clock_offset(clock_end, clock_ts)
+    index = {
+        'version': INDEX_VERSION,
+        'file_size': stat.st_size,
+        'file_mtime': stat.st_mtime,
+        'header': header,
+        'blocks': pd.DataFrame({
+            'Offset': np.asarray(offsets, dtype=np.int64),
+            'Length': np.asarray(lengths, dtype=np.int64),
+            'MinStartMs': np.asarray(min_start, dtype=np.float64),
+            'MaxStartMs': np.asarray(max_start, dtype=np.float64),
+            'Rows': np.asarray(row_counts, dtype=np.int64),
+        }),
+        'meta': {kind: pd.DataFrame(values, columns=META_COLUMNS[kind]) for kind, values in meta_rows.items()},
+        'clock_offset_ms': np.nan if clock_offset is None else clock_offset,
+    }
+    print(f"✅ インデックス作成完了: {len(offsets)} ブロック, {sum(row_counts)} イベント"
+          + (f", 不正行 {malformed}" if malformed else ""))
+    return index
+
+
+def save_index(csv_file, index):
+    arrays = {
+        'version': np.asarray(index['version']),
+        'file_size': np.asarray(index['file_size']),
+        'file_mtime': np.asarray(index['file_mtime']),
+        'header': np.asarray(index['header']),
+        'clock_offset_ms': np.asarray(index['clock_offset_ms']),
+    }
+    for column in index['blocks'].columns:
+        arrays[f'blocks_{column}'] = index['blocks'][column].to_numpy()
+    for kind, df in index['meta'].items():
+        arrays[f'meta_{kind}'] = df.to_numpy(dtype=np.float64).reshape(-1, len(META_COLUMNS[kind]))
+    np.savez_compressed(index_path(csv_file), **arrays)
+
+
+def load_index(csv_file, rebuild=False):
+    """インデックスを読み込む（存在しない・トレースが更新された場合は再作成）"""
+    path = index_path(csv_file)
+    stat = os.stat(csv_file)
+    if not rebuild and os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                if (int(data['version']) == INDEX_VERSION and
+                        int(data['file_size']) == stat.st_size and
+                        float(data['file_mtime']) == stat.st_mtime):
+                    return {
+                        'version': INDEX_VERSION,
+                        'file_size': stat.st_size,
+                        'file_mtime': stat.st_mtime,
+                        'header': [str(h) for h in data['header']],
+                        'blocks': pd.DataFrame({
+                            column: data[f'blocks_{column}']
+                            for column in ['Offset', 'Length', 'MinStartMs', 'MaxStartMs', 'Rows']
+                        }),
+                        'meta': {
+                            kind: pd.DataFrame(data[f'meta_{kind}'], columns=columns)
+                            for kind, columns in META_COLUMNS.items()
+                        },
+                        'clock_offset_ms': float(data['clock_offset_ms']),
+                    }
+        except Exception as e:
+            print(f"⚠️ インデックス読み込み失敗、再作成します: {e}")
+
+    index = build_index(csv_file)
+    try:
+        save_index(csv_file, index)
+    except OSError as e:
+        print(f"⚠️ インデックス保存失敗: {e}")
+    return index
+
+
+def frames_to_time_range(frame_markers, first_frame, last_frame):
+    """#FRAME行を使ってフレーム範囲 [first, last] を StartTime の範囲に変換"""
+    if frame_markers is None or len(frame_markers) == 0:
+        raise ValueError("#FRAME行がないトレースではフレーム範囲を指定できません")
+
+    markers = frame_markers.sort_values('TimeMs', kind='stable')
+    frames = markers['FrameCount'].to_numpy()
+    times = markers['TimeMs'].to_numpy()
+    selected = (frames >= first_frame) & (frames <= last_frame)
+    if not selected.any():
+        raise ValueError(f"フレーム {first_frame}～{last_frame} はトレースに含まれていません")
+
+    from_ms = times[selected][0]
+    after = times[frames > last_frame]
+    to_ms = after[0] if len(after) > 0 else np.inf
+    return from_ms, to_ms
+
+
+def read_time_range(csv_file, index, from_ms=-np.inf, to_ms=np.inf):
+    """
+    StartTimeが [from_ms, to_ms) のイベントだけを該当ブロックから読み込む
+    戻り値: (DataFrame, 不正行数)
+    """
+    blocks = index['blocks']
+    hit = blocks[(blocks['MaxStartMs'] >= from_ms) & (blocks['MinStartMs'] < to_ms)]
+    print(f"📦 読み込みブロック: {len(hit)} / {len(blocks)} "
+          f"({hit['Length'].sum() / 1024 / 1024:.1f} MB / {blocks['Length'].sum() / 1024 / 1024:.1f} MB)")
+
+    chunks = []
+    with open(csv_file, 'rb') as f:
+        for offset, length in zip(hit['Offset'], hit['Length']):
+            f.seek(int(offset))
+            chunks.append(f.read(int(length)))
+
+    df, malformed = parse_event_bytes(b''.join(chunks), index['header'])
+    return df[(df['StartTime'] >= from_ms) & (df['StartTime'] < to_ms)].reset_index(drop=True), malformed
+
+
+def iter_time_range(csv_file, index, from_ms=-np.inf, to_ms=np.inf, parse_bytes=DEFAULT_PARSE_BLOCK_BYTES):
+    """
+    StartTimeが [from_ms, to_ms) のイベントを、インデックスのブロックを parse_bytes 単位にまとめて順に返す
+    （トレース全体を保持せずに集計するステージ用。各値は (DataFrame, 不正行数)）
+    """
+    blocks = index['blocks']
+    blocks = blocks[(blocks['MaxStartMs'] >= from_ms) & (blocks['MinStartMs'] < to_ms) & (blocks['Rows'] > 0)]
+
+    def parse(chunks):
+        df, malformed = parse_event_bytes(b''.join(chunks), index['header'])
+        return df[(df['StartTime'] >= from_ms) & (df['StartTime'] < to_ms)].reset_index(drop=True), malformed
+
+    chunks, chunk_bytes = [], 0
+    with open(csv_file, 'rb') as f:
+        for offset, length in zip(blocks['Offset'], blocks['Length']):
+            f.seek(int(offset))
+            chunks.append(f.read(int(length)))
+            chunk_bytes += int(length)
+            if chunk_bytes >= parse_bytes:
+                yield parse(chunks)
+                chunks, chunk_bytes = [], 0
+    if chunks:
+        yield parse(chunks)
+
+
+def assign_frames(start_ms, frame_markers):
+    """#FRAME行を境界として各イベントのフレーム番号を返す（最初のマーカー以前は直前フレーム扱い）"""
+    markers = frame_markers.sort_values('TimeMs', kind='stable')
+    times = markers['TimeMs'].to_numpy()
+    frames = markers['FrameCount'].to_numpy().astype(np.int64)
+    idx = np.searchsorted(times, np.asarray(start_ms, dtype=np.float64), side='right') - 1
+    return np.where(idx >= 0, frames[np.clip(idx, 0, None)], frames[0] - 1)
+
+
+def align_memory_to_frames(frame_markers, memory):
+    """
+    #MEM サンプルを as-of 結合（各時刻以前の最新サンプル）でフレームに揃える
+    フレーム k のGC回数 = 次のフレーム境界時点の累積GC回数 - フレーム k 開始時点の累積GC回数
+    （#MEM はフレーム境界と同じ時刻に記録されるため、境界ちょうどのサンプルを含めて結合する）
+    戻り値: FrameCount, StartMs, EndMs, MeasuredFrameMs, HeapMB, GcCollections（最後のフレームは EndMs が NaN）
+    """
+    columns = ['FrameCount', 'StartMs', 'EndMs', 'MeasuredFrameMs', 'HeapMB', 'GcCollections']
+    if frame_markers is None or len(frame_markers) == 0 or memory is None or len(memory) == 0:
+        return pd.DataFrame(columns=columns)
+
+    markers = frame_markers.sort_values('TimeMs', kind='stable').drop_duplicates('FrameCount')
+    frames = pd.DataFrame({
+        'FrameCount': markers['FrameCount'].to_numpy().astype(np.int64),
+        'StartMs': markers['TimeMs'].to_numpy(dtype=np.float64),
+    })
+    frames['EndMs'] = frames['StartMs'].shift(-1)
+    frames['MeasuredFrameMs'] = frames['EndMs'] - frames['StartMs']
+
+    samples = memory.sort_values('TimeMs', kind='stable')[['TimeMs', 'HeapBytes', 'GcCount']]
+    at_start = pd.merge_asof(frames[['StartMs']], samples, left_on='StartMs', right_on='TimeMs', direction='backward')
+    at_end = pd.merge_asof(frames[['EndMs']].fillna(np.inf), samples, left_on='EndMs', right_on='TimeMs', direction='backward')
+
+    frames['HeapMB'] = at_end['HeapBytes'].to_numpy() / (1024 * 1024)
+    # カウンターが減少した場合（Writer再起動）は増分なしとみなす
+    gc_delta = at_end['GcCount'].to_numpy() - at_start['GcCount'].to_numpy()
+    frames['GcCollections'] = np.where(np.isfinite(gc_delta), np.clip(gc_delta, 0, None), 0).astype(np.int64)
+    frames.loc[frames['EndMs'].isna(), 'GcCollections'] = 0
+    return frames[columns]
+
+
+def allocation_rate(memory, window_ms=1000.0):
+    """
+    #MEM サンプル間のヒープ増分から区間ごとの割り当て速度を推定
+    GCをまたぐサンプル間隔（GC回数が増えた・ヒープが減った）は増分が不明なため除外し、
+    残りの計測時間あたりの増分を割り当て速度とする
+    """
+    columns = ['WindowStartMs', 'WindowEndMs', 'AllocatedMB', 'MeasuredMs', 'AllocMBPerSec', 'GcCollections', 'HeapMB']
+    if memory is None or len(memory) < 2:
+        return pd.DataFrame(columns=columns)
+
+    samples = memory.sort_values('TimeMs', kind='stable')
+    time_ms = samples['TimeMs'].to_numpy(dtype=np.float64)
+    heap_mb = samples['HeapBytes'].to_numpy(dtype=np.float64) / (1024 * 1024)
+    gc_delta = np.diff(samples['GcCount'].to_numpy(dtype=np.float64))
+    heap_delta = np.diff(heap_mb)
+    interval = np.diff(time_ms)
+    clean = (gc_delta == 0) & (heap_delta >= 0)
+
+    window = ((time_ms[1:] - time_ms[0]) // window_ms).astype(np.int64)
+    n_windows = window[-1] + 1
+    allocated = np.bincount(window, weights=np.where(clean, heap_delta, 0.0), minlength=n_windows)
+    measured = np.bincount(window, weights=np.where(clean, interval, 0.0), minlength=n_windows)
+    collections = np.bincount(window, weights=np.clip(gc_delta, 0, None), minlength=n_windows)
+    last_heap = np.full(n_windows, np.nan)
+    last_heap[window] = heap_mb[1:]
+
+    starts = time_ms[0] + np.arange(n_windows) * window_ms
+    table = pd.DataFrame({
+        'WindowStartMs': starts,
+        'WindowEndMs': starts + window_ms,
+        'AllocatedMB': allocated,
+        'MeasuredMs': measured,
+        'AllocMBPerSec': np.divide(allocated * 1000.0, measured, out=np.full(n_windows, np.nan), where=measured > 0),
+        'GcCollections': collections.astype(np.int64),
+        'HeapMB': last_heap,
+    })
+    # サンプルのない区間（記録停止中など）は除外
+    return table[np.bincount(window, minlength=n_windows) > 0].reset_index(drop=True)
+
+
+# スレッドレーン（メイン/シミュレーションは並行に動くため合算しない）
+LANE_RENDER = 'Render'
+LANE_SIMULATION = 'Simulation'
+LANE_WORKER = 'Worker'
+
+# シミュレーションスレッドの1ティックを表すメソッド（SimulationPatchProviderが記録）
+SIM_STEP_SUFFIX = 'SimulationManager.SimulationStep'
+SIM_MANAGER_STEP_SUFFIX = '.SimulationStepImpl'
+
+
+def classify_lanes(method_names, thread_ids=None, frame_markers=None):
+    """
+    各イベントのスレッドレーンを判定
+    ThreadId列がある場合: #FRAME行のThreadId → Render、SimulationStepを記録したスレッド → Simulation、
+    それ以外 → Worker。ThreadId列がない旧トレースはメソッド名（SimulationStep系）から推定する
+    """
+    names = pd.Series(method_names).astype(str)
+    is_sim_name = names.str.contains('SimulationStep', regex=False).to_numpy()
+
+    if thread_ids is None or pd.isna(thread_ids).all():
+        return np.where(is_sim_name, LANE_SIMULATION, LANE_RENDER)
+
+    tids = pd.Series(thread_ids).to_numpy(dtype=np.float64)
+    sim_ids = np.unique(tids[names.str.endswith(SIM_STEP_SUFFIX).to_numpy() & ~np.isnan(tids)])
+
+    main_ids = np.array([])
+    if frame_markers is not None and 'ThreadId' in frame_markers.columns:
+        main_ids = frame_markers['ThreadId'].dropna().unique()
+    if len(main_ids) == 0:
+        # #FRAME行にThreadIdがない場合はシミュレーション以外で最多のスレッドをメインとみなす
+        other = pd.Series(tids[~np.isin(tids, sim_ids)]).dropna()
+        main_ids = other.mode().to_numpy()[:1] if len(other) > 0 else main_ids
+
+    lanes = np.full(len(tids), LANE_WORKER, dtype=object)
+    lanes[np.isin(tids, sim_ids)] = LANE_SIMULATION
+    lanes[np.isin(tids, main_ids)] = LANE_RENDER
+    # ThreadIdが欠けた行（旧フォーマット混在）は名前で推定
+    missing = np.isnan(tids)
+    lanes[missing] = np.where(is_sim_name[missing], LANE_SIMULATION, LANE_RENDER)
+    return lanes
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Propバッチング効果推定ツール
+PropInstance.RenderInstance / Graphics.DrawMesh / MaterialPropertyBlock.Set* の
+フレーム別呼び出し回数と処理時間から「呼び出しごとのコスト」と「バッチ（描画呼び出し）ごとのコスト」を
+最小二乗法で分離し、バッチサイズ別のフレーム時間削減量を推定する
+
+データ収集（ModTools）:
+    CS1Profiler.Harmony.PatchController.PropRenderCallProfilingEnabled = true;
+    CS1Profiler.Managers.PropBatchingTestManager.SetPropBatching(false);  // → OFFトレース
+    CS1Profiler.Managers.PropBatchingTestManager.SetPropBatching(true);   // → ONトレース（検証用）
+"""
+
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from cs1_profiler_analyzer import CS1ProfilerAnalyzer
+
+PROP_RENDER = 'PropInstance.RenderInstance'
+DRAW_MESH = 'Graphics.DrawMesh'
+MPB_SET = 'MaterialPropertyBlock.Set'
+
+DEFAULT_BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128]
+
+# モデルの説明変数（呼び出しごと / バッチごと / バッチごとのプロパティ設定）
+MODEL_TERMS = ['PropCalls', 'DrawCalls', 'MpbCalls']
+
+
+def outermost_calls(calls):
+    """
+    同じ種別の呼び出しの内側にある呼び出しを除外（スレッド別）
+    パッチは全オーバーロードに当たるため、オーバーロード間の転送（DrawMesh → DrawMesh 等）が二重に記録される
+    """
+    calls = calls.sort_values(['ThreadId', 'Kind', 'StartTime', 'EndTime'], ascending=[True, True, True, False], kind='stable')
+    enclosing_end = calls.groupby(['ThreadId', 'Kind'], sort=False)['EndTime'].transform(lambda end: end.cummax().shift())
+    return calls[~(calls['EndTime'] <= enclosing_end)]
+
+
+def inside_prop_render(calls):
+    """DrawMesh / MaterialPropertyBlock.Set* のうち、同じスレッドの PropInstance.RenderInstance の内側にあるもの"""
+    inside = pd.Series(False, index=calls.index)
+    for _thread, thread_calls in calls.groupby('ThreadId', sort=False):
+        props = thread_calls[thread_calls['Kind'] == 'Prop'].sort_values('StartTime')
+        nested = thread_calls[thread_calls['Kind'] != 'Prop']
+        if props.empty or nested.empty:
+            continue
+        # 外側のみ残した後のRenderInstanceは重ならないため、開始時刻が直前のものだけを調べればよい
+        position = np.searchsorted(props['StartTime'].to_numpy(), nested['StartTime'].to_numpy(), side='right') - 1
+        valid = position >= 0
+        prop_end = np.where(valid, props['EndTime'].to_numpy()[np.maximum(position, 0)], -np.inf)
+        inside[nested.index] = valid & (nested['EndTime'].to_numpy() <= prop_end)
+    return inside
+
+
+def frame_call_table(analyzer):
+    """
+    トレースからフレーム別の呼び出し回数・処理時間テーブルを作成
+    DrawMesh / MaterialPropertyBlock.Set* はProp描画の内側の呼び出しのみを数える（建物・車両など他の描画は除外）
+    """
+    df = analyzer.df
+    if 'FrameCount' not in df.columns:
+        raise ValueError("フレーム番号がありません（#FRAME行を含むMPSCトレースが必要です）")
+    missing = [column for column in ('StartTime', 'EndTime', 'ThreadId') if column not in df.columns]
+    if missing:
+        raise ValueError(f"呼び出しの入れ子を判定できません（{', '.join(missing)} 列がありません）")
+
+    names = df['Description'].astype(str)
+    kind = np.select(
+        [names.str.contains(PROP_RENDER, regex=False),
+         names.str.contains(DRAW_MESH, regex=False),
+         names.str.contains(MPB_SET, regex=False)],
+        ['Prop', 'Draw', 'Mpb'], default='')
+    calls = outermost_calls(df[kind != ''].assign(Kind=kind[kind != '']))
+    calls = calls[(calls['Kind'] == 'Prop') | inside_prop_render(calls)]
+
+    table = calls.pivot_table(index='FrameCount', columns='Kind',
+                              values=['Count', 'TotalDurationPerFrame'], aggfunc='sum', fill_value=0)
+    frames = pd.DataFrame(index=np.unique(df['FrameCount']))
+    for kind_name in ['Prop', 'Draw', 'Mpb']:
+        frames[f'{kind_name}Calls'] = table['Count'][kind_name] if ('Count', kind_name) in table.columns else 0
+        frames[f'{kind_name}Ms'] = table['TotalDurationPerFrame'][kind_name] if ('TotalDurationPerFrame', kind_name) in table.columns else 0
+    frames = frames.fillna(0)
+
+    # 実測フレーム時間（#FRAME間隔）
+    markers = analyzer.meta['FRAME'].sort_values('TimeMs', kind='stable')
+    interval = pd.Series(markers['TimeMs'].diff().shift(-1).to_numpy(),
+                         index=markers['FrameCount'].astype(np.int64).to_numpy())
+    interval = interval[~interval.index.duplicated()]
+    frames['FrameMs'] = interval.reindex(frames.index).to_numpy()
+
+    frames.index.name = 'FrameCount'
+    return frames[frames['PropCalls'] > 0]
+
+
+def fit_cost_model(frames):
+    """
+    PropMs = a*PropCalls + b*DrawCalls + c*MpbCalls + d をフレーム全体で一括最小二乗
+    係数が負になる項は物理的に無意味なため除外して再推定する
+    DrawCallsがPropCallsと比例している（または未計測）場合は呼び出し/バッチコストを分離できない
+    """
+    y = frames['PropMs'].to_numpy(dtype=np.float64)
+    terms = [t for t in MODEL_TERMS if frames[t].to_numpy().any()]
+
+    draws = frames['DrawCalls'].to_numpy(dtype=np.float64)
+    props = frames['PropCalls'].to_numpy(dtype=np.float64)
+    separable = 'DrawCalls' in terms and np.linalg.matrix_rank(np.column_stack([props, draws])) == 2 and \
+        abs(np.corrcoef(props, draws)[0, 1]) < 0.999
+    if not separable and 'DrawCalls' in terms:
+        terms.remove('DrawCalls')
+
+    while True:
+        X = np.column_stack([frames[t].to_numpy(dtype=np.float64) for t in terms] + [np.ones(len(y))])
+        coef, _, _, _ = np.linalg.lstsq(X, y, rcond=None)
+        negative = [i for i, c in enumerate(coef[:-1]) if c < 0]
+        if not negative:
+            break
+        terms.pop(min(negative, key=lambda i: coef[i]))
+
+    residual = y - X @ coef
+    ss_tot = ((y - y.mean()) ** 2).sum()
+    model = {t: 0.0 for t in MODEL_TERMS}
+    model.update(dict(zip(terms, coef[:-1])))
+    model['Intercept'] = coef[-1]
+    model['R2'] = 1 - (residual ** 2).sum() / ss_tot if ss_tot > 0 else 0.0
+    model['RMSEMs'] = float(np.sqrt((residual ** 2).mean()))
+    model['Frames'] = len(y)
+    model['Separable'] = separable
+    return model
+
+
+def upper_bound_model(model):
+    """分離できない場合はProp 1個 = 描画呼び出し1回とみなし、呼び出しコスト全体をバッチコストとして扱う（削減量の上限）"""
+    bound = dict(model)
+    bound['DrawCalls'] = model['PropCalls'] + model['DrawCalls']
+    bound['PropCalls'] = 0.0
+    return bound
+
+
+def predict(model, prop_calls, draw_calls, mpb_calls):
+    return (model['PropCalls'] * prop_calls + model['DrawCalls'] * draw_calls +
+            model['MpbCalls'] * mpb_calls + model['Intercept'])
+
+
+def project_batching(frames, model, batch_sizes):
+    """
+    バッチサイズkでDrawMesh・MaterialPropertyBlock設定がk個まとめられた場合のフレーム時間を推定
+    （フレーム×バッチサイズの行列で一括計算）
+    """
+    k = np.asarray(batch_sizes, dtype=np.float64)[None, :]
+    props = frames['PropCalls'].to_numpy(dtype=np.float64)[:, None]
+    draws = frames['DrawCalls'].to_numpy(dtype=np.float64)[:, None]
+    mpbs = frames['MpbCalls'].to_numpy(dtype=np.float64)[:, None]
+    if not model['Separable']:
+        model = upper_bound_model(model)
+        draws = props
+
+    baseline = predict(model, props, draws, mpbs)
+    projected = predict(model, props, np.ceil(draws / k), mpbs / k)
+    savings = baseline - projected
+
+    frame_ms = frames['FrameMs'].to_numpy(dtype=np.float64)[:, None]
+    projected_fps = 1000.0 / np.clip(frame_ms - savings, 1e-3, None)
+
+    return pd.DataFrame({
+        'BatchSize': batch_sizes,
+        'ProjectedPropMs': projected.mean(axis=0),
+        'SavingsMsPerFrame': savings.mean(axis=0),
+        'SavingsPercentOfProps': savings.mean(axis=0) / frames['PropMs'].mean() * 100,
+        'SavingsPercentOfFrame': np.nanmean(savings / frame_ms, axis=0) * 100,
+        'CurrentFPS': np.nanmean(1000.0 / frame_ms),
+        'ProjectedFPS': np.nanmean(projected_fps, axis=0),
+    })
+
+
+def validate_with_batching_on(model, frames_off, frames_on):
+    """
+    バッチングOFFで推定したモデルをONトレースで検証
+    DrawMeshが計測されていればONトレースの実際の呼び出し回数で予測し実測と比較、
+    されていなければ実測の1呼び出しあたりコストに一致する実効バッチサイズを逆算する
+    """
+    measured_per_prop = frames_on['PropMs'].sum() / frames_on['PropCalls'].sum()
+    result = {
+        'MeasuredOffMsPerProp': frames_off['PropMs'].sum() / frames_off['PropCalls'].sum(),
+        'MeasuredOnMsPerProp': measured_per_prop,
+    }
+
+    if model['Separable'] and frames_on['DrawCalls'].any():
+        predicted = predict(model, frames_on['PropCalls'], frames_on['DrawCalls'], frames_on['MpbCalls'])
+        result['PredictedOnPropMs'] = predicted.mean()
+        result['MeasuredOnPropMs'] = frames_on['PropMs'].mean()
+        result['PredictionErrorPercent'] = (predicted.mean() / frames_on['PropMs'].mean() - 1) * 100
+        result['EffectiveBatchSize'] = (frames_off['DrawCalls'].sum() / frames_off['PropCalls'].sum()) / \
+            (frames_on['DrawCalls'].sum() / frames_on['PropCalls'].sum())
+    else:
+        grid = np.geomspace(1, 1024, 400)
+        props = frames_on['PropCalls'].to_numpy(dtype=np.float64)[:, None]
+        draws = frames_on['DrawCalls'].to_numpy(dtype=np.float64)[:, None]
+        if not model['Separable']:
+            model = upper_bound_model(model)
+            draws = props
+        per_prop = predict(model, props, np.ceil(draws / grid[None, :]),
+                           frames_on['MpbCalls'].to_numpy(dtype=np.float64)[:, None] / grid[None, :]).sum(axis=0) / props.sum()
+        result['EffectiveBatchSize'] = grid[np.argmin(np.abs(per_prop - measured_per_prop))]
+
+    return result
+
+
+def plot_projection(projection, output_dir):
+    plt.figure(figsize=(10, 6))
+    plt.plot(projection['BatchSize'], projection['SavingsMsPerFrame'], marker='o')
+    plt.xscale('log', base=2)
+    plt.xlabel('バッチサイズ')
+    plt.ylabel('推定削減量 (ms/frame)')
+    plt.title('Propバッチングによるフレーム時間削減の推定')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(f'{output_dir}/prop_batching_projection.png', dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def main():
+    default_output = f"prop_batching_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    parser = argparse.ArgumentParser(description='CS1Profiler Prop Batching Savings Estimator')
+    parser.add_argument('csv_file', help='バッチングOFFで記録したMPSCトレース')
+    parser.add_argument('--batching-on', help='SetPropBatching(true)で記録したMPSCトレース（検証用）')
+    parser.add_argument('-o', '--output', default=default_output, help=f'出力ディレクトリ (デフォルト: {default_output})')
+    parser.add_argument('--batch-sizes', default=','.join(map(str, DEFAULT_BATCH_SIZES)),
+                        help='推定するバッチサイズ（カンマ区切り）')
+    args = parser.parse_args()
+
+    batch_sizes = [int(v) for v in args.batch_sizes.split(',')]
+    os.makedirs(args.output, exist_ok=True)
+
+    frames_off = frame_call_table(CS1ProfilerAnalyzer(args.csv_file))
+    if len(frames_off) == 0:
+        print(f"❌ {PROP_RENDER} のイベントがありません（PropRenderCallProfilingEnabled を有効にして記録してください）")
+        return
+
+    frames_on = None
+    if args.batching_on:
+        frames_on = frame_call_table(CS1ProfilerAnalyzer(args.batching_on))
+        if len(frames_on) == 0:
+            frames_on = None
+
+    model = fit_cost_model(frames_off)
+    model['Pooled'] = False
+    if not model['Separable'] and frames_on is not None:
+        # OFFトレースだけではDrawMesh回数がProp数と比例するため、ONトレースと合わせて推定
+        pooled = fit_cost_model(pd.concat([frames_off, frames_on]))
+        if pooled['Separable']:
+            model = pooled
+            model['Pooled'] = True
+
+    projection = project_batching(frames_off, model, batch_sizes)
+    validation = None
+    if frames_on is not None:
+        validation = validate_with_batching_on(model, frames_off, frames_on)
+
+    frames_off.to_csv(f'{args.output}/prop_frame_calls.csv', encoding='utf-8-sig')
+    projection.to_csv(f'{args.output}/prop_batching_projection.csv', index=False, encoding='utf-8-sig')
+    plot_projection(projection, args.output)
+
+    with open(f'{args.output}/prop_batching_report.txt', 'w', encoding='utf-8') as f:
+        f.write("Propバッチング効果推定レポート\n")
+        f.write("=" * 50 + "\n")
+        f.write(f"解析日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"データファイル: {args.csv_file}\n")
+        f.write(f"解析フレーム数: {model['Frames']}\n\n")
+
+        f.write("📐 コストモデル (PropMs = a*PropCalls + b*DrawCalls + c*MpbCalls + d)\n")
+        f.write("-" * 30 + "\n")
+        f.write(f"呼び出しごと a: {model['PropCalls'] * 1000:.3f} µs/call\n")
+        f.write(f"バッチごと b: {model['DrawCalls'] * 1000:.3f} µs/draw\n")
+        f.write(f"プロパティ設定 c: {model['MpbCalls'] * 1000:.3f} µs/set\n")
+        f.write(f"固定 d: {model['Intercept']:.3f} ms/frame\n")
+        f.write(f"R²: {model['R2']:.3f}, RMSE: {model['RMSEMs']:.3f} ms\n")
+        if model['Pooled']:
+            f.write("ℹ️ OFFトレース単独では分離できないため、OFF+ONトレースを合わせて推定しました\n")
+        if not model['Separable']:
+            f.write("⚠️ Graphics.DrawMesh の呼び出し回数がProp数と比例（または未計測）のため、\n")
+            f.write("   呼び出しコストとバッチコストを分離できません。削減量は上限の目安です。\n")
+        f.write("\n")
+
+        f.write("📉 バッチサイズ別の推定削減量\n")
+        f.write("-" * 30 + "\n")
+        for _, row in projection.iterrows():
+            f.write(f"k={int(row['BatchSize']):4d}: {row['SavingsMsPerFrame']:.2f} ms/frame "
+                    f"({row['SavingsPercentOfFrame']:.1f}% of frame), FPS {row['CurrentFPS']:.1f} → {row['ProjectedFPS']:.1f}\n")
+        f.write("\n")
+
+        if validation is not None:
+            f.write("✅ SetPropBatching(true) トレースによる検証\n")
+            f.write("-" * 30 + "\n")
+            f.write(f"1Propあたり実測: OFF {validation['MeasuredOffMsPerProp'] * 1000:.3f} µs, "
+                    f"ON {validation['MeasuredOnMsPerProp'] * 1000:.3f} µs\n")
+            if 'PredictionErrorPercent' in validation:
+                f.write(f"ONトレースの予測 {validation['PredictedOnPropMs']:.2f} ms/frame vs 実測 "
+                        f"{validation['MeasuredOnPropMs']:.2f} ms/frame (誤差 {validation['PredictionErrorPercent']:+.1f}%)\n")
+            f.write(f"実効バッチサイズ: {validation['EffectiveBatchSize']:.1f}\n")
+
+    print(f"\n🎯 コストモデル: {model['PropCalls'] * 1000:.3f} µs/call + {model['DrawCalls'] * 1000:.3f} µs/draw "
+          f"(R² {model['R2']:.3f})")
+    best = projection.iloc[-1]
+    print(f"📉 k={best['BatchSize']:.0f}: {best['SavingsMsPerFrame']:.2f} ms/frame 削減見込み")
+    if validation is not None:
+        print(f"✅ 実効バッチサイズ（ONトレース）: {validation['EffectiveBatchSize']:.1f}")
+    print(f"\n✅ 解析完了! 結果: {args.output}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+メソッド別の重み付きリザーバーサンプリング
+正確な呼び出し数・合計・最大値と並べて、メソッドごとに固定数の処理時間サンプルを保持する
+メモリはトレース長に関係なく メソッド数 × リザーバーサイズ で上限が決まる
+
+重み付きは Efraimidis-Spirakis（A-Res）: 各イベントに log(u)/weight のキーを付け、メソッドごとにキー上位 k 件を残す
+（Count列でまとめられた行やロス補正の重みをそのまま扱える。重みが全て1なら一様なリザーバーと同じ）
+チャンク単位で「チャンク内の上位k件」と「既存のk件」を統合するため、行ごとのPythonループは発生しない
+メソッドごとの最小キーを保持し、それを超えるイベントだけを候補にする（サンプル数が増えるほど候補は減る）
+
+リザーバーが満杯になる前（イベント数 <= k）は全イベントを保持しているため、分位点・ヒストグラムはサンプルの重みで計算する
+（Modの1/Nサンプリングのように行ごとに重みが違うと、重みなしの分位点は偏る）
+分位点の信頼区間は順序統計量の二項近似: q ± z·sqrt(q(1-q)/n_eff) の分位点を下限・上限とする
+（n_eff は満杯ならリザーバーサイズ、満杯前は重みの有効サンプル数 (Σw)²/Σw²）
+"""
+
+import numpy as np
+
+DEFAULT_RESERVOIR_SIZE = 512
+# メソッドあたりの候補がこの件数未満なら、最小キーの入れ替えで統合する（定常状態の大半）
+SPARSE_MERGE_ROUNDS = 16
+# 分位点の信頼区間（95%）の z 値
+CONFIDENCE_Z = 1.96
+
+
+class MethodReservoir:
+    """メソッドID（0始まりの整数）ごとの処理時間リザーバーと正確な集計値"""
+
+    def __init__(self, size=DEFAULT_RESERVOIR_SIZE, capacity=1024, seed=0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.full((capacity, size), -np.inf)
+        self.values = np.zeros((capacity, size))
+        self.sample_weights = np.zeros((capacity, size))
+        self.events = np.zeros(capacity, dtype=np.int64)
+        self.weight = np.zeros(capacity)
+        self.total = np.zeros(capacity)
+        self.max = np.full(capacity, -np.inf)
+        self.min_key = np.full(capacity, -np.inf)
+        self.min_slot = np.zeros(capacity, dtype=np.int64)
+
+    @property
+    def capacity(self):
+        return len(self.events)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.values.nbytes + self.sample_weights.nbytes
+
+    def __getstate__(self):
+        # 保存時（ステージキャッシュ）は未使用の確保済み行を落とす（読み込み後は ensure_capacity で再び伸びる）
+        state = self.__dict__.copy()
+        used = int(np.flatnonzero(self.events)[-1]) + 1 if self.events.any() else 0
+        for name in ('keys', 'values', 'sample_weights', 'events', 'weight', 'total', 'max', 'min_key', 'min_slot'):
+            state[name] = state[name][:used]
+        return state
+
+    def ensure_capacity(self, methods):
+        if methods <= self.capacity:
+            return
+        capacity = max(methods, self.capacity * 2)
+        for name, fill in (('keys', -np.inf), ('values', 0.0), ('sample_weights', 0.0), ('events', 0), ('weight', 0.0),
+                           ('total', 0.0), ('max', -np.inf), ('min_key', -np.inf), ('min_slot', 0)):
+            old = getattr(self, name)
+            grown = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def add(self, method_ids, values, weights=None):
+        """イベントのチャンクを追加（method_ids / values / weights は同じ長さの配列）"""
+        method_ids = np.asarray(method_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(method_ids) == 0:
+            return
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.ensure_capacity(int(method_ids.max()) + 1)
+
+        self.events += np.bincount(method_ids, minlength=self.capacity)
+        self.weight += np.bincount(method_ids, weights=weights, minlength=self.capacity)
+        self.total += np.bincount(method_ids, weights=values * weights, minlength=self.capacity)
+        np.maximum.at(self.max, method_ids, values)
+
+        # A-Res のキー（log を取って u^(1/w) のアンダーフローを避ける）。重み0の行は選ばれない
+        with np.errstate(divide='ignore'):
+            keys = np.log(self.rng.random(len(values))) / weights
+
+        # 満杯のリザーバーの最小キーを超えるイベントだけが候補（長いトレースでは大半をここで除外できる）
+        candidate = keys > self.min_key[method_ids]
+        if not candidate.any():
+            return
+        method_ids, values, keys = method_ids[candidate], values[candidate], keys[candidate]
+        weights = weights[candidate]
+
+        # チャンク内でメソッドごとにキー上位 size 件へ絞る
+        order = np.lexsort((-keys, method_ids))
+        sorted_ids = method_ids[order]
+        rank = np.arange(len(order)) - np.searchsorted(sorted_ids, sorted_ids, side='left')
+        keep = rank < self.size
+        selected, rank = order[keep], rank[keep]
+
+        if rank.max() < SPARSE_MERGE_ROUNDS:
+            # 候補が少ない: キー順に1件ずつ、各メソッドの最小キーのスロットと入れ替える
+            for round_rank in range(rank.max() + 1):
+                chosen = selected[rank == round_rank]
+                ids = method_ids[chosen]
+                better = keys[chosen] > self.min_key[ids]
+                chosen, ids = chosen[better], ids[better]
+                self.keys[ids, self.min_slot[ids]] = keys[chosen]
+                self.values[ids, self.min_slot[ids]] = values[chosen]
+                self.sample_weights[ids, self.min_slot[ids]] = weights[chosen]
+                self._update_min(ids)
+            return
+
+        touched, row = np.unique(method_ids[selected], return_inverse=True)
+        chunk_keys = np.full((len(touched), self.size), -np.inf)
+        chunk_values = np.zeros((len(touched), self.size))
+        chunk_weights = np.zeros((len(touched), self.size))
+        chunk_keys[row, rank] = keys[selected]
+        chunk_values[row, rank] = values[selected]
+        chunk_weights[row, rank] = weights[selected]
+
+        # 既存のリザーバーと統合して上位 size 件を残す
+        merged_keys = np.concatenate([self.keys[touched], chunk_keys], axis=1)
+        merged_values = np.concatenate([self.values[touched], chunk_values], axis=1)
+        merged_weights = np.concatenate([self.sample_weights[touched], chunk_weights], axis=1)
+        top = np.argpartition(-merged_keys, self.size - 1, axis=1)[:, :self.size]
+        self.keys[touched] = np.take_along_axis(merged_keys, top, axis=1)
+        self.values[touched] = np.take_along_axis(merged_values, top, axis=1)
+        self.sample_weights[touched] = np.take_along_axis(merged_weights, top, axis=1)
+        self._update_min(touched)
+
+    def _update_min(self, method_ids):
+        slots = self.keys[method_ids].argmin(axis=1)
+        self.min_slot[method_ids] = slots
+        self.min_key[method_ids] = self.keys[method_ids, slots]
+
+    def samples(self, method_id):
+        """メソッドの保持サンプル（重み付きの分布を表す）"""
+        return self.values[method_id][np.isfinite(self.keys[method_id])]
+
+    def _weights(self, method_id):
+        """満杯前は保持サンプルの重み、満杯後（A-Resで重み付きの分布を表す）はNone"""
+        if self.events[method_id] > self.size:
+            return None
+        return self.sample_weights[method_id][np.isfinite(self.keys[method_id])]
+
+    def effective_size(self, method_id):
+        """分位点の信頼区間に使う有効サンプル数"""
+        weights = self._weights(method_id)
+        if weights is None:
+            return float(len(self.samples(method_id)))
+        return float(weights.sum() ** 2 / np.square(weights).sum()) if weights.sum() > 0 else 0.0
+
+    def quantiles(self, method_id, qs):
+        samples = self.samples(method_id)
+        if len(samples) == 0:
+            return [float('nan')] * len(qs)
+        weights = self._weights(method_id)
+        if weights is None:
+            return [float(v) for v in np.quantile(samples, qs)]
+        return [float(v) for v in weighted_quantile(samples, weights, qs)]
+
+    def quantile_intervals(self, method_id, qs, z=CONFIDENCE_Z):
+        """
+        分位点の信頼区間 [(下限, 上限), ...]
+        サンプルが1件以下なら区間は求まらない（NaN）
+        """
+        n_eff = self.effective_size(method_id)
+        if n_eff <= 1:
+            return [(float('nan'), float('nan'))] * len(qs)
+        qs = np.asarray(qs, dtype=np.float64)
+        half = z * np.sqrt(qs * (1.0 - qs) / n_eff)
+        low = self.quantiles(method_id, np.clip(qs - half, 0.0, 1.0))
+        high = self.quantiles(method_id, np.clip(qs + half, 0.0, 1.0))
+        return list(zip(low, high))
+
+    def histogram(self, method_id, edges):
+        """
+        サンプルのヒストグラムを正確な重み合計（呼び出し数）に合わせて拡大した推定値
+        範囲外のサンプル（0.000ms と書かれた呼び出しなど）は両端のビンに入れる
+        """
+        samples = np.clip(self.samples(method_id), edges[0], edges[-1])
+        weights = self._weights(method_id)
+        if weights is not None:
+            counts, _ = np.histogram(samples, bins=edges, weights=weights)
+            return counts
+        counts, _ = np.histogram(samples, bins=edges)
+        return counts * (self.weight[method_id] / len(samples)) if len(samples) > 0 else counts.astype(np.float64)
+
+
+def weighted_quantile(values, weights, qs):
+    """
+    重み付き分位点（重みの累積の中点を線形補間。重みが全て等しければ np.quantile の既定と同じ）
+    """
+    order = np.argsort(values, kind='stable')
+    values, weights = values[order], weights[order]
+    cumulative = np.cumsum(weights)
+    total = cumulative[-1]
+    if len(values) == 1 or total <= 0:
+        return np.full(len(np.atleast_1d(qs)), values[-1] if len(values) else np.nan)
+    # 各サンプルの位置を [0, 1] に正規化（最初のサンプルが0、最後が1）
+    positions = (cumulative - 0.5 * weights - 0.5 * weights[0]) / (total - 0.5 * weights[0] - 0.5 * weights[-1])
+    return np.interp(qs, positions, values)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+解析ステージのメモ化グラフ
+各ステージは 依存ステージ・パラメータ を宣言し、結果を
+「入力ファイルの指紋 + 解析コードの指紋 + ステージ名 + パラメータ + 依存ステージのキー」をキーにディスクへ保存する
+キーは依存ステージの値ではなくキーから計算するため、キャッシュが有効なステージは上流を読み込まずに再利用できる
+（例: --spike-multiplier だけを変えた再実行では、メソッド別集計のキャッシュからメソッド統計以降のみ再計算）
+グラフは出力先に依存しないよう画像のバイト列として保存し、書き出しは呼び出し側で行う
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+
+CACHE_VERSION = 1
+FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+# ステージごとに保持するパラメータ違いのキャッシュ数（古いものから削除）
+MAX_VARIANTS_PER_STAGE = 3
+# キャッシュディレクトリ全体の上限（超えたら更新の古いファイルから削除）
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def file_fingerprint(path, sample_bytes=FINGERPRINT_SAMPLE_BYTES):
+    """
+    入力ファイルの指紋（サイズ・更新時刻・先頭/末尾のハッシュ）
+    数GBのトレースでも全体を読まずに変更を検出する
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1(f'{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(sample_bytes))
+        if stat.st_size > sample_bytes:
+            f.seek(max(stat.st_size - sample_bytes, sample_bytes))
+            digest.update(f.read(sample_bytes))
+    return digest.hexdigest()
+
+
+def source_fingerprint(*paths):
+    """解析コード自体の指紋（ツールを更新したら古いキャッシュを使わない）"""
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class Stage:
+    def __init__(self, name, func, deps, params, cache):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.params = params or {}
+        self.cache = cache
+
+
+class StageGraph:
+    """ステージの登録と、キャッシュを考慮した遅延評価"""
+
+    def __init__(self, cache_dir=None, fingerprint=''):
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+        self.stages = {}
+        self.values = {}
+        self.keys = {}
+        self.reused = []
+        self.computed = []
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def add(self, name, func, deps=(), params=None, cache=True):
+        """
+        ステージを登録
+        func は依存ステージの値を deps の順に受け取る
+        params はキーに含めるパラメータ（JSON化できる値）
+        cache=False のステージ（ファイル出力など）は毎回実行する
+        """
+        self.stages[name] = Stage(name, func, deps, params, cache)
+
+    def key(self, name):
+        if name not in self.keys:
+            stage = self.stages[name]
+            material = [CACHE_VERSION, self.fingerprint, name, stage.params, [self.key(dep) for dep in stage.deps]]
+            self.keys[name] = hashlib.sha1(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+        return self.keys[name]
+
+    def _cache_path(self, name):
+        return os.path.join(self.cache_dir, f'{name}-{self.key(name)[:16]}.pkl')
+
+    def get(self, name):
+        """ステージの値を返す（メモリ → ディスクキャッシュ → 計算 の順）"""
+        if name in self.values:
+            return self.values[name]
+
+        stage = self.stages[name]
+        path = self._cache_path(name) if self.cache_dir and stage.cache else None
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+                os.utime(path)  # 再利用したキャッシュは容量超過時の削除対象から外す
+                self.values[name] = value
+                self.reused.append(name)
+                return value
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                pass  # 壊れたキャッシュは再計算で上書き
+
+        inputs = [self.get(dep) for dep in stage.deps]
+        started = time.perf_counter()
+        value = stage.func(*inputs)
+        self.computed.append((name, time.perf_counter() - started))
+        self.values[name] = value
+        if path:
+            self._save(name, path, value)
+        return value
+
+    def _save(self, name, path, value):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+        # 同じステージの古いパラメータ違いを整理
+        prefix = f'{name}-'
+        variants = [os.path.join(self.cache_dir, entry) for entry in os.listdir(self.cache_dir)
+                    if entry.startswith(prefix) and entry.endswith('.pkl') and len(entry) == len(prefix) + 20]
+        variants.sort(key=os.path.getmtime, reverse=True)
+        for stale in variants[MAX_VARIANTS_PER_STAGE:]:
+            os.remove(stale)
+        self._trim(keep=path)
+
+    def _trim(self, keep):
+        """ディレクトリ全体が MAX_CACHE_BYTES を超えたら古いキャッシュから削除（保存直後のファイルは残す）"""
+        entries = [os.path.join(self.cache_dir, entry) for entry in os.listdir(self.cache_dir) if entry.endswith('.pkl')]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        total = 0
+        for entry in entries:
+            total += os.path.getsize(entry)
+            if total > MAX_CACHE_BYTES and entry != keep:
+                os.remove(entry)
+
+    def summary(self):
+        """再利用・再計算したステージの一覧（表示用）"""
+        computed = ', '.join(f'{name} ({seconds:.1f}s)' for name, seconds in self.computed)
+        return f"♻️ キャッシュ再利用: {', '.join(self.reused) or 'なし'}\n🔄 再計算: {computed or 'なし'}"
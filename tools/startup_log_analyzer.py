@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+"""
+CS1Profiler 起動・ロード時間解析ツール
+ゲームの output_log.txt、またはMODが起動解析中に保存する CS1Profiler_StartupLog_*.csv（全ログ行の経過時間付き）から
+フェーズ（起動イベント間の区間）とMOD別のタイムラインを再構成し、ロード時間の大きいMOD・アセットを順位付けする
+--compare で2回分の起動を比較する
+
+入力:
+    output_log.txt
+        Unityのログには時刻が無いため、[CS1Profiler-Startup] の起動イベント行（経過秒付き）を時刻の基準点にし、
+        その間の行の時刻はファイル内の位置（バイトオフセット）で線形補間する（フェーズ時間は正確、行単位は近似）
+        最初の起動イベント（MOD有効化）より前の行は時刻なし（行数・例外のみ集計）
+    CS1Profiler_StartupLog_*.csv（ElapsedMs,Type,ThreadId,Source,Message）
+        MODが Application.logMessageReceivedThreaded で記録した全ログ行。行ごとの時刻とスタックトレース由来の発行元を持つ
+
+MOD・アセットのロード時間:
+    各ログ行から次のログ行までの時間をその行に帰属させ、行の発行元（MOD）・行に現れるアセット名ごとに合計する
+    発行元は スタックフレームのクラス名の先頭名前空間 → 行頭の [タグ] の順に決める
+    （名前空間の無いクラスはゲーム本体として扱う）
+    起動イベント行（[CS1Profiler-Startup]）はプロファイラー自身に帰属させ、フェーズごとの最大MODの候補から除く
+
+ファイル全体を64MB単位のブロックでバイト列のまま読み、プリコンパイルした正規表現で対象行だけを取り出す（1パス）
+"""
+
+import argparse
+import os
+from datetime import datetime
+import re
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+plt.rcParams['font.family'] = ['DejaVu Sans', 'Yu Gothic', 'Hiragino Sans', 'Noto Sans CJK JP']
+
+BLOCK_BYTES = 64 * 1024 * 1024
+HOOK_LOG_HEADER = b'ElapsedMs,Type,ThreadId,Source,Message'
+GAME_SOURCE = '(game)'
+UNKNOWN_SOURCE = '(unknown)'
+PROFILER_SOURCE = 'CS1Profiler'
+TIMELINE_BINS = 200
+# ゲーム本体・エンジン側の名前空間（MODとして扱わない）
+ENGINE_NAMESPACES = frozenset(['UnityEngine', 'ColossalFramework', 'System', 'Mono', 'ICities', 'Steamworks'])
+
+# 対象行の分類（行頭にアンカーし、どの選択肢にも当たらない行は正規表現エンジン内で読み飛ばす）
+# 経過秒は旧バージョンのMODが実行環境のカルチャで書いたログ（小数点が ","）も受け付ける
+LINE_PATTERN = re.compile(rb'''^(?:
+    \[CS1Profiler-Startup\]\ \[[^\]\r\n]+\]\ \+(?P<elapsed>[\d.,]+)s\ \|\ (?P<event>\w+)\ \|\ (?P<description>[^\r\n]*)
+  | -\ Completed\ reload,\ in\s+(?P<reload>[\d.,]+)\ seconds
+  | (?P<exception>[\w.`]*(?:Exception|Error)):\ (?P<exception_message>[^\r\n]{0,200})
+  | [\ \t]+at\ (?P<mono_frame>[\w.`+<>|/]+)
+  | (?P<unity_frame>[A-Za-z_][\w.`+<>|/]*):[\w.`<>|]+\(
+  | \[(?P<tag>[^\]\r\n]{1,48})\]\ ?(?P<tag_message>[^\r\n]{0,200})
+)''', re.MULTILINE | re.VERBOSE)
+
+# アセット名（ワークショップアセットの "ID.名前_Data" と .crp パッケージ）
+# 固定文字列で始まる目印でブロック全体を探し、見つかった行だけを ASSET_PATTERN で解析する
+# （目印は1つずつ検索する。選択肢にすると固定文字列の高速検索が効かない）
+ASSET_MARKERS = (re.compile(rb'_Data\b'), re.compile(rb'\.crp\b'))
+ASSET_PATTERN = re.compile(rb'''(?:
+    (?<![\w.])(?P<workshop>\d{6,12}\.[^\r\n,;:'"()\[\]]{1,80}?_Data)\b
+  | (?P<crp>[^\s\\/'"\[\]|:]{1,120}\.crp)\b
+)''', re.VERBOSE)
+ASSET_FAILURE_PATTERN = re.compile(rb'fail|error|missing|exception|not found', re.IGNORECASE)
+
+
+def parse_seconds(text):
+    """ログ中の秒数（小数点は "." または ","）"""
+    return float(text.replace(b',', b'.'))
+
+
+def format_duration(duration_ms):
+    """フェーズ時間の表示（最後のフェーズなど終了時刻が無い場合は「終了時刻不明」）"""
+    return f"{duration_ms / 1000.0:.2f}s" if np.isfinite(duration_ms) else '終了時刻不明'
+
+
+def is_hook_log(path):
+    with open(path, 'rb') as f:
+        return f.readline().lstrip(b'\xef\xbb\xbf').startswith(HOOK_LOG_HEADER)
+
+
+def source_mod(source):
+    """発行元クラス名 → MOD名（先頭の名前空間。名前空間の無いクラスとエンジン側はゲーム本体）"""
+    if not source:
+        return ''
+    namespace, dot, _ = source.partition('.')
+    if not dot or namespace in ENGINE_NAMESPACES:
+        return GAME_SOURCE
+    return namespace
+
+
+def iter_blocks(path, block_bytes=BLOCK_BYTES):
+    """(ブロック先頭のバイトオフセット, 改行で終わるバイト列) を順に返す"""
+    with open(path, 'rb') as f:
+        base, carry = 0, b''
+        while True:
+            chunk = f.read(block_bytes)
+            if not chunk:
+                break
+            data = carry + chunk
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                carry = data
+                continue
+            yield base, data[:cut]
+            base += cut
+            carry = data[cut:]
+        if carry:
+            yield base, carry + b'\n'
+
+
+class LineScanner:
+    """
+    ブロック単位で対象行を抽出し、行頭オフセットつきのタプルとして蓄積する
+    例外行は直後のスタックフレームのうち最初のMOD側フレームを発行元にする
+    """
+
+    EVENT_COLUMNS = ['Offset', 'Kind', 'Name', 'Tag', 'Source', 'Detail', 'AnchorMs']
+
+    def __init__(self):
+        self.events = []
+        self.exception_sources = {}
+        self.assets = []
+        self.reloads = []
+        self.lines = 0
+        self.bytes = 0
+        self._pending_exception = None
+
+    def scan(self, data, base=0):
+        self.lines += data.count(b'\n')
+        self.bytes += len(data)
+        events, add = self.events, self.events.append
+        pending = self._pending_exception
+        for match in LINE_PATTERN.finditer(data):
+            (elapsed, event, description, reload, exception, exception_message,
+             mono_frame, unity_frame, tag, tag_message) = match.groups()
+            if mono_frame is not None or unity_frame is not None:
+                if pending is not None:
+                    frame = mono_frame.rpartition(b'.')[0] if mono_frame is not None else unity_frame
+                    source = frame.decode('utf-8', 'replace')
+                    if source_mod(source) != GAME_SOURCE:
+                        self.exception_sources[pending] = source
+                        pending = None
+                continue
+            pending = None
+
+            offset = base + match.start()
+            if tag is not None:
+                add((offset, 'tagged', '', tag.decode('utf-8', 'replace'), '', tag_message.decode('utf-8', 'replace'), np.nan))
+            elif exception is not None:
+                pending = len(events)
+                add((offset, 'exception', exception.decode('utf-8', 'replace'), '', '',
+                     exception_message.decode('utf-8', 'replace'), np.nan))
+            elif event is not None:
+                add((offset, 'startup', event.decode(), '', '', description.decode('utf-8', 'replace'),
+                     parse_seconds(elapsed) * 1000.0))
+            else:
+                self.reloads.append((offset, parse_seconds(reload)))
+        self._pending_exception = pending
+
+        add_asset = self.assets.append
+        line_starts = {data.rfind(b'\n', 0, marker.start()) + 1
+                       for pattern in ASSET_MARKERS for marker in pattern.finditer(data)}
+        for line_start in sorted(line_starts):
+            line = data[line_start:data.find(b'\n', line_start)]
+            failed = ASSET_FAILURE_PATTERN.search(line) is not None
+            for workshop, crp in ASSET_PATTERN.findall(line):
+                add_asset((base + line_start, (workshop or crp).decode('utf-8', 'replace'), failed))
+
+    def frames(self):
+        events = pd.DataFrame.from_records(self.events, columns=self.EVENT_COLUMNS)
+        if self.exception_sources:
+            rows = list(self.exception_sources)
+            events.loc[rows, 'Source'] = list(self.exception_sources.values())
+        assets = pd.DataFrame.from_records(self.assets, columns=['Offset', 'Asset', 'Failed'])
+        return events, assets.drop_duplicates(['Offset', 'Asset'])
+
+
+def assign_mods(events):
+    """
+    発行元 → 行頭の[タグ] の順でMOD名を決める（同じ 発行元・タグ の組は1回だけ解決）
+    起動イベント行はタグ（CS1Profiler-Startup）も発行元も持たないことがあるため、常に CS1Profiler とする
+    """
+    source_codes, sources = pd.factorize(events['Source'])
+    tag_codes, tags = pd.factorize(events['Tag'])
+    pairs, codes = np.unique(source_codes.astype(np.int64) * len(tags) + tag_codes, return_inverse=True)
+    mods = np.array([source_mod(sources[pair // len(tags)]) or tags[pair % len(tags)] or UNKNOWN_SOURCE
+                     for pair in pairs], dtype=object)[codes]
+    mods[(events['Kind'] == 'startup').to_numpy()] = PROFILER_SOURCE
+    return mods
+
+
+def add_asset_lines(events, assets):
+    """どの分類にも当たらなかったアセット行を 'asset' 行として追加（時刻・帰属時間を持たせるため）"""
+    lines = assets.drop_duplicates('Offset')
+    lines = lines[~lines['Offset'].isin(events['Offset'])]
+    if lines.empty:
+        return events
+    added = pd.DataFrame({'Offset': lines['Offset'].to_numpy(), 'Kind': 'asset', 'Name': '', 'Tag': '',
+                          'Source': '', 'Detail': lines['Asset'].to_numpy(), 'AnchorMs': np.nan})
+    return pd.concat([events, added], ignore_index=True).sort_values('Offset', kind='stable').reset_index(drop=True)
+
+
+def read_output_log(path, block_bytes=BLOCK_BYTES):
+    """
+    output_log.txt を1パスで解析
+    時刻は起動イベント行の経過時間を基準点に、バイトオフセットで線形補間する
+    """
+    scanner = LineScanner()
+    for base, data in iter_blocks(path, block_bytes):
+        scanner.scan(data, base)
+    events, assets = scanner.frames()
+    events = add_asset_lines(events, assets)
+
+    anchors = events.dropna(subset=['AnchorMs'])
+    if len(anchors) > 0:
+        # 同じ経過時間の基準点が続いても補間できるよう、時刻は単調に揃える
+        anchor_ms = np.maximum.accumulate(anchors['AnchorMs'].to_numpy())
+        events['TimeMs'] = np.interp(events['Offset'], anchors['Offset'], anchor_ms, left=np.nan, right=np.nan)
+        last = anchors['Offset'].iloc[-1]
+        events.loc[events['Offset'] == last, 'TimeMs'] = anchor_ms[-1]
+    else:
+        events['TimeMs'] = np.nan
+    events['Type'] = np.where(events['Kind'] == 'exception', 'Exception', 'Log')
+    events['Mod'] = assign_mods(events)
+
+    info = {
+        'path': path,
+        'format': 'output_log',
+        'time_source': '起動イベント間のオフセット補間',
+        'lines': scanner.lines,
+        'bytes': scanner.bytes,
+        'reloads': scanner.reloads,
+    }
+    if len(anchors) > 0:
+        # 最初の起動イベントより前（Unity初期化・PackageManager等）は時刻なし
+        with open(path, 'rb') as f:
+            info['untimed_lines'] = f.read(int(anchors['Offset'].iloc[0])).count(b'\n')
+    else:
+        info['untimed_lines'] = scanner.lines
+    return events, assets, info
+
+
+def read_hook_log(path):
+    """
+    CS1Profiler_StartupLog_*.csv を解析（全行が時刻・発行元を持つ）
+    メッセージ列を改行で連結して output_log と同じスキャナーで分類する
+    """
+    log = pd.read_csv(path, encoding='utf-8-sig', dtype={'Type': str, 'Source': str, 'Message': str},
+                      keep_default_na=False)
+    messages = [message.encode('utf-8') + b'\n' for message in log['Message']]
+    starts = np.zeros(len(messages), dtype=np.int64)
+    if messages:
+        starts[1:] = np.cumsum([len(message) for message in messages])[:-1]
+
+    scanner = LineScanner()
+    scanner.scan(b''.join(messages))
+    classified, assets = scanner.frames()
+
+    events = pd.DataFrame({
+        'Offset': starts,
+        'Kind': np.where(log['Type'].isin(['Exception', 'Error', 'Assert']), 'exception', 'log'),
+        'Name': '', 'Tag': '', 'Source': log['Source'].to_numpy(), 'Detail': log['Message'].to_numpy(),
+        'AnchorMs': np.nan,
+    })
+    if len(classified) > 0:
+        rows = np.searchsorted(starts, classified['Offset'].to_numpy(), side='right') - 1
+        startup = (classified['Kind'] == 'startup').to_numpy()
+        events.loc[rows[startup], 'Kind'] = 'startup'
+        events.loc[rows[startup], 'Name'] = classified['Name'].to_numpy()[startup]
+        events.loc[rows, 'Tag'] = classified['Tag'].to_numpy()
+        exception = (classified['Kind'] == 'exception').to_numpy()
+        events.loc[rows[exception], 'Kind'] = 'exception'
+        events.loc[rows[exception], 'Name'] = classified['Name'].to_numpy()[exception]
+    events['TimeMs'] = log['ElapsedMs'].to_numpy(dtype=np.float64)
+    events['Type'] = log['Type'].to_numpy()
+    events['ThreadId'] = log['ThreadId'].to_numpy()
+    events['Mod'] = assign_mods(events)
+    info = {
+        'path': path,
+        'format': 'startup_log',
+        'time_source': 'ログ行ごとの経過時間',
+        'lines': len(log),
+        'bytes': os.path.getsize(path),
+        'untimed_lines': 0,
+        'reloads': scanner.reloads,
+    }
+    return events, assets, info
+
+
+def load_boot(path):
+    print(f"📂 読み込み中: {path}")
+    events, assets, info = read_hook_log(path) if is_hook_log(path) else read_output_log(path)
+    return attribute_gaps(events), assets, info
+
+
+def attribute_gaps(events):
+    """各行に次の行までの時間（GapMs）を帰属させる。時刻の無い行は0"""
+    events = events.sort_values(['TimeMs', 'Offset'], kind='stable', na_position='first').reset_index(drop=True)
+    times = events['TimeMs'].to_numpy()
+    gaps = np.diff(times, append=np.nan)
+    events['GapMs'] = np.nan_to_num(gaps, nan=0.0)
+    return events
+
+
+def phase_table(events):
+    """
+    起動イベント間の区間（フェーズ）
+    同じイベントが繰り返される場合は (2), (3)… を付けて区別する（2回目のレベル読み込み等）
+    """
+    timed = events.dropna(subset=['TimeMs'])
+    startup = timed[timed['Kind'] == 'startup']
+    if startup.empty:
+        return pd.DataFrame(columns=['Phase', 'StartMs', 'EndMs', 'DurationMs', 'Lines', 'Exceptions', 'TopMod', 'TopModMs'])
+
+    names = startup['Name'].to_numpy()
+    occurrence = startup.groupby('Name').cumcount().to_numpy() + 1
+    phases = [name if count == 1 else f'{name}({count})' for name, count in zip(names, occurrence)]
+    starts = startup['TimeMs'].to_numpy()
+    ends = np.append(starts[1:], timed['TimeMs'].max())
+    if ends[-1] <= starts[-1]:
+        ends[-1] = np.nan  # 最後のイベント以降に時刻のある行が無い（output_log）
+
+    phase_of = np.searchsorted(starts, timed['TimeMs'].to_numpy(), side='right') - 1
+    inside = phase_of >= 0
+    by_phase = timed[inside].assign(Phase=np.asarray(phases)[phase_of[inside]])
+    lines = by_phase.groupby('Phase').size()
+    exceptions = by_phase[by_phase['Kind'] == 'exception'].groupby('Phase').size()
+    mod_ms = by_phase[by_phase['Mod'] != PROFILER_SOURCE].groupby(['Phase', 'Mod'])['GapMs'].sum()
+    top_mod = mod_ms.sort_values(ascending=False).reset_index().drop_duplicates('Phase').set_index('Phase')
+
+    table = pd.DataFrame({'Phase': phases, 'StartMs': starts, 'EndMs': ends, 'DurationMs': ends - starts})
+    table['Lines'] = table['Phase'].map(lines).fillna(0).astype(int)
+    table['Exceptions'] = table['Phase'].map(exceptions).fillna(0).astype(int)
+    table['TopMod'] = table['Phase'].map(top_mod['Mod']).fillna('')
+    table['TopModMs'] = table['Phase'].map(top_mod['GapMs']).fillna(0.0)
+    return table
+
+
+def mod_table(events):
+    """MOD（発行元）別の帰属時間・行数・例外数・出現区間"""
+    grouped = events.groupby('Mod')
+    table = pd.DataFrame({
+        'AttributedMs': grouped['GapMs'].sum(),
+        'Lines': grouped.size(),
+        'Exceptions': events[events['Kind'] == 'exception'].groupby('Mod').size(),
+        'FirstMs': grouped['TimeMs'].min(),
+        'LastMs': grouped['TimeMs'].max(),
+        'MaxGapMs': grouped['GapMs'].max(),
+    })
+    table['Exceptions'] = table['Exceptions'].fillna(0).astype(int)
+    return table.reset_index().sort_values(['AttributedMs', 'Lines'], ascending=False).reset_index(drop=True)
+
+
+def asset_table(events, assets):
+    """アセット別の帰属時間（アセット名が現れた行の帰属時間の合計）・出現行数・失敗行数"""
+    if assets.empty:
+        return pd.DataFrame(columns=['Asset', 'AttributedMs', 'Lines', 'FailedLines', 'FirstMs'])
+    assets = assets.merge(events[['Offset', 'TimeMs', 'GapMs']], on='Offset', how='left')
+    grouped = assets.groupby('Asset')
+    table = pd.DataFrame({
+        'AttributedMs': grouped['GapMs'].sum(),
+        'Lines': grouped.size(),
+        'FailedLines': grouped['Failed'].sum().astype(int),
+        'FirstMs': grouped['TimeMs'].min(),
+    })
+    return table.reset_index().sort_values(['AttributedMs', 'FailedLines', 'Lines'], ascending=False).reset_index(drop=True)
+
+
+def analyze_boot(path):
+    events, assets, info = load_boot(path)
+    return {
+        'events': events,
+        'info': info,
+        'phases': phase_table(events),
+        'mods': mod_table(events),
+        'assets': asset_table(events, assets),
+    }
+
+
+def compare_tables(base, other, key, value):
+    """2回分の起動の同じキー（フェーズ・MOD・アセット）の値を並べ、差分の大きい順に返す"""
+    merged = base[[key, value]].merge(other[[key, value]], on=key, how='outer', suffixes=('_A', '_B'))
+    merged = merged.fillna({f'{value}_A': 0.0, f'{value}_B': 0.0})
+    merged['Delta'] = merged[f'{value}_B'] - merged[f'{value}_A']
+    return merged.reindex(merged['Delta'].abs().sort_values(ascending=False).index).reset_index(drop=True)
+
+
+def plot_timeline(result, output, top=15):
+    """フェーズのガントチャートと、帰属時間上位MODの出現区間"""
+    phases, mods = result['phases'], result['mods']
+    mods = mods[mods['Mod'] != UNKNOWN_SOURCE].dropna(subset=['FirstMs']).head(top)
+    fig, (phase_ax, mod_ax) = plt.subplots(2, 1, figsize=(15, 4 + 0.4 * len(mods)), sharex=True,
+                                           gridspec_kw={'height_ratios': [1, max(len(mods), 1) / 4 + 1]})
+
+    colors = plt.cm.tab20(np.arange(max(len(phases), 1)) % 20)
+    for i, phase in enumerate(phases.itertuples()):
+        duration = np.nan_to_num(phase.DurationMs)
+        phase_ax.broken_barh([(phase.StartMs / 1000.0, duration / 1000.0)], (0, 1), color=colors[i], alpha=0.8)
+        phase_ax.text(phase.StartMs / 1000.0, 1.05, f'{phase.Phase} {duration / 1000.0:.1f}s',
+                      fontsize=8, rotation=20, va='bottom')
+    phase_ax.set_yticks([])
+    phase_ax.set_ylim(0, 2)
+    phase_ax.set_title(f"起動フェーズ: {os.path.basename(result['info']['path'])}")
+
+    # MOD × 時間ビンの帰属時間（どの時間帯にどのMODが時間を使ったか）
+    events = result['events'].dropna(subset=['TimeMs'])
+    end_seconds = max(events['TimeMs'].max() / 1000.0, 1e-3) if len(events) > 0 else 1.0
+    edges = np.linspace(0.0, end_seconds, TIMELINE_BINS + 1)
+    rows = events['Mod'].map({name: i for i, name in enumerate(mods['Mod'])})
+    selected = rows.notna().to_numpy()
+    heat, _, _ = np.histogram2d(rows[selected].to_numpy(), events['TimeMs'].to_numpy()[selected] / 1000.0,
+                                bins=[np.arange(len(mods) + 1) - 0.5, edges],
+                                weights=events['GapMs'].to_numpy()[selected] / 1000.0)
+    image = mod_ax.imshow(heat, aspect='auto', cmap='YlOrRd', interpolation='nearest',
+                          extent=[0.0, end_seconds, len(mods) - 0.5, -0.5])
+    fig.colorbar(image, ax=[phase_ax, mod_ax], pad=0.01, label='帰属時間（秒/ビン）')
+    mod_ax.set_yticks(range(len(mods)))
+    mod_ax.set_yticklabels([f'{name[:32]} ({ms / 1000.0:.1f}s, 例外 {count})'
+                            for name, ms, count in zip(mods['Mod'], mods['AttributedMs'], mods['Exceptions'])],
+                           fontsize=8)
+    mod_ax.set_xlabel('MOD有効化からの経過時間（秒）')
+    mod_ax.set_title(f'帰属時間 上位{len(mods)} MODの時間帯別の帰属時間')
+    mod_ax.grid(True, axis='x', alpha=0.3)
+    plt.savefig(output, dpi=200, bbox_inches='tight')
+    plt.close()
+
+
+def plot_phase_comparison(phases, labels, output):
+    plt.figure(figsize=(12, max(3, 0.5 * len(phases))))
+    positions = np.arange(len(phases))
+    plt.barh(positions - 0.2, phases['DurationMs_A'] / 1000.0, height=0.4, label=labels[0])
+    plt.barh(positions + 0.2, phases['DurationMs_B'] / 1000.0, height=0.4, label=labels[1])
+    plt.yticks(positions, phases['Phase'])
+    plt.gca().invert_yaxis()
+    plt.xlabel('秒')
+    plt.title('起動フェーズ時間の比較')
+    plt.legend(fontsize=8)
+    plt.grid(True, axis='x', alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(output, dpi=200, bbox_inches='tight')
+    plt.close()
+
+
+def write_boot_outputs(result, output_dir, prefix):
+    result['phases'].to_csv(f'{output_dir}/{prefix}_phases.csv', index=False, encoding='utf-8-sig')
+    result['mods'].to_csv(f'{output_dir}/{prefix}_mods.csv', index=False, encoding='utf-8-sig')
+    result['assets'].to_csv(f'{output_dir}/{prefix}_assets.csv', index=False, encoding='utf-8-sig')
+    plot_timeline(result, f'{output_dir}/{prefix}_timeline.png')
+
+
+def write_boot_report(f, result, top):
+    info, phases, mods, assets = result['info'], result['phases'], result['mods'], result['assets']
+    events = result['events']
+    f.write(f"入力: {info['path']} ({info['format']}, {info['bytes'] / 1024 / 1024:.1f} MB, {info['lines']:,} 行)\n")
+    f.write(f"時刻: {info['time_source']}\n")
+    if info['untimed_lines'] > 0:
+        f.write(f"時刻なし（最初の起動イベント以前）: {info['untimed_lines']:,} 行\n")
+    timed = events['TimeMs'].dropna()
+    if len(timed) > 0:
+        f.write(f"計測区間: {timed.max() / 1000.0:.2f} 秒, 例外: {int((events['Kind'] == 'exception').sum())} 件\n")
+    for _, seconds in info['reloads']:
+        f.write(f"Unity アセンブリ再読み込み: {seconds:.3f} 秒\n")
+    f.write("\n")
+
+    f.write("⏱️ フェーズ\n")
+    f.write("-" * 30 + "\n")
+    for phase in phases.itertuples():
+        top_mod = f", 最大MOD {phase.TopMod} {phase.TopModMs / 1000.0:.2f}s" if phase.TopMod else ''
+        f.write(f"{phase.Phase}: {format_duration(phase.DurationMs)} (+{phase.StartMs / 1000.0:.2f}s から, "
+                f"{phase.Lines} 行, 例外 {phase.Exceptions}{top_mod})\n")
+    f.write("\n")
+
+    f.write(f"🧩 ロード時間の大きいMOD 上位{top}\n")
+    f.write("-" * 30 + "\n")
+    for mod in mods.head(top).itertuples():
+        f.write(f"{mod.Mod}: {mod.AttributedMs / 1000.0:.2f}s ({mod.Lines} 行, 例外 {mod.Exceptions}, "
+                f"最大間隔 {mod.MaxGapMs:.0f}ms)\n")
+    f.write("\n")
+
+    f.write(f"📦 ロード時間の大きいアセット 上位{top}\n")
+    f.write("-" * 30 + "\n")
+    if assets.empty:
+        f.write("アセット名を含む行はありません\n")
+    for asset in assets.head(top).itertuples():
+        failed = f", 失敗/エラー {asset.FailedLines} 行" if asset.FailedLines else ''
+        f.write(f"{asset.Asset}: {asset.AttributedMs:.0f}ms ({asset.Lines} 行{failed})\n")
+    failed_assets = assets[assets['FailedLines'] > 0]
+    if len(failed_assets) > 0:
+        f.write(f"⚠️ 失敗・エラー行のあるアセット: {len(failed_assets)} 件\n")
+    f.write("\n")
+
+
+def main():
+    default_output = f"startup_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    parser = argparse.ArgumentParser(description='CS1Profiler Startup / Loading Timeline Analyzer')
+    parser.add_argument('log', help='output_log.txt または CS1Profiler_StartupLog_*.csv')
+    parser.add_argument('--compare', help='比較する2回目の起動のログ（同じ形式でなくてもよい）')
+    parser.add_argument('-o', '--output', default=default_output, help=f'出力ディレクトリ (デフォルト: {default_output})')
+    parser.add_argument('--top', type=int, default=20, help='レポートに表示するMOD・アセット数')
+    args = parser.parse_args()
+
+    started = datetime.now()
+    result = analyze_boot(args.log)
+    other = analyze_boot(args.compare) if args.compare else None
+    elapsed = (datetime.now() - started).total_seconds()
+
+    os.makedirs(args.output, exist_ok=True)
+    write_boot_outputs(result, args.output, 'startup')
+    if other is not None:
+        write_boot_outputs(other, args.output, 'startup_B')
+        labels = [os.path.basename(args.log), os.path.basename(args.compare)]
+        phase_diff = compare_tables(result['phases'], other['phases'], 'Phase', 'DurationMs')
+        mod_diff = compare_tables(result['mods'], other['mods'], 'Mod', 'AttributedMs')
+        asset_diff = compare_tables(result['assets'], other['assets'], 'Asset', 'AttributedMs')
+        phase_diff.to_csv(f'{args.output}/startup_compare_phases.csv', index=False, encoding='utf-8-sig')
+        mod_diff.to_csv(f'{args.output}/startup_compare_mods.csv', index=False, encoding='utf-8-sig')
+        asset_diff.to_csv(f'{args.output}/startup_compare_assets.csv', index=False, encoding='utf-8-sig')
+        ordered = result['phases'][['Phase']].merge(phase_diff, on='Phase', how='outer')
+        plot_phase_comparison(ordered, labels, f'{args.output}/startup_compare_phases.png')
+
+    with open(f'{args.output}/startup_report.txt', 'w', encoding='utf-8') as f:
+        f.write("起動・ロード時間解析レポート\n")
+        f.write("=" * 50 + "\n")
+        f.write(f"解析日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write("MOD・アセットの時間は各ログ行から次の行までの時間の合計（output_logでは補間値のため目安）\n\n")
+        write_boot_report(f, result, args.top)
+        if other is not None:
+            f.write("=" * 50 + "\n")
+            f.write("比較対象 (B)\n")
+            write_boot_report(f, other, args.top)
+            f.write("=" * 50 + "\n")
+            f.write(f"🔀 比較 A: {labels[0]} → B: {labels[1]}\n")
+            f.write("-" * 30 + "\n")
+            total_a = result['phases']['DurationMs'].sum()
+            total_b = other['phases']['DurationMs'].sum()
+            f.write(f"計測区間合計: {total_a / 1000.0:.2f}s → {total_b / 1000.0:.2f}s ({(total_b - total_a) / 1000.0:+.2f}s)\n\n")
+            for title, table, value in (('フェーズ', phase_diff, 'DurationMs'), ('MOD', mod_diff, 'AttributedMs'),
+                                        ('アセット', asset_diff, 'AttributedMs')):
+                f.write(f"{title}（差の大きい順）\n")
+                for row in table.head(args.top).itertuples(index=False):
+                    f.write(f"  {row[0]}: {getattr(row, value + '_A') / 1000.0:.2f}s → "
+                            f"{getattr(row, value + '_B') / 1000.0:.2f}s ({row.Delta / 1000.0:+.2f}s)\n")
+                f.write("\n")
+
+    print(f"\n⚡ 解析時間: {elapsed:.1f}秒 ({result['info']['lines']:,} 行)")
+    for phase in result['phases'].itertuples():
+        print(f"   {phase.Phase}: {format_duration(phase.DurationMs)}")
+    for mod in result['mods'].head(5).itertuples():
+        print(f"   🧩 {mod.Mod}: {mod.AttributedMs / 1000.0:.2f}s ({mod.Lines} 行)")
+    print(f"\n✅ 解析完了! 結果: {args.output}/")
+
+
+if __name__ == '__main__':
+    main()